@@ -3,6 +3,7 @@
 #
 # The cherry-picked imports will be the supported API.
 
+from .api_async import AsyncApiClient
 from .api_build import BuildHistory
 from .api_configuration import get_configuration_value
 from .api_source import add_channels
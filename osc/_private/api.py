@@ -41,7 +41,7 @@ def get(apiurl, path, query=None):
     return root
 
 
-def post(apiurl, path, query=None):
+def post(apiurl, path, query=None, data=None):
     """
     Send a POST request to OBS.
 
@@ -51,6 +51,7 @@ def post(apiurl, path, query=None):
     :type  path: list(str)
     :param query: URL query values.
     :type  query: dict(str, str)
+    :param data: Request body.
     :returns: Parsed XML root.
     :rtype:   xml.etree.ElementTree.Element
     """
@@ -64,7 +65,7 @@ def post(apiurl, path, query=None):
         raise TypeError("Argument `path` expects a list of strings")
 
     url = osc_core.makeurl(apiurl, path, query)
-    with osc_connection.http_POST(url) as f:
+    with osc_connection.http_POST(url, data=data) as f:
         root = xml_parse(f).getroot()
     return root
 
@@ -97,6 +98,53 @@ def put(apiurl, path, query=None, data=None):
     return root
 
 
+def get_many(apiurl, paths, queries=None, max_workers=None):
+    """
+    Send multiple GET requests to OBS concurrently.
+
+    The requests are sent from a pool of threads so the number of running requests doesn't exceed ``max_workers``.
+    An error doesn't stop the other requests, the exception is returned in place of the result of the failed request.
+
+    :param apiurl: OBS apiurl.
+    :type  apiurl: str
+    :param paths: URL path segments of the requests.
+    :type  paths: list(list(str))
+    :param queries: URL query values of the requests, in the same order as ``paths``.
+    :type  queries: list(dict(str, str))
+    :param max_workers: Maximum number of concurrent requests. Defaults to ``http_pool_size`` from oscrc.
+    :type  max_workers: int
+    :returns: Parsed XML roots or exceptions in the same order as ``paths``.
+    :rtype:   list(xml.etree.ElementTree.Element or Exception)
+    """
+    import concurrent.futures
+
+    from .. import conf
+
+    paths = list(paths)
+    if queries is None:
+        queries = [None] * len(paths)
+    queries = list(queries)
+    if len(queries) != len(paths):
+        raise ValueError("Arguments `paths` and `queries` must have the same length")
+
+    if max_workers is None:
+        max_workers = int(conf.config["http_pool_size"])
+
+    results = [None] * len(paths)
+    if not paths:
+        return results
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(paths)))) as executor:
+        futures = {executor.submit(get, apiurl, path, query): num for num, (path, query) in enumerate(zip(paths, queries))}
+        for future in concurrent.futures.as_completed(futures):
+            num = futures[future]
+            try:
+                results[num] = future.result()
+            except Exception as e:  # pylint: disable=broad-except
+                results[num] = e
+    return results
+
+
 def _to_xpath(*args):
     """
     Convert strings and dictionaries to xpath:
@@ -0,0 +1,117 @@
+"""
+Asyncio client for OBS API.
+
+This is a thread-pool adapter over the blocking API, not a non-blocking transport.
+Every request is sent by ``osc.connection.http_request()`` in a worker thread
+so it uses the same authentication (session cookie, ssh signature, basic auth),
+apiurl host options, retries and SSL trust store as the synchronous API.
+
+Each request in flight occupies one worker thread, so at most ``workers`` requests
+are sent at the same time and the others wait in the queue.
+The number of workers is independent of the connection pool:
+up to ``http_pool_size`` connections are kept open and reused,
+connections of the requests above that limit are closed after each request.
+"""
+
+
+import asyncio
+import concurrent.futures
+import functools
+
+from . import api
+
+
+def _get_running_loop():
+    # asyncio.get_running_loop() is available since python 3.7
+    if hasattr(asyncio, "get_running_loop"):
+        return asyncio.get_running_loop()
+    return asyncio.get_event_loop()
+
+
+class AsyncApiClient:
+    """
+    Send requests to OBS API from asyncio code.
+
+    The blocking requests run in a pool of ``workers`` threads,
+    awaiting more requests than that queues them until a worker is free.
+
+    Example::
+
+        async with AsyncApiClient(apiurl) as client:
+            roots = await asyncio.gather(*[client.get(["source", prj, "_meta"]) for prj in projects])
+
+    :param apiurl: OBS apiurl.
+    :type  apiurl: str
+    :param workers: Number of worker threads, that is the maximum number of requests in flight.
+                    Defaults to ``http_pool_size`` from oscrc so every request gets a reused connection from the pool.
+                    Higher values send more requests at once at the cost of the connections
+                    above ``http_pool_size`` being opened and closed for each request.
+    :type  workers: int
+    """
+
+    def __init__(self, apiurl, workers=None):
+        from .. import conf
+
+        self.apiurl = apiurl
+        if workers is None:
+            workers = int(conf.config["http_pool_size"])
+        self.workers = workers
+        self._executor = concurrent.futures.ThreadPoolExecutor(max_workers=workers)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.close()
+
+    async def close(self):
+        """
+        Wait for the running requests and release the threads.
+        """
+        loop = _get_running_loop()
+        await loop.run_in_executor(None, self._executor.shutdown)
+
+    async def _run(self, func, *args, **kwargs):
+        loop = _get_running_loop()
+        return await loop.run_in_executor(self._executor, functools.partial(func, *args, **kwargs))
+
+    async def get(self, path, query=None):
+        """
+        Send a GET request to OBS.
+
+        :param path: URL path segments.
+        :type  path: list(str)
+        :param query: URL query values.
+        :type  query: dict(str, str)
+        :returns: Parsed XML root.
+        :rtype:   xml.etree.ElementTree.Element
+        """
+        return await self._run(api.get, self.apiurl, path, query)
+
+    async def post(self, path, query=None, data=None):
+        """
+        Send a POST request to OBS.
+
+        :param path: URL path segments.
+        :type  path: list(str)
+        :param query: URL query values.
+        :type  query: dict(str, str)
+        :param data: Request body.
+        :returns: Parsed XML root.
+        :rtype:   xml.etree.ElementTree.Element
+        """
+        return await self._run(api.post, self.apiurl, path, query, data=data)
+
+    async def put(self, path, query=None, data=None):
+        """
+        Send a PUT request to OBS.
+
+        :param path: URL path segments.
+        :type  path: list(str)
+        :param query: URL query values.
+        :type  query: dict(str, str)
+        :param data: Request body.
+        :returns: Parsed XML root.
+        :rtype:   xml.etree.ElementTree.Element
+        """
+        return await self._run(api.put, self.apiurl, path, query, data=data)
@@ -3,6 +3,7 @@
 # and distributed under the terms of the GNU General Public Licence,
 # either version 2, or (at your option) any later version.
 
+import concurrent.futures
 import fnmatch
 import getpass
 import glob
@@ -11,6 +12,7 @@ import re
 import shutil
 import subprocess
 import sys
+import threading
 from tempfile import NamedTemporaryFile, mkdtemp
 from typing import List
 from typing import Optional
@@ -22,9 +24,9 @@ from . import conf
 from . import connection
 from . import core
 from . import oscerr
-from .core import get_buildinfo, meta_exists, get_buildconfig, dgst
+from .core import get_buildinfo, meta_exists, get_buildconfig
 from .core import get_binarylist, get_binary_file, run_external, return_external, raw_input
-from .fetch import Fetcher, OscFileGrabber, verify_pacs
+from .fetch import Fetcher, OscFileGrabber, PackageVerifier, verify_pacs
 from .meter import create_text_meter
 from .util import cpio
 from .util import archquery, debquery, packagequery, rpmquery
@@ -509,16 +511,41 @@ class Pac:
         return "%s" % self.name
 
 
-def get_preinstall_image(apiurl, arch, cache_dir, img_info, offline=False):
+def _get_preinstall_image_size(apiurl, project, repository, arch, package, filename):
+    """
+    Return size of the preinstall image from the binary list or ``None`` if it is not known.
+    """
+    try:
+        binaries = get_binarylist(apiurl, project, repository, arch, package=package, verbose=True)
+    except HTTPError:
+        return None
+    for binary in binaries:
+        if binary.name == filename:
+            return binary.size
+    return None
+
+
+def get_preinstall_image(apiurl, arch, cache_dir, img_info, offline=False, show_progress=True, abort=None, messages=None):
     """
     Searches preinstall image according to build info and downloads it to cache
     (unless offline is set to ``True`` (default: ``False``)).
+    Set ``show_progress`` to ``False`` when downloading concurrently with other downloads
+    to avoid interleaving progress bars.
+    If ``messages`` list is specified, the status messages are appended to it as ``(text, file)`` tuples
+    instead of printing them, so they don't garble the progress bar of the other downloads.
+    Setting the ``abort`` ``threading.Event`` stops the download with ``oscerr.UserAbort``.
     Returns preinstall image path, source and list of image binaries, which can
     be used to create rpmlist.
 
     .. note::
         preinstall image can be used only for new build roots!
     """
+    def log(text, file=None):
+        if messages is None:
+            print(text, file=file)
+        else:
+            messages.append((text, file))
+
     imagefile = ""
     imagesource = ""
     info_file = "preinstallimage.info"
@@ -546,41 +573,39 @@ def get_preinstall_image(apiurl, arch, cache_dir, img_info, offline=False):
         if offline:
             return "", "", "", []
         url = "%s/build/%s/%s/%s/%s/%s" % (apiurl, img_project, img_repository, img_arch, img_pkg, img_file)
-        print("downloading preinstall image %s" % imagesource)
+        log("downloading preinstall image %s" % imagesource)
         if not os.path.exists(cache_path):
             try:
                 os.makedirs(cache_path, mode=0o755)
             except OSError as e:
-                print('packagecachedir is not writable for you?', file=sys.stderr)
-                print(e, file=sys.stderr)
+                log('packagecachedir is not writable for you?', file=sys.stderr)
+                log(e, file=sys.stderr)
                 sys.exit(1)
         progress_obj = None
-        if sys.stdout.isatty():
+        if show_progress and sys.stdout.isatty():
             progress_obj = create_text_meter(use_pb_fallback=False)
         gr = OscFileGrabber(progress_obj=progress_obj)
-        with NamedTemporaryFile(dir=cache_path, delete=False) as temp_file:
-            try:
-                gr.urlgrab(url, filename=temp_file.name, text="fetching image")
-                # download ok, rename temp file to final file name
-                os.rename(temp_file.name, ifile_path)
-            except HTTPError as e:
-                print("Failed to download! ecode:%i reason:%s" % (e.code, e.reason))
-                # Clean up temp file if it still exists
-                if os.path.exists(temp_file.name):
-                    os.unlink(temp_file.name)
-                return ("", "", "", [])
+        try:
+            # the image is downloaded to ``<ifile_path>.part`` and renamed once the download is complete;
+            # an interrupted download continues where it stopped next time
+            # and the size check rejects a partial file left from a different image
+            img_size = _get_preinstall_image_size(apiurl, img_project, img_repository, img_arch, img_pkg, img_file)
+            gr.urlgrab(url, filename=ifile_path, text="fetching image", resume=True, size=img_size, abort=abort)
+        except HTTPError as e:
+            log("Failed to download! ecode:%i reason:%s" % (e.code, e.reason))
+            return ("", "", "", [])
 
         # Also download the corresponding .info file
         if not os.path.exists(info_file_path):
             info_url = "%s/build/%s/%s/%s/%s/%s" % (apiurl, img_project, img_repository, img_arch, img_pkg, info_file)
-            print("downloading preinstall image info file")
+            log("downloading preinstall image info file")
             with NamedTemporaryFile(dir=cache_path, delete=False) as temp_file:
                 try:
                     gr.urlgrab(info_url, filename=temp_file.name, text="fetching image info")
                     # download ok, rename temp file to final file name
                     os.rename(temp_file.name, info_file_path)
                 except HTTPError as e:
-                    print("Failed to download info file! ecode:%i reason:%s" % (e.code, e.reason))
+                    log("Failed to download info file! ecode:%i reason:%s" % (e.code, e.reason))
                     # Clean up temp file if it still exists
                     if os.path.exists(temp_file.name):
                         os.unlink(temp_file.name)
@@ -1273,7 +1298,8 @@ def main(apiurl, store, opts, argv):
                       modules=bi.modules,
                       enable_cpio=not opts.disable_cpio_bulk_download and bi.enable_cpio,
                       cookiejar=connection.CookieJarAuthHandler(apiurl, os.path.expanduser(config["cookiejar"]))._cookiejar,
-                      download_api_only=opts.download_api_only)
+                      download_api_only=opts.download_api_only,
+                      download_workers=opts.download_jobs or config["download_workers"])
 
     if not opts.trust_all_projects:
         # implicitly trust the project we are building for
@@ -1310,17 +1336,58 @@ def main(apiurl, store, opts, argv):
             )
         )
     ):
-        (imagefile, imagesource, imageinfo, imagebins) = get_preinstall_image(
-            apiurl, arch, cache_dir, bi.preinstallimage, opts.offline
+        # download the image while the packages are being fetched;
+        # assume the download succeeds and skip binaries from build deps which are included in preinstall image
+        image_executor = concurrent.futures.ThreadPoolExecutor(max_workers=1)
+        # stops the download if fetching the packages fails or the user hits ctrl-c,
+        # otherwise the interpreter would wait for the whole image on exit
+        image_abort = threading.Event()
+        # printed once the packages are fetched, printing them right away would garble the progress bar
+        image_messages = []
+        image_future = image_executor.submit(
+            get_preinstall_image, apiurl, arch, cache_dir, bi.preinstallimage, opts.offline, show_progress=False,
+            abort=image_abort, messages=image_messages,
         )
-        if imagefile:
-            # remove binaries from build deps which are included in preinstall image
-            for i in bi.deps:
-                if i.name in imagebins:
-                    bi.remove_dep(i.name)
+        image_bins = [i.text for i in bi.preinstallimage.findall('binary')]
+        image_deps = [i for i in bi.deps if i.name in image_bins]
+        for name in image_bins:
+            bi.remove_dep(name)
+    else:
+        image_executor = None
+
+    # packages are verified as soon as they're available, while the remaining ones are still downloading
+    verifier = None
+    if (
+        vm_type not in ('xen', 'kvm', 'lxc', 'nspawn')
+        and bi.pacsuffix == 'rpm'
+        and not opts.no_verify
+        and config['builtin_signature_check'] is True
+    ):
+        verifier = PackageVerifier(fetcher.hdrmd5_index)
 
     # now update the package cache
-    fetcher.run(bi)
+    try:
+        fetcher.run(bi, verifier=verifier)
+
+        if image_executor:
+            try:
+                (imagefile, imagesource, imageinfo, imagebins) = image_future.result()
+            finally:
+                for text, file in image_messages:
+                    print(text, file=file)
+            if not imagefile and image_deps:
+                # the image is not available, fetch the binaries it would provide
+                # (the keys were fetched already and the verifier may be reading them)
+                bi.deps.extend(image_deps)
+                fetcher.run(bi, verifier=verifier, fetch_keys=False)
+    finally:
+        if image_executor:
+            image_abort.set()
+            if sys.version_info >= (3, 9):
+                image_executor.shutdown(cancel_futures=True)
+            else:
+                image_future.cancel()
+                image_executor.shutdown()
 
     old_pkg_dir = None
     if opts.oldpackages:
@@ -1388,7 +1455,8 @@ def main(apiurl, store, opts, argv):
                                 package=data[1],
                                 target_filename=fname,
                                 target_mtime=i.mtime,
-                                progress_meter=True)
+                                progress_meter=True,
+                                target_size=i.size)
 
         if old_pkg_dir is not None:
             buildargs.append('--oldpackages=%s' % old_pkg_dir)
@@ -1560,7 +1628,10 @@ def main(apiurl, store, opts, argv):
             print('Skipping verification of package signatures')
         else:
             print('Verifying integrity of cached packages')
-            verify_pacs(bi)
+            if verifier:
+                verifier.wait([i.fullfilename for i in bi.deps])
+            else:
+                verify_pacs(bi, hdrmd5_index=fetcher.hdrmd5_index)
     elif bi.pacsuffix == 'deb':
         if opts.no_verify or opts.noinit:
             print('Skipping verification of package signatures')
@@ -1572,9 +1643,9 @@ def main(apiurl, store, opts, argv):
     for i in bi.deps:
         if i.hdrmd5:
             if i.name.startswith('container:') or i.binary == 'updateinfo.xml' or i.binary == '_modulemd.yaml':
-                hdrmd5 = dgst(i.fullfilename)
+                hdrmd5 = fetcher.hdrmd5_index.hdrmd5(i.fullfilename, whole_file=True)
             elif i.fullfilename.endswith(".rpm"):
-                hdrmd5 = packagequery.PackageQuery.queryhdrmd5(i.fullfilename)
+                hdrmd5 = fetcher.hdrmd5_index.hdrmd5(i.fullfilename)
             else:
                 continue
             if not hdrmd5:
@@ -1586,6 +1657,7 @@ def main(apiurl, store, opts, argv):
                 else:
                     print(f"Error: hdrmd5 mismatch for {i.fullfilename}: {hdrmd5} (actual) != {i.hdrmd5} (expected)")
                     sys.exit(1)
+    fetcher.hdrmd5_index.save()
 
     print('Writing build configuration')
 
@@ -15,9 +15,9 @@ class KeyError(Exception):
 
 
 class Checker:
-    def __init__(self):
+    def __init__(self, tmpdir=None):
         import rpm
-        self.dbdir = mkdtemp(prefix='oscrpmdb')
+        self.dbdir = mkdtemp(prefix='oscrpmdb', dir=tmpdir)
         self.imported = {}
         # pylint: disable=E1101
         rpm.addMacro('_dbpath', self.dbdir)
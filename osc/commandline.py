@@ -63,6 +63,7 @@ class OscMainCommand(MainCommand):
         super().__init__()
         self.args = None
         self.download_progress = None
+        self.http_trace = None
 
     def init_arguments(self):
         self.add_argument(
@@ -108,6 +109,11 @@ class OscMainCommand(MainCommand):
             action="store_true",
             help="debug HTTP traffic (filters no headers)",
         )
+        self.add_argument(
+            "--http-trace",
+            metavar="FILE",
+            help="write timing of HTTP requests to FILE as JSON lines and print a summary on exit",
+        )
         self.add_argument(
             "-A",
             "--apiurl",
@@ -192,6 +198,10 @@ class OscMainCommand(MainCommand):
         if conf.config["show_download_progress"]:
             self.download_progress = create_text_meter()
 
+        if getattr(args, "http_trace", None) and not self.http_trace:
+            from .connection import enable_http_trace
+            self.http_trace = enable_http_trace(args.http_trace)
+
         if not args.apiurl:
             self.parser.error("Could not determine apiurl, use -A/--apiurl to specify one")
 
@@ -797,6 +807,11 @@ class Osc(cmdln.Cmdln):
             action='store_true',
             help='debug HTTP traffic (filters no headers)',
         ))
+        arguments.append(dict(
+            names=['--http-trace'],
+            metavar='FILE',
+            help='write timing of HTTP requests to FILE as JSON lines and print a summary on exit',
+        ))
         arguments.append(dict(
             names=['--debug'],
             action='store_true',
@@ -2319,6 +2334,7 @@ Please submit there instead, or use --nodevelproject to force direct submission.
         from .core import server_diff
         from .core import show_devel_project
         from .core import show_upstream_rev
+        from .core import show_upstream_revs
         from .core import store_read_project
 
         actionxml = ""
@@ -2363,10 +2379,15 @@ Please submit there instead, or use --nodevelproject to force direct submission.
                     else:
                         print("Skipping package ", p, " since it is a source link pointing inside the project.")
 
+            if opts.revision:
+                revs = [opts.revision] * len(pac)
+            else:
+                revs = show_upstream_revs(apiurl, project, pac)
+
             # loop via all packages to do the action
-            for p in pac:
+            for p, rev in zip(pac, revs):
                 s = """<action type="submit"> <source project="%s" package="%s"  rev="%s"/> <target project="%s" package="%s"/> %s </action>""" % \
-                    (project, p, opts.revision or show_upstream_rev(apiurl, project, p), t, p, options_block)
+                    (project, p, rev, t, p, options_block)
                 actionxml += s
 
             # create submit requests for all found patchinfos
@@ -4367,7 +4388,7 @@ Please submit there instead, or use --nodevelproject to force direct submission.
         from .core import Project
         from .core import attribute_branch_pkg
         from .core import checkout_package
-        from .core import get_source_rev
+        from .core import get_source_revs
         from .core import meta_get_packagelist
         from .core import output
         from .core import slash_split
@@ -4401,10 +4422,13 @@ Please submit there instead, or use --nodevelproject to force direct submission.
             sys.exit(1)
 
         if opts.dryrun:
-            for r in result.findall('package'):
+            packages = result.findall('package')
+            if opts.version:
+                source_revs = get_source_revs(apiurl, [(r.get('project'), r.get('package')) for r in packages])
+            for num, r in enumerate(packages):
                 line = f"{r.get('project')}/{r.get('package')}"
                 if opts.version:
-                    sr = get_source_rev(apiurl, r.get('project'), r.get('package'))
+                    sr = source_revs[num]
                     version = sr.get('version')
                     if not version or version == 'unknown':
                         version = 'unknown'
@@ -5463,6 +5487,8 @@ Please submit there instead, or use --nodevelproject to force direct submission.
                         help='Skip all files with a given size')
     @cmdln.option('--native-obs-package', action='store_true',
                         help='Do not clone native scm repositories: Different representation and you will not be able to submit changes!')
+    @cmdln.option('-j', '--jobs', metavar='N', type=int, default=1,
+                        help='Check out N packages of a project concurrently')
     @cmdln.alias('co')
     def do_checkout(self, subcmd, opts, *args):
         """
@@ -5492,6 +5518,7 @@ Please submit there instead, or use --nodevelproject to force direct submission.
         """
 
         from . import conf
+        from . import output
         from .core import ET
         from .core import Linkinfo
         from .core import Project
@@ -5523,6 +5550,13 @@ Please submit there instead, or use --nodevelproject to force direct submission.
         if not args:
             self.argparse_error("Incorrect number of arguments.")
 
+        jobs = opts.jobs
+        if jobs < 1:
+            raise oscerr.WrongOptions('-j | --jobs must be a positive number')
+        if jobs > 1 and opts.source_service_files:
+            # running source services changes the current working directory of the whole process
+            raise oscerr.WrongOptions('-j | --jobs cannot be combined with -s | --source-service-files')
+
         # A DISTURL can be found in build results to be able to relocate the source used to build
         # obs://$OBS_INSTANCE/$PROJECT/$REPOSITORY/$XSRCMD5-$PACKAGE(:$FLAVOR)
         # obs://build.opensuse.org/openSUSE:11.3/standard/fc6c25e795a89503e99d59da5dc94a79-screen
@@ -5610,12 +5644,20 @@ Please submit there instead, or use --nodevelproject to force direct submission.
             if scm_url is not None:
                 return
 
-            # all packages
-            for package in meta_get_packagelist(apiurl, project):
+            # the packages are checked out concurrently, they must share the project object
+            # that serializes writing the _packages file
+            prj_obj = None
+            if conf.config['do_package_tracking']:
+                prj_obj = Project(prj_dir, getPackageList=False)
+
+            # progress bars of concurrent downloads would mix up
+            progress_obj = self.download_progress if jobs <= 1 else None
+            download_workers = Project.get_download_workers(jobs)
+
+            def checkout(package):
                 if opts.output_dir is not None:
                     outputdir = os.path.join(opts.output_dir, package)
-                    if not os.path.exists(opts.output_dir):
-                        os.mkdir(os.path.join(opts.output_dir))
+                    os.makedirs(opts.output_dir, exist_ok=True)
                 else:
                     outputdir = None
 
@@ -5627,25 +5669,30 @@ Please submit there instead, or use --nodevelproject to force direct submission.
                     if not li.haserror():
                         if li.project == project:
                             print(statfrmt('S', package + " link to package " + li.package))
-                            continue
+                            return
                 except:
                     pass
 
                 try:
                     checkout_package(apiurl, project, package, expand_link=expand_link,
-                                     prj_dir=prj_dir, service_files=opts.source_service_files,
+                                     prj_dir=prj_dir, prj_obj=prj_obj, service_files=opts.source_service_files,
                                      server_service_files=opts.server_side_source_service_files,
-                                     progress_obj=self.download_progress, size_limit=opts.limit_size,
-                                     meta=opts.meta, native_obs_package=opts.native_obs_package)
+                                     progress_obj=progress_obj, size_limit=opts.limit_size,
+                                     meta=opts.meta, native_obs_package=opts.native_obs_package,
+                                     download_workers=download_workers)
                 except oscerr.LinkExpandError as e:
                     print('Link cannot be expanded:\n', e, file=sys.stderr)
                     print('Use "osc repairlink" for fixing merge conflicts:\n', file=sys.stderr)
                     # check out in unexpanded form at least
                     checkout_package(apiurl, project, package, expand_link=False,
-                                     prj_dir=prj_dir, service_files=opts.source_service_files,
+                                     prj_dir=prj_dir, prj_obj=prj_obj, service_files=opts.source_service_files,
                                      server_service_files=opts.server_side_source_service_files,
-                                     progress_obj=self.download_progress, size_limit=opts.limit_size,
-                                     meta=opts.meta, native_obs_package=opts.native_obs_package)
+                                     progress_obj=progress_obj, size_limit=opts.limit_size,
+                                     meta=opts.meta, native_obs_package=opts.native_obs_package,
+                                     download_workers=download_workers)
+
+            # all packages
+            output.ordered_map(checkout, meta_get_packagelist(apiurl, project), jobs)
             if os.isatty(sys.stdout.fileno()):
                 print_request_list(apiurl, project)
 
@@ -6066,6 +6113,8 @@ Please submit there instead, or use --nodevelproject to force direct submission.
                         help='Use server side generated sources instead of local generation.')
     @cmdln.option('-l', '--limit-size', metavar='limit_size',
                         help='Skip all files with a given size')
+    @cmdln.option('-j', '--jobs', metavar='N', type=int, default=1,
+                        help='Update and check out N packages concurrently')
     @cmdln.alias('up')
     def do_update(self, subcmd, opts, *args):
         """
@@ -6089,14 +6138,20 @@ Please submit there instead, or use --nodevelproject to force direct submission.
         sources will be checked out. Without this option, the _link file and
         patches will be checked out. The option --unexpand-link can be used to
         switch back to the "raw" source with a _link file plus patch(es).
+
+        The --jobs option updates the packages concurrently. The output of
+        each package is printed at once after the package and all packages
+        before it have been updated.
         """
 
         from . import conf
+        from . import output
         from .core import ET
         from .core import Linkinfo
         from .core import Package
         from .core import Project
         from .core import checkRevision
+        from .core import get_project_sourceinfo
         from .core import is_project_dir
         from .core import parseRevisionOption
         from .core import parseargs
@@ -6113,6 +6168,9 @@ Please submit there instead, or use --nodevelproject to force direct submission.
                                       '--unexpand-link and are mutually '
                                       'exclusive.')
 
+        if opts.jobs < 1:
+            raise oscerr.WrongOptions('-j | --jobs must be a positive number')
+
         args = parseargs(args)
         arg_list = args[:]
 
@@ -6126,7 +6184,7 @@ Please submit there instead, or use --nodevelproject to force direct submission.
 
                 if conf.config['do_package_tracking']:
                     prj.update(expand_link=opts.expand_link,
-                               unexpand_link=opts.unexpand_link)
+                               unexpand_link=opts.unexpand_link, jobs=opts.jobs)
                     args.remove(arg)
                 else:
                     # if not tracking package, and 'update' is run inside a project dir,
@@ -6134,12 +6192,16 @@ Please submit there instead, or use --nodevelproject to force direct submission.
                     # (a) update all packages
                     args += prj.pacs_have
                     # (b) fetch new packages
-                    prj.checkout_missing_pacs(opts.expand_link, opts.unexpand_link)
+                    sinfos = get_project_sourceinfo(prj.apiurl, prj.name, True, *prj.pacs_missing) if prj.pacs_missing else {}
+                    prj.checkout_missing_pacs(sinfos, opts.expand_link, opts.unexpand_link, jobs=opts.jobs)
                     args.remove(arg)
                 print_request_list(prj.apiurl, prj.name)
 
         args.sort()
-        pacs = Package.from_paths(args, progress_obj=self.download_progress)
+        # progress bars of concurrent downloads would mix up
+        progress_obj = self.download_progress if opts.jobs <= 1 else None
+        download_workers = Project.get_download_workers(opts.jobs)
+        pacs = Package.from_paths(args, progress_obj=progress_obj)
 
         if opts.revision and len(args) == 1:
             rev, dummy = parseRevisionOption(opts.revision)
@@ -6171,7 +6233,7 @@ Please submit there instead, or use --nodevelproject to force direct submission.
         else:
             rev = None
 
-        for p in pacs:
+        def update_package(p):
             if len(pacs) > 1:
                 print(f'Updating {p.name}')
 
@@ -6187,28 +6249,31 @@ Please submit there instead, or use --nodevelproject to force direct submission.
             if p.scm_url:
                 print("Please use git to update package", p.name)
                 print("This git repository is hosted at", p.scm_url)
-                continue
+                return
 
-            if not rev:
+            # the revision is only given for a single package
+            pac_rev = rev
+            if not pac_rev:
                 if opts.expand_link:
-                    rev = p.latest_rev(expand=True)
+                    pac_rev = p.latest_rev(expand=True)
                     if p.islink() and not p.isexpanded():
-                        print('Expanding to rev', rev)
+                        print('Expanding to rev', pac_rev)
                 elif opts.unexpand_link and p.islink() and p.isexpanded():
-                    rev = show_upstream_rev(p.apiurl, p.prjname, p.name, meta=p.meta)
-                    print('Unexpanding to rev', rev)
+                    pac_rev = show_upstream_rev(p.apiurl, p.prjname, p.name, meta=p.meta)
+                    print('Unexpanding to rev', pac_rev)
                 elif (p.islink() and p.isexpanded()) or opts.server_side_source_service_files:
-                    rev = p.latest_rev(include_service_files=opts.server_side_source_service_files)
+                    pac_rev = p.latest_rev(include_service_files=opts.server_side_source_service_files)
 
-            p.update(rev, opts.server_side_source_service_files, opts.limit_size)
+            p.update(pac_rev, opts.server_side_source_service_files, opts.limit_size, download_workers=download_workers)
             if opts.source_service_files:
                 print('Running local source services')
                 p.run_source_services()
             if opts.unexpand_link:
                 p.unmark_frozen()
-            rev = None
             print_request_list(p.apiurl, p.prjname, p.name)
 
+        output.ordered_map(update_package, pacs, opts.jobs)
+
     @cmdln.option('-f', '--force', action='store_true',
                         help='forces removal of entire package and its files')
     @cmdln.alias('rm')
@@ -7714,6 +7779,8 @@ Please submit there instead, or use --nodevelproject to force direct submission.
                   dest='disable_cpio_bulk_download', help=argparse.SUPPRESS)
     @cmdln.option('--download-api-only', action='store_true',
                   help='only fetch packages from the api')
+    @cmdln.option('--download-jobs', metavar='N', type=int,
+                  help='download N packages in parallel (Global config in oscrc: download_workers)')
     @cmdln.option('--oldpackages', metavar='DIR',
                   help='take previous build from DIR (special values: _self, _link)')
     @cmdln.option('--verbose-mode', metavar='MODE',
@@ -8864,7 +8931,8 @@ Please submit there instead, or use --nodevelproject to force direct submission.
                                     package=pac,
                                     target_filename=fname,
                                     target_mtime=i.mtime,
-                                    progress_meter=not opts.quiet)
+                                    progress_meter=not opts.quiet,
+                                    target_size=i.size)
 
     @cmdln.option('-b', '--bugowner', action='store_true',
                         help='restrict listing to items where the user is bugowner')
@@ -9155,7 +9223,7 @@ Please submit there instead, or use --nodevelproject to force direct submission.
         from . import conf
         from .core import build_table
         from .core import filter_role
-        from .core import get_source_rev
+        from .core import get_source_revs
         from .core import search
         from .core import xpath_join
         from .gitea_api.cache import gitea_cache_search_projects
@@ -9280,8 +9348,8 @@ Please submit there instead, or use --nodevelproject to force direct submission.
         kind_map = {'published/binary/id': 'binary'}
         for kind, root in res.items():
             results = []
+            nodes = []
             for node in root.findall(kind_map.get(kind, kind)):
-                result = []
                 project = node.get('project')
                 package = None
                 if project is None:
@@ -9291,13 +9359,20 @@ Please submit there instead, or use --nodevelproject to force direct submission.
                         package = node.get('package')
                     else:
                         package = node.get('name')
+                nodes.append((node, project, package))
+
+            if opts.version:
+                packages = [(project, package) for node, project, package in nodes if package is not None]
+                source_revs = dict(zip(packages, get_source_revs(apiurl, packages)))
 
+            for node, project, package in nodes:
+                result = []
                 result.append(project)
                 if package is not None:
                     result.append(package)
 
                 if opts.version and package is not None:
-                    sr = get_source_rev(apiurl, project, package)
+                    sr = source_revs[(project, package)]
                     v = sr.get('version')
                     r = sr.get('rev')
                     s = sr.get('srcmd5')
@@ -0,0 +1,12 @@
+import osc.commandline
+
+
+class CacheCommand(osc.commandline.OscCommand):
+    """
+    Manage the package cache used by 'osc build'
+    """
+
+    name = "cache"
+
+    def run(self, args):
+        pass
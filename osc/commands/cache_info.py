@@ -0,0 +1,26 @@
+import osc.commandline
+
+
+class CacheInfoCommand(osc.commandline.OscCommand):
+    """
+    Show information about the package cache
+    """
+
+    name = "info"
+    parent = "CacheCommand"
+
+    def run(self, args):
+        from .. import conf
+        from ..output import KeyValueTable
+        from ..util.packagecache import PackageStore
+
+        store = PackageStore(conf.config["packagecachedir"])
+        max_size = conf.config["package_cache_max_size"]
+
+        table = KeyValueTable()
+        table.add("Directory", store.cachedir)
+        table.add("Packages", str(len(store)))
+        table.add("Links", str(store.links))
+        table.add("Size", f"{store.size // (1024 * 1024)} MiB")
+        table.add("Size limit", f"{max_size} MiB" if max_size else "unlimited")
+        print(str(table))
@@ -0,0 +1,41 @@
+import osc.commandline
+
+
+class CachePruneCommand(osc.commandline.OscCommand):
+    """
+    Remove the least recently used packages from the package cache
+    """
+
+    name = "prune"
+    parent = "CacheCommand"
+
+    def init_arguments(self):
+        self.add_argument(
+            "--max-size",
+            metavar="MiB",
+            type=int,
+            help="Prune the cache to the given size in MiB, 0 removes all packages (default: package_cache_max_size from the config)",
+        )
+        self.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Only report the packages that would be removed",
+        )
+
+    def run(self, args):
+        from .. import conf
+        from ..util.packagecache import PackageStore
+
+        max_size = args.max_size
+        if max_size is None:
+            max_size = conf.config["package_cache_max_size"]
+            if not max_size:
+                print("The package cache size is unlimited, specify --max-size or set 'package_cache_max_size' in the config")
+                return
+
+        store = PackageStore(conf.config["packagecachedir"])
+        evicted, freed = store.prune(max_size * 1024 * 1024, dry_run=args.dry_run)
+        store.save()
+
+        action = "Would remove" if args.dry_run else "Removed"
+        print(f"{action} {len(evicted)} packages ({freed // (1024 * 1024)} MiB) from {store.cachedir}")
@@ -395,6 +395,39 @@ class HostOptions(OscOptions):
         ini_type="newline-separated-list",
     )  # type: ignore[assignment]
 
+    http_cache: bool = Field(
+        default=False,
+        description=textwrap.dedent(
+            """
+            Cache project and package metadata, project config and build config on disk
+            under ``$XDG_CACHE_HOME/osc/http``.
+            Cached responses are revalidated with conditional requests (ETag, Last-Modified)
+            and they are not downloaded again unless they have changed.
+            """
+        ),
+    )  # type: ignore[assignment]
+
+    http_cache_ttl: int = Field(
+        default=0,
+        description=textwrap.dedent(
+            """
+            Number of seconds the responses cached by ``http_cache`` are used without asking the server if they have changed.
+            The default 0 revalidates the cached responses on each use.
+            """
+        ),
+    )  # type: ignore[assignment]
+
+    http_session_reuse: bool = Field(
+        default=False,
+        description=textwrap.dedent(
+            """
+            Resume the TLS session of the previous connections to the server when a new connection is opened.
+            A resumed session skips the certificate exchange and saves a round trip on TLSv1.2.
+            Some servers and TLS-terminating proxies don't handle the resumption well, that's why it is disabled by default.
+            """
+        ),
+    )  # type: ignore[assignment]
+
     trusted_prj: List[str] = Field(
         default=[],
         description=textwrap.dedent(
@@ -663,6 +696,17 @@ class Options(OscOptions):
         ),
     )  # type: ignore[assignment]
 
+    http_pool_size: int = Field(
+        default=10,
+        description=textwrap.dedent(
+            """
+            Number of connections kept open per server.
+            Set it to at least the number of HTTP requests sent concurrently from multiple threads,
+            otherwise the extra connections are closed after each request.
+            """
+        ),
+    )  # type: ignore[assignment]
+
     cookiejar: str = Field(
         default=os.path.join(xdg.XDG_STATE_HOME, "osc", "cookiejar"),
         description=textwrap.dedent(
@@ -782,6 +826,19 @@ class Options(OscOptions):
         ),
     )  # type: ignore[assignment]
 
+    checkout_cpio_bulk_download: bool = Field(
+        default=False,
+        description=textwrap.dedent(
+            """
+            Download the sources of a package as a single cpio archive on checkout and update
+            instead of sending a request per file.
+            The archive contains all files of the revision, it is used only if the files
+            that are not needed don't take more than half of its size.
+            Files missing in the archive are downloaded one by one.
+            """
+        ),
+    )  # type: ignore[assignment]
+
     status_mtime_heuristic: bool = Field(
         default=False,
         description=textwrap.dedent(
@@ -834,6 +891,44 @@ class Options(OscOptions):
         ini_key="packagecachedir",
     )  # type: ignore[assignment]
 
+    download_workers: int = Field(
+        default=4,
+        description=textwrap.dedent(
+            """
+            The number of packages downloaded in parallel when ``osc build`` updates the package cache.
+            Set to ``1`` to download the packages one by one.
+
+            This is only the default that can be overridden with ``osc build --download-jobs <VALUE>``.
+            """
+        ),
+    )  # type: ignore[assignment]
+
+    mirror_timeout: int = Field(
+        default=30,
+        description=textwrap.dedent(
+            """
+            Number of seconds after which ``osc build`` gives up on a mirror that doesn't respond
+            or stalls while downloading a package and tries the next mirror.
+            The mirrors are tried in the order of their measured performance.
+            Set to ``0`` to wait indefinitely.
+            """
+        ),
+    )  # type: ignore[assignment]
+
+    package_cache_max_size: int = Field(
+        default=0,
+        description=textwrap.dedent(
+            """
+            Maximum size of the package cache in MiB.
+            When exceeded, the least recently used packages are removed after ``osc build`` updates the cache.
+            Identical packages are stored only once, regardless of the project they were downloaded from.
+            Set to ``0`` to disable the limit.
+
+            The cache can be inspected with ``osc cache info`` and pruned with ``osc cache prune``.
+            """
+        ),
+    )  # type: ignore[assignment]
+
     no_verify: bool = Field(
         default=False,
         description=textwrap.dedent(
@@ -1,8 +1,13 @@
+import atexit
 import base64
 import contextlib
 import datetime
 import fcntl
+import hashlib
 import inspect
+import io
+import json
+import mmap
 import os
 import re
 import shutil
@@ -10,23 +15,28 @@ import subprocess
 import ssl
 import sys
 import tempfile
+import threading
 import time
 import warnings
 
 import http.client
 import http.cookiejar
+import urllib.error
 import urllib.parse
 import urllib.request
 import urllib3.exceptions
 import urllib3.poolmanager
 import urllib3.response
 import urllib3.util
+import urllib3.util.request
 
 from . import __version__
 from . import conf
 from . import oscerr
 from . import oscssl
 from . import output
+from .util import sshsig
+from .util import xdg
 from .util.helper import decode_it
 
 
@@ -51,6 +61,214 @@ def debug_timer(msg="The request took"):
         print(f"[{timestamp}] DEBUG:", msg, f"{duration:.4f}s", file=sys.stderr)
 
 
+# Functions called with a `HttpRequestTrace` after each request, see `add_http_request_hook()`.
+HTTP_REQUEST_HOOKS = []
+
+# Traces of the requests with a response body that hasn't been read completely yet.
+PENDING_TRACES = set()
+PENDING_TRACES_LOCK = threading.Lock()
+
+
+def add_http_request_hook(func):
+    """
+    Register a function that gets called with a ``HttpRequestTrace`` once a request sent by ``http_request()`` finishes.
+
+    A request finishes when its response body has been read completely or the response has been closed.
+    Requests that fail without a response finish immediately, the ``error`` attribute describes the error.
+    The hooks are called from the thread that sent the request or read the response.
+    """
+    HTTP_REQUEST_HOOKS.append(func)
+
+
+def remove_http_request_hook(func):
+    HTTP_REQUEST_HOOKS.remove(func)
+
+
+def url_template(url):
+    """
+    Return ``url`` with the names of projects, packages, files etc. replaced with ``*``
+    and with the query values removed, so the requests to the same API route can be grouped together.
+    The first path segment and the names starting with an underscore such as ``_meta`` are kept.
+    """
+    purl = urllib.parse.urlsplit(url)
+    segments = purl.path.split("/")
+    for num, segment in enumerate(segments):
+        if num <= 1 or not segment or segment.startswith("_"):
+            continue
+        segments[num] = "*"
+    result = "/".join(segments)
+    query_keys = sorted(set(key for key, _ in urllib.parse.parse_qsl(purl.query, keep_blank_values=True)))
+    if query_keys:
+        result += "?" + "&".join(query_keys)
+    if not conf.extract_known_apiurl(url):
+        # requests outside apiurl such as downloads from mirrors
+        result = f"{purl.scheme}://{purl.netloc}{result}"
+    return result
+
+
+class HttpRequestTrace:
+    """
+    Timing of a request sent by ``http_request()``.
+    The times are in seconds, measured from sending the request.
+
+    :ivar method: HTTP request method.
+    :ivar url: The requested URL.
+    :ivar url_template: The URL with the names replaced by placeholders, see ``url_template()``.
+    :ivar status: HTTP status of the response or ``None`` if there was no response.
+    :ivar bytes: Number of bytes of the response body received from the server.
+    :ivar ttfb: Time to the first byte, the response headers have been received.
+    :ivar total: Time until the response body has been read or the response has been closed.
+    :ivar retries: Number of repeated requests, including re-sending the request after authentication.
+    :ivar error: Description of the error if the request failed without a response.
+    """
+
+    def __init__(self, method, url):
+        self.method = method
+        self.url = url
+        self.url_template = url_template(url)
+        self.status = None
+        self.bytes = 0
+        self.ttfb = None
+        self.total = None
+        self.retries = 0
+        self.error = None
+        self._start = time.perf_counter()
+        self._response = None
+        self._finished = False
+        self._lock = threading.Lock()
+
+    def to_dict(self):
+        return {
+            "method": self.method,
+            "url": self.url,
+            "url_template": self.url_template,
+            "status": self.status,
+            "bytes": self.bytes,
+            "ttfb": self.ttfb,
+            "total": self.total,
+            "retries": self.retries,
+            "error": self.error,
+        }
+
+    def _response_received(self, response):
+        self.ttfb = time.perf_counter() - self._start
+        self.status = response.status
+        history = getattr(getattr(response, "retries", None), "history", None)
+        if history:
+            self.retries += len(history)
+        self._response = response
+
+        with PENDING_TRACES_LOCK:
+            PENDING_TRACES.add(self)
+
+        # urllib3 releases the connection once the response body has been read
+        for name in ("release_conn", "close"):
+            orig_func = getattr(response, name)
+
+            def func(*args, _orig_func=orig_func, **kwargs):
+                try:
+                    return _orig_func(*args, **kwargs)
+                finally:
+                    self.finish()
+
+            setattr(response, name, func)
+
+    def finish(self):
+        """
+        Record the total time and call the hooks. Only the first call has any effect.
+        """
+        with self._lock:
+            if self._finished:
+                return
+            self._finished = True
+
+        self.total = time.perf_counter() - self._start
+        if self._response is not None:
+            try:
+                self.bytes = self._response.tell()
+            except Exception:  # pylint: disable=broad-except
+                pass
+            self._response = None
+        with PENDING_TRACES_LOCK:
+            PENDING_TRACES.discard(self)
+        for hook in list(HTTP_REQUEST_HOOKS):
+            hook(self)
+
+
+def finish_pending_http_traces():
+    """
+    Finish the traces of responses that haven't been read completely, such as on exit.
+    """
+    with PENDING_TRACES_LOCK:
+        traces = list(PENDING_TRACES)
+    for trace in traces:
+        trace.finish()
+
+
+class HttpTraceWriter:
+    """
+    Request hook that writes the traces to a file as JSON lines and collects stats for ``print_summary()``.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.file = open(path, "w", encoding="utf-8")
+        self._lock = threading.Lock()
+        # {(method, url_template): [count, errors, bytes, total, max]}
+        self.stats = {}
+
+    def __call__(self, trace):
+        line = json.dumps(trace.to_dict())
+        with self._lock:
+            if self.file:
+                self.file.write(line + "\n")
+                self.file.flush()
+            stats = self.stats.setdefault((trace.method, trace.url_template), [0, 0, 0, 0.0, 0.0])
+            stats[0] += 1
+            if trace.error or not trace.status or trace.status >= 400:
+                stats[1] += 1
+            stats[2] += trace.bytes
+            stats[3] += trace.total
+            stats[4] = max(stats[4], trace.total)
+
+    def close(self):
+        finish_pending_http_traces()
+        with self._lock:
+            if self.file:
+                self.file.close()
+                self.file = None
+
+    def print_summary(self, file=None):
+        """
+        Print a table of the requests grouped by the method and the URL template, the slowest ones first.
+        """
+        file = file or sys.stderr
+        rows = sorted(self.stats.items(), key=lambda item: item[1][3], reverse=True)
+        if not rows:
+            return
+        print(f"{'count':>6} {'errors':>6} {'total':>9} {'avg':>8} {'max':>8} {'bytes':>11}  request", file=file)
+        for (method, template), (count, errors, size, total, max_time) in rows:
+            print(f"{count:>6} {errors:>6} {total:>8.3f}s {total / count:>7.3f}s {max_time:>7.3f}s {size:>11}  {method} {template}", file=file)
+        count = sum(i[0] for i in self.stats.values())
+        total = sum(i[3] for i in self.stats.values())
+        print(f"{count:>6} requests took {total:.3f}s in total", file=file)
+
+
+def enable_http_trace(path):
+    """
+    Write traces of all requests to ``path`` as JSON lines and print a summary to stderr on exit.
+    """
+    writer = HttpTraceWriter(path)
+    add_http_request_hook(writer)
+
+    def on_exit():
+        writer.close()
+        writer.print_summary()
+
+    atexit.register(on_exit)
+    return writer
+
+
 class MockRequest:
     """
     Mock a request object for `cookiejar.extract_cookies()`
@@ -144,6 +362,27 @@ def get_proxy_manager(env):
 CONNECTION_POOLS = {}
 
 
+# Guards creating the connection pools and auth handlers when `http_request()` is called from multiple threads.
+CONNECTION_POOLS_LOCK = threading.RLock()
+
+
+# Content encodings of the responses from apiurl, see `http_request()`.
+# zstd is decoded by urllib3 2 only if the zstandard module is installed.
+ACCEPT_ENCODING = ",".join(
+    encoding
+    for encoding in ("zstd", "gzip")
+    if encoding in getattr(urllib3.util.request, "ACCEPT_ENCODING", "gzip").split(",")
+)
+
+
+# Auth handlers per apiurl, see `_get_auth_handlers()`.
+AUTH_HANDLERS = {}
+
+
+# Format version of the files in the http cache, see `http_GET_cached()`.
+HTTP_CACHE_VERSION = 1
+
+
 # Pool manager for requests outside apiurls.
 POOL_MANAGER = urllib3.PoolManager()
 
@@ -160,99 +399,55 @@ def http_request_wrap_file(func):
     """
     Turn file path into a file object and close it automatically
     by using a context manager.
+
+    Regular files are memory-mapped and sent as data in the request body.
+    The mapped file is passed to the socket at once without reading it in python,
+    the contents of the file must not change during the request.
     """
-    def new_func(method, url, headers=None, data=None, file=None):
+    def new_func(method, url, headers=None, data=None, file=None, timeout=None):
         if file:
             with open(file, "rb") as f:
-                return func(method, url, headers, data, file=f)
+                mm = None
+                if not data:
+                    try:
+                        if os.fstat(f.fileno()).st_size > 0:
+                            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                    except (OSError, ValueError):
+                        # files that cannot be mapped such as pipes are read
+                        pass
+                if mm is None:
+                    return func(method, url, headers, data, file=f, timeout=timeout)
+                # urllib3 reads objects with read() in small blocks, pass a memoryview that it sends as a whole
+                mv = memoryview(mm)
+                try:
+                    return func(method, url, headers, data=mv, file=None, timeout=timeout)
+                finally:
+                    try:
+                        mv.release()
+                        mm.close()
+                    except BufferError:
+                        # still referenced, it gets closed when released
+                        pass
         else:
-            return func(method, url, headers, data, file)
+            return func(method, url, headers, data, file, timeout=timeout)
 
     new_func.__name__ = func.__name__
     new_func.__doc__ = func.__doc__
     return new_func
 
 
-@http_request_wrap_file
-def http_request(method: str, url: str, headers=None, data=None, file=None):
+def _create_connection_pool(apiurl, purl, url, options):
     """
-    Send a HTTP request to a server.
-
-    Features:
-    * Authentication ([apiurl]/{user,pass} in oscrc)
-    * Session cookie support (~/.local/state/osc/cookiejar)
-    * SSL certificate verification incl. managing trusted certs
-    * SSL certificate verification bypass (if [apiurl]/sslcertck=0 in oscrc)
-    * Expired SSL certificates are no longer accepted. Either prolong them or set sslcertck=0.
-    * Proxy support (HTTPS_PROXY env, NO_PROXY is respected)
-    * Retries (http_retries in oscrc)
-    * Requests outside apiurl (incl. proxy support)
-    * Connection debugging (-H/--http-debug, --http-full-debug)
-
-    :param method: HTTP request method (such as GET, POST, PUT, DELETE).
-    :param url: The URL to perform the request on.
-    :param headers: Dictionary of custom headers to send.
-    :param data: Data to send in the request body (conflicts with `file`).
-    :param file: Path to a file to send as data in the request body (conflicts with `data`).
+    Create a connection pool for ``apiurl`` or return the existing one
+    if it has been created by a different thread in the meantime.
     """
+    with CONNECTION_POOLS_LOCK:
+        pool = CONNECTION_POOLS.get(apiurl, None)
+        if pool:
+            return pool
 
-    purl = urllib3.util.parse_url(url)
-    apiurl = conf.extract_known_apiurl(url)
-    headers = urllib3.response.HTTPHeaderDict(headers or {})
-
-    # identify osc
-    headers.update(urllib3.make_headers(user_agent=f"osc/{__version__}"))
-
-    if data and file:
-        raise RuntimeError('Specify either `data` or `file`')
-    elif data:
-        if hasattr(data, "encode"):
-            data = data.encode("utf-8")
-        content_length = len(data)
-    elif file:
-        content_length = os.fstat(file.fileno()).st_size
-        data = file
-    else:
-        content_length = 0
-
-    if content_length:
-        headers.add("Content-Length", str(content_length))
-
-    # handle requests that go outside apiurl
-    # do not set auth cookie or auth credentials
-    if not apiurl:
-        if purl.scheme == "http" and HTTP_PROXY_MANAGER and not urllib.request.proxy_bypass(url):
-            # connection through proxy
-            manager = HTTP_PROXY_MANAGER
-        elif purl.scheme == "https" and HTTPS_PROXY_MANAGER and not urllib.request.proxy_bypass(url):
-            # connection through proxy
-            manager = HTTPS_PROXY_MANAGER
-        else:
-            # direct connection
-            manager = POOL_MANAGER
-
-        with debug_timer():
-            response = manager.urlopen(method, url, body=data, headers=headers, preload_content=False)
-
-        if response.status / 100 != 2:
-            raise urllib.error.HTTPError(url, response.status, response.reason, response.headers, response)
-
-        return response
-
-    options = conf.config["api_host_options"][apiurl]
-
-    if options.http_headers:
-        new_headers = urllib3.response.HTTPHeaderDict()
-        # user-defined headers from the config file
-        new_headers.update(options.http_headers)
-        # original ``headers`` (Content-Length, User-Agent) must prevail over user-defined headers
-        new_headers.update(headers)
-        headers = new_headers
-
-    global CONNECTION_POOLS
-    pool = CONNECTION_POOLS.get(apiurl, None)
-    if not pool:
         pool_kwargs = {}
+        pool_kwargs["maxsize"] = int(conf.config["http_pool_size"])
 
         # urllib3.Retry() argument 'method_whitelist' got renamed to 'allowed_methods'
         sig = inspect.signature(urllib3.Retry)
@@ -276,7 +471,8 @@ def http_request(method: str, url: str, headers=None, data=None, file=None):
         )
 
         if purl.scheme == "https":
-            ssl_context = oscssl.create_ssl_context()
+            # the new connections of the pool can resume the TLS session to reduce the connection setup time
+            ssl_context = oscssl.create_ssl_context(session_reuse=options["http_session_reuse"])
             ssl_context.load_default_certs()
             pool_kwargs["ssl_context"] = ssl_context
             # turn cert verification off if sslcertck = 0
@@ -326,96 +522,254 @@ def http_request(method: str, url: str, headers=None, data=None, file=None):
             pool.trusted_cert_store = oscssl.TrustedCertStore(ssl_context, purl.host, purl.port)
 
         CONNECTION_POOLS[apiurl] = pool
+        return pool
 
-    auth_handlers = [
-        CookieJarAuthHandler(apiurl, os.path.expanduser(conf.config["cookiejar"])),
-        SignatureAuthHandler(apiurl, options["user"], options["sshkey"], options["pass"]),
-        BasicAuthHandler(apiurl, options["user"], options["pass"]),
-    ]
-
-    for handler in auth_handlers:
-        # authenticate using a cookie (if available)
-        success = handler.set_request_headers(url, headers)
-        if success:
-            break
-
-    # Rails sends a html response if the header is not set
-    # https://github.com/openSUSE/open-build-service/pull/13019
-    headers.add("Accept", "application/xml")
-
-    if method == "PUT" or (method == "POST" and (data or file)):
-        headers.add("Content-Type", "application/xml; charset=utf-8")
-    elif method == "POST":
-        headers.add("Content-Type", "application/x-www-form-urlencoded")
-
-    if purl.scheme == "http" and HTTP_PROXY_MANAGER:
-        # HTTP proxy requires full URL with 'same host' checking off
-        urlopen_url = url
-        assert_same_host = False
-    else:
-        # everything else is fine with path only
-        # join path and query, ignore the remaining args; args are (scheme, netloc, path, query, fragment)
-        urlopen_url = urllib.parse.urlunsplit(("", "", purl.path, purl.query, ""))
-        assert_same_host = True
 
-    if int(conf.config['http_debug']):
-        # use the hacked print() for consistency
-        http.client.print(40 * '-')
-        http.client.print(method, url)
+def _get_auth_handlers(apiurl, options):
+    """
+    Return the auth handlers for ``apiurl``.
+    They are created once per config and reused by the following requests.
+    """
+    cookiejar_path = os.path.expanduser(conf.config["cookiejar"])
+
+    def get_cached():
+        # the config is compared by identity, loading a new config creates new handlers
+        config, path, auth_handlers = AUTH_HANDLERS.get(apiurl, (None, None, None))
+        if config is conf.config and path == cookiejar_path:
+            return auth_handlers
+        return None
+
+    auth_handlers = get_cached()
+    if auth_handlers:
+        return auth_handlers
+
+    with CONNECTION_POOLS_LOCK:
+        auth_handlers = get_cached()
+        if not auth_handlers:
+            auth_handlers = [
+                CookieJarAuthHandler(apiurl, cookiejar_path),
+                SignatureAuthHandler(apiurl, options["user"], options["sshkey"], options["pass"]),
+                BasicAuthHandler(apiurl, options["user"], options["pass"]),
+            ]
+            AUTH_HANDLERS[apiurl] = (conf.config, cookiejar_path, auth_handlers)
+    return auth_handlers
+
+
+@http_request_wrap_file
+def http_request(method: str, url: str, headers=None, data=None, file=None, timeout=None):
+    """
+    Send a HTTP request to a server.
+
+    Features:
+    * Authentication ([apiurl]/{user,pass} in oscrc)
+    * Session cookie support (~/.local/state/osc/cookiejar)
+    * SSL certificate verification incl. managing trusted certs
+    * SSL certificate verification bypass (if [apiurl]/sslcertck=0 in oscrc)
+    * Expired SSL certificates are no longer accepted. Either prolong them or set sslcertck=0.
+    * Proxy support (HTTPS_PROXY env, NO_PROXY is respected)
+    * Retries (http_retries in oscrc)
+    * Requests outside apiurl (incl. proxy support)
+    * Connection debugging (-H/--http-debug, --http-full-debug)
+    * Compressed responses from apiurl (gzip, zstd), except for range requests
+    * Thread safety
+    * Request tracing (--http-trace, see ``add_http_request_hook()``)
+
+    The function can be called from multiple threads.
+    The connections to a server are reused from a pool of up to ``http_pool_size`` (see oscrc) connections.
+    The session cookies are shared among the threads; when there's no valid cookie yet,
+    the first request authenticates and the concurrent requests wait for its session cookie
+    rather than authenticating again.
+
+    :param method: HTTP request method (such as GET, POST, PUT, DELETE).
+    :param url: The URL to perform the request on.
+    :param headers: Dictionary of custom headers to send.
+    :param data: Data to send in the request body (conflicts with `file`).
+    :param file: Path to a file to send as data in the request body (conflicts with `data`).
+    :param timeout: Number of seconds to wait for connecting to the server and for each read from the connection.
+    """
+    if not HTTP_REQUEST_HOOKS:
+        return _http_request(method, url, headers=headers, data=data, file=file, timeout=timeout)
 
+    trace = HttpRequestTrace(method, url)
     try:
-        with debug_timer():
-            response = pool.urlopen(
-                method, urlopen_url, body=data, headers=headers,
-                preload_content=False, assert_same_host=assert_same_host
-            )
-    except urllib3.exceptions.MaxRetryError as e:
-        if not isinstance(e.reason, urllib3.exceptions.SSLError):
-            # re-raise exceptions that are not related to SSL
-            raise
-        # ssl.SSLCertVerificationError doesn't exist on python 3.6
-        # ssl.CertificateError is an alias for ssl.SSLCertVerificationError on python 3.7+
-        if isinstance(e.reason.args[0], ssl.CertificateError):
-            self_signed_verify_codes = (
-                oscssl.X509_V_ERR_DEPTH_ZERO_SELF_SIGNED_CERT,
-                oscssl.X509_V_ERR_SELF_SIGNED_CERT_IN_CHAIN,
-            )
-            if e.reason.args[0].verify_code not in self_signed_verify_codes:
-                # re-raise ssl exceptions that are not related to self-signed certs
-                raise e.reason.args[0] from None
-        else:
-            # re-raise other than ssl exceptions
-            raise e.reason.args[0] from None
+        response = _http_request(method, url, headers=headers, data=data, file=file, timeout=timeout, trace=trace)
+    except urllib.error.HTTPError as e:
+        trace._response_received(e.fp)
+        raise
+    except BaseException as e:
+        trace.error = f"{type(e).__name__}: {e}"
+        trace.finish()
+        raise
+    trace._response_received(response)
+    return response
+
 
-        # get the untrusted certificated from server
-        cert = pool.trusted_cert_store.get_server_certificate()
+def _http_request(method: str, url: str, headers=None, data=None, file=None, timeout=None, trace=None):
 
-        # prompt user if we should trust the certificate
-        pool.trusted_cert_store.prompt_trust(cert, reason=e.reason)
+    purl = urllib3.util.parse_url(url)
+    apiurl = conf.extract_known_apiurl(url)
+    headers = urllib3.response.HTTPHeaderDict(headers or {})
+
+    # identify osc
+    headers.update(urllib3.make_headers(user_agent=f"osc/{__version__}"))
+
+    if data and file:
+        raise RuntimeError('Specify either `data` or `file`')
+    elif data:
+        if hasattr(data, "encode"):
+            data = data.encode("utf-8")
+        content_length = len(data)
+    elif file:
+        content_length = os.fstat(file.fileno()).st_size
+        data = file
+    else:
+        content_length = 0
+
+    if content_length:
+        headers.add("Content-Length", str(content_length))
+
+    urlopen_kwargs = {}
+    if timeout:
+        urlopen_kwargs["timeout"] = urllib3.Timeout(connect=timeout, read=timeout)
+
+    # handle requests that go outside apiurl
+    # do not set auth cookie or auth credentials
+    if not apiurl:
+        if purl.scheme == "http" and HTTP_PROXY_MANAGER and not urllib.request.proxy_bypass(url):
+            # connection through proxy
+            manager = HTTP_PROXY_MANAGER
+        elif purl.scheme == "https" and HTTPS_PROXY_MANAGER and not urllib.request.proxy_bypass(url):
+            # connection through proxy
+            manager = HTTPS_PROXY_MANAGER
+        else:
+            # direct connection
+            manager = POOL_MANAGER
 
-        if hasattr(data, 'seek'):
-            data.seek(0)
+        with CONNECTION_POOLS_LOCK:
+            # the pools are created by the manager, only their size can be configured
+            manager.connection_pool_kw["maxsize"] = int(conf.config["http_pool_size"])
 
         with debug_timer():
-            response = pool.urlopen(
-                method, urlopen_url, body=data, headers=headers,
-                preload_content=False, assert_same_host=assert_same_host
-            )
+            response = manager.urlopen(method, url, body=data, headers=headers, preload_content=False, **urlopen_kwargs)
+
+        if response.status / 100 != 2:
+            raise urllib.error.HTTPError(url, response.status, response.reason, response.headers, response)
 
-    if response.status == 401:
-        # session cookie has expired, re-authenticate
+        return response
+
+    options = conf.config["api_host_options"][apiurl]
+
+    if options.http_headers:
+        new_headers = urllib3.response.HTTPHeaderDict()
+        # user-defined headers from the config file
+        new_headers.update(options.http_headers)
+        # original ``headers`` (Content-Length, User-Agent) must prevail over user-defined headers
+        new_headers.update(headers)
+        headers = new_headers
+
+    global CONNECTION_POOLS
+    pool = CONNECTION_POOLS.get(apiurl, None)
+    if not pool:
+        pool = _create_connection_pool(apiurl, purl, url, options)
+
+    auth_handlers = _get_auth_handlers(apiurl, options)
+
+    try:
         for handler in auth_handlers:
-            success = handler.set_request_headers_after_401(url, headers, response)
+            # authenticate using a cookie (if available)
+            success = handler.set_request_headers(url, headers)
             if success:
                 break
-        if hasattr(data, 'seek'):
-            data.seek(0)
-        with debug_timer():
-            response = pool.urlopen(method, urlopen_url, body=data, headers=headers, preload_content=False)
 
-    # we want to save a session cookie before an exception is raised on failed requests
-    for handler in auth_handlers:
-        handler.process_response(url, headers, response)
+        # Rails sends a html response if the header is not set
+        # https://github.com/openSUSE/open-build-service/pull/13019
+        headers.add("Accept", "application/xml")
+
+        # ask for a compressed response; urllib3 decodes it transparently while reading
+        # the offsets of a range request apply to the encoded data, keep such responses uncompressed
+        if "Accept-Encoding" not in headers and "Range" not in headers:
+            headers.add("Accept-Encoding", ACCEPT_ENCODING)
+
+        if method == "PUT" or (method == "POST" and (data or file)):
+            headers.add("Content-Type", "application/xml; charset=utf-8")
+        elif method == "POST":
+            headers.add("Content-Type", "application/x-www-form-urlencoded")
+
+        if purl.scheme == "http" and HTTP_PROXY_MANAGER:
+            # HTTP proxy requires full URL with 'same host' checking off
+            urlopen_url = url
+            assert_same_host = False
+        else:
+            # everything else is fine with path only
+            # join path and query, ignore the remaining args; args are (scheme, netloc, path, query, fragment)
+            urlopen_url = urllib.parse.urlunsplit(("", "", purl.path, purl.query, ""))
+            assert_same_host = True
+
+        if int(conf.config['http_debug']):
+            # use the hacked print() for consistency
+            http.client.print(40 * '-')
+            http.client.print(method, url)
+
+        try:
+            with debug_timer():
+                response = pool.urlopen(
+                    method, urlopen_url, body=data, headers=headers,
+                    preload_content=False, assert_same_host=assert_same_host, **urlopen_kwargs
+                )
+        except urllib3.exceptions.MaxRetryError as e:
+            if not isinstance(e.reason, urllib3.exceptions.SSLError):
+                # re-raise exceptions that are not related to SSL
+                raise
+            # ssl.SSLCertVerificationError doesn't exist on python 3.6
+            # ssl.CertificateError is an alias for ssl.SSLCertVerificationError on python 3.7+
+            if isinstance(e.reason.args[0], ssl.CertificateError):
+                self_signed_verify_codes = (
+                    oscssl.X509_V_ERR_DEPTH_ZERO_SELF_SIGNED_CERT,
+                    oscssl.X509_V_ERR_SELF_SIGNED_CERT_IN_CHAIN,
+                )
+                if e.reason.args[0].verify_code not in self_signed_verify_codes:
+                    # re-raise ssl exceptions that are not related to self-signed certs
+                    raise e.reason.args[0] from None
+            else:
+                # re-raise other than ssl exceptions
+                raise e.reason.args[0] from None
+
+            # get the untrusted certificated from server
+            cert = pool.trusted_cert_store.get_server_certificate()
+
+            # prompt user if we should trust the certificate
+            pool.trusted_cert_store.prompt_trust(cert, reason=e.reason)
+
+            if hasattr(data, 'seek'):
+                data.seek(0)
+
+            with debug_timer():
+                response = pool.urlopen(
+                    method, urlopen_url, body=data, headers=headers,
+                    preload_content=False, assert_same_host=assert_same_host, **urlopen_kwargs
+                )
+
+        if response.status == 401:
+            # session cookie has expired, re-authenticate
+            if trace:
+                trace.retries += 1
+            for handler in auth_handlers:
+                success = handler.set_request_headers_after_401(url, headers, response)
+                if success:
+                    break
+            if hasattr(data, 'seek'):
+                data.seek(0)
+            with debug_timer():
+                response = pool.urlopen(method, urlopen_url, body=data, headers=headers, preload_content=False, **urlopen_kwargs)
+
+        # we want to save a session cookie before an exception is raised on failed requests
+        for handler in auth_handlers:
+            handler.process_response(url, headers, response)
+    except BaseException:
+        # release the cookiejar lock so the other threads and processes are not blocked forever
+        for handler in auth_handlers:
+            handler.cleanup()
+        raise
 
     if response.status / 100 != 2:
         raise urllib.error.HTTPError(url, response.status, response.reason, response.headers, response)
@@ -443,6 +797,102 @@ def http_DELETE(*args, **kwargs):
     return http_request("DELETE", *args, **kwargs)
 
 
+def _http_cache_path(apiurl, url):
+    user = conf.config["api_host_options"][apiurl]["user"] or ""
+    key = hashlib.sha256(f"{user}\n{url}".encode("utf-8")).hexdigest()
+    return os.path.join(os.path.expanduser(xdg.XDG_CACHE_HOME), "osc", "http", key[:2], key)
+
+
+def _http_cache_read(path):
+    """
+    Return the cache entry and the cached body or ``(None, None)`` if there's no valid entry.
+    The cache file consists of a line with the entry in json followed by the body.
+    """
+    try:
+        with open(path, "rb") as f:
+            entry = json.loads(f.readline())
+            body = f.read()
+    except (OSError, ValueError):
+        return None, None
+    if not isinstance(entry, dict) or entry.get("version") != HTTP_CACHE_VERSION:
+        return None, None
+    return entry, body
+
+
+def _http_cache_write(path, entry, body):
+    # failures are ignored, the cache only saves downloading the data again
+    try:
+        # the cached data may be visible only to the authenticated user
+        os.makedirs(os.path.dirname(path), mode=0o700, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(prefix=".osc-http-", dir=os.path.dirname(path))
+    except OSError:
+        return
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(json.dumps(entry).encode("utf-8") + b"\n")
+            f.write(body)
+        os.replace(tmp_path, path)
+    except OSError:
+        pass
+    finally:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+
+
+def http_GET_cached(url):
+    """
+    Send a GET request to a server and cache the response on disk
+    if the ``http_cache`` option is enabled for the apiurl the ``url`` belongs to.
+
+    A cached response is returned without contacting the server for ``http_cache_ttl`` seconds.
+    After that, it is revalidated with a conditional request (If-None-Match, If-Modified-Since)
+    and downloaded again only if it has changed.
+
+    :returns: File object with the response body.
+    """
+    apiurl = conf.extract_known_apiurl(url)
+    host_options = conf.config["api_host_options"].get(apiurl, None) if apiurl else None
+    if not host_options or not host_options["http_cache"]:
+        return http_GET(url)
+
+    path = _http_cache_path(apiurl, url)
+    entry, body = _http_cache_read(path)
+    if entry is not None and entry["url"] != url:
+        entry, body = None, None
+
+    headers = {}
+    if entry is not None:
+        if time.time() - entry["time"] < int(host_options["http_cache_ttl"]):
+            return io.BytesIO(body)
+        if entry["etag"]:
+            headers["If-None-Match"] = entry["etag"]
+        if entry["last_modified"]:
+            headers["If-Modified-Since"] = entry["last_modified"]
+
+    try:
+        with http_GET(url, headers=headers) as f:
+            new_body = f.read()
+            response_headers = f.headers
+    except urllib.error.HTTPError as e:
+        if e.code != 304 or entry is None:
+            raise
+        # not modified, use the cached body
+        entry["time"] = time.time()
+        _http_cache_write(path, entry, body)
+        return io.BytesIO(body)
+
+    entry = {
+        "version": HTTP_CACHE_VERSION,
+        "url": url,
+        "time": time.time(),
+        "etag": response_headers.get("ETag", None),
+        "last_modified": response_headers.get("Last-Modified", None),
+    }
+    if entry["etag"] or entry["last_modified"] or int(host_options["http_cache_ttl"]):
+        _http_cache_write(path, entry, new_body)
+    return io.BytesIO(new_body)
+
+
 class AuthHandlerBase:
     def __init__(self, apiurl):
         self.apiurl = apiurl
@@ -497,55 +947,137 @@ class AuthHandlerBase:
         """
         raise NotImplementedError
 
+    def cleanup(self):
+        """
+        Release resources such as locks if the request failed before `process_response()` was called.
+        """
+        pass
+
 
 class CookieJarAuthHandler(AuthHandlerBase):
     # Shared among instances, instantiate on first use, key equals to cookiejar path.
     COOKIEJARS = {}
 
+    # Guards COOKIEJARS and saving the cookiejars when requests are sent from multiple threads.
+    # Adding and extracting cookies is thread-safe thanks to the cookiejar's own lock.
+    COOKIEJARS_LOCK = threading.RLock()
+
+    # Paths of the cookiejars with changes that haven't been saved yet, see `save_cookiejars()`.
+    COOKIEJARS_DIRTY = set()
+
+    # Threads that have no cookie wait until the first request to the server finishes,
+    # that's usually enough to obtain a session cookie and avoid authenticating in every thread.
+    # Key equals to cookiejar path.
+    FIRST_REQUEST_LOCKS = {}
+    FIRST_REQUEST_DONE = set()
+
     def __init__(self, apiurl, cookiejar_path):
         super().__init__(apiurl)
         self.cookiejar_path = cookiejar_path
-        if self.cookiejar_path in self.COOKIEJARS:
-            self.cookiejar_lock_path = None
-        else:
-            # Cookiejar hasn't been loaded yet, let's lock it to avoid
-            # doing expensive signature auth in multiple processes.
-            # This usually happens when a user runs multiple osc instances
-            # from the command-line in parallel.
-            self.cookiejar_lock_path = f"{self.cookiejar_path}.lock"
-        self.cookiejar_lock_fd = None
+        # the handler is shared by the threads, the locks held during a request are per thread
+        self._request_state = threading.local()
+
+    @property
+    def first_request_lock(self):
+        return getattr(self._request_state, "first_request_lock", None)
+
+    @first_request_lock.setter
+    def first_request_lock(self, value):
+        self._request_state.first_request_lock = value
+
+    @property
+    def cookiejar_lock_fd(self):
+        return getattr(self._request_state, "cookiejar_lock_fd", None)
+
+    @cookiejar_lock_fd.setter
+    def cookiejar_lock_fd(self, value):
+        self._request_state.cookiejar_lock_fd = value
 
     @property
     def _cookiejar(self):
         jar = self.COOKIEJARS.get(self.cookiejar_path, None)
-        if not jar:
-            try:
-                os.makedirs(os.path.dirname(self.cookiejar_path), mode=0o700)
-            except FileExistsError:
-                pass
-            jar = http.cookiejar.LWPCookieJar(self.cookiejar_path)
-            if os.path.isfile(self.cookiejar_path):
+        if jar:
+            return jar
+        with self.COOKIEJARS_LOCK:
+            jar = self.COOKIEJARS.get(self.cookiejar_path, None)
+            if not jar:
                 try:
-                    jar.load()
-                except http.cookiejar.LoadError:
+                    os.makedirs(os.path.dirname(self.cookiejar_path), mode=0o700)
+                except FileExistsError:
                     pass
-            self.COOKIEJARS[self.cookiejar_path] = jar
+                jar = http.cookiejar.LWPCookieJar(self.cookiejar_path)
+                if os.path.isfile(self.cookiejar_path):
+                    try:
+                        jar.load()
+                    except http.cookiejar.LoadError:
+                        pass
+                self.COOKIEJARS[self.cookiejar_path] = jar
         return jar
 
     def _lock(self):
-        if self.cookiejar_lock_path:
-            try:
-                os.makedirs(os.path.dirname(self.cookiejar_lock_path), mode=0o700)
-            except FileExistsError:
-                pass
-            self.cookiejar_lock_fd = open(self.cookiejar_lock_path, "w")
-            fcntl.flock(self.cookiejar_lock_fd, fcntl.LOCK_EX)
+        if self.cookiejar_path in self.COOKIEJARS:
+            return
+        # Cookiejar hasn't been loaded yet, let's lock it to avoid
+        # doing expensive signature auth in multiple processes.
+        # This usually happens when a user runs multiple osc instances
+        # from the command-line in parallel.
+        cookiejar_lock_path = f"{self.cookiejar_path}.lock"
+        try:
+            os.makedirs(os.path.dirname(cookiejar_lock_path), mode=0o700)
+        except FileExistsError:
+            pass
+        self.cookiejar_lock_fd = open(cookiejar_lock_path, "w")
+        fcntl.flock(self.cookiejar_lock_fd, fcntl.LOCK_EX)
 
     def _unlock(self):
-        if self.cookiejar_lock_path:
-            self.cookiejar_lock_path = None
+        if self.first_request_lock:
+            self.FIRST_REQUEST_DONE.add(self.cookiejar_path)
+            self.first_request_lock.release()
+            self.first_request_lock = None
+
+        if self.cookiejar_lock_fd:
             fcntl.flock(self.cookiejar_lock_fd, fcntl.LOCK_UN)
             self.cookiejar_lock_fd.close()
+            self.cookiejar_lock_fd = None
+
+    @staticmethod
+    def _cookie_values(jar):
+        return {(cookie.domain, cookie.path, cookie.name): cookie.value for cookie in jar}
+
+    @classmethod
+    def _save_cookiejar(cls, path):
+        """
+        Atomically write the cookiejar to disk. Failures are ignored, the session cookie gets renewed on the next run.
+        """
+        with cls.COOKIEJARS_LOCK:
+            jar = cls.COOKIEJARS.get(path, None)
+            cls.COOKIEJARS_DIRTY.discard(path)
+            if jar is None:
+                return
+            try:
+                fd, tmp_path = tempfile.mkstemp(prefix=f".{os.path.basename(path)}.", dir=os.path.dirname(path))
+            except OSError:
+                return
+            try:
+                os.close(fd)
+                jar.save(tmp_path)
+                os.chmod(tmp_path, 0o600)
+                os.replace(tmp_path, path)
+            except OSError:
+                pass
+            finally:
+                if os.path.exists(tmp_path):
+                    os.unlink(tmp_path)
+
+    @classmethod
+    def save_cookiejars(cls):
+        """
+        Save the cookiejars with unsaved changes such as renewed expiration of the session cookies.
+        Called on exit.
+        """
+        with cls.COOKIEJARS_LOCK:
+            for path in list(cls.COOKIEJARS_DIRTY):
+                cls._save_cookiejar(path)
 
     def set_request_headers(self, url, request_headers):
         self._lock()
@@ -554,6 +1086,17 @@ class CookieJarAuthHandler(AuthHandlerBase):
             # we have a valid cookie already -> unlock immediately
             self._unlock()
             return True
+
+        if self.cookiejar_path not in self.FIRST_REQUEST_DONE:
+            with self.COOKIEJARS_LOCK:
+                lock = self.FIRST_REQUEST_LOCKS.setdefault(self.cookiejar_path, threading.Lock())
+            lock.acquire()
+            self.first_request_lock = lock
+            # another thread might have obtained a cookie in the meantime
+            self._cookiejar.add_cookie_header(MockRequest(url, request_headers))
+            if request_headers.get_all("cookie", None):
+                self._unlock()
+                return True
         return False
 
     def set_request_headers_after_401(self, url, request_headers, response):
@@ -562,11 +1105,24 @@ class CookieJarAuthHandler(AuthHandlerBase):
 
     def process_response(self, url, request_headers, response):
         if response.headers.get_all("set-cookie", None):
-            self._cookiejar.extract_cookies(response, MockRequest(url, response.headers))
-            self._cookiejar.save()
+            with self.COOKIEJARS_LOCK:
+                old_values = self._cookie_values(self._cookiejar)
+                self._cookiejar.extract_cookies(response, MockRequest(url, response.headers))
+                if self._cookie_values(self._cookiejar) != old_values:
+                    # a new session cookie, save it immediately so other osc processes can use it
+                    self._save_cookiejar(self.cookiejar_path)
+                else:
+                    # the server renews the expiration of the session cookie on each request, save it on exit
+                    self.COOKIEJARS_DIRTY.add(self.cookiejar_path)
+        self._unlock()
+
+    def cleanup(self):
         self._unlock()
 
 
+atexit.register(CookieJarAuthHandler.save_cookiejars)
+
+
 class BasicAuthHandler(AuthHandlerBase):
     def __init__(self, apiurl, user, password):
         super().__init__(apiurl)
@@ -595,6 +1151,9 @@ class BasicAuthHandler(AuthHandlerBase):
 
 
 class SignatureAuthHandler(AuthHandlerBase):
+    # Number of seconds a signature is reused for, the server accepts signatures created a few minutes ago.
+    SIGNATURE_MAX_AGE = 60
+
     def __init__(self, apiurl, user, sshkey, basic_auth_password=None):
         super().__init__(apiurl)
         self.user = user
@@ -626,7 +1185,22 @@ class SignatureAuthHandler(AuthHandlerBase):
 
         self.temp_pubkey = None
 
+        # the handler is shared by the threads, sign one request at a time
+        self._sign_lock = threading.Lock()
+
+        self.ssh_agent = sshsig.SshAgentClient()
+        # {realm: (created, authorization)}
+        self.authorization_cache = {}
+
     def list_ssh_agent_keys(self):
+        if self.ssh_agent.available:
+            try:
+                keys = self.ssh_agent.list_keys()
+            except (OSError, sshsig.SshAgentError):
+                keys = None
+            if keys is not None:
+                return [f"{sshsig.key_type(blob)} {base64.b64encode(blob).decode('ascii')} {comment}".strip() for blob, comment in keys]
+
         if not self.ssh_add_path:
             return []
         cmd = [self.ssh_add_path, '-L']
@@ -638,6 +1212,14 @@ class SignatureAuthHandler(AuthHandlerBase):
             return []
 
     def list_ssh_agent_fingerprints(self):
+        if self.ssh_agent.available:
+            try:
+                keys = self.ssh_agent.list_keys()
+            except (OSError, sshsig.SshAgentError):
+                keys = None
+            if keys is not None:
+                return [sshsig.fingerprint(blob) for blob, _ in keys]
+
         if not self.ssh_add_path:
             return []
         cmd = [self.ssh_add_path, '-l']
@@ -683,7 +1265,7 @@ class SignatureAuthHandler(AuthHandlerBase):
                 output.print_msg(f"Using the first ssh key from ssh agent (see `ssh-add -L`): {selected_key}", print_to="debug")
 
             self.temp_pubkey = tempfile.NamedTemporaryFile(mode="w+")
-            self.temp_pubkey.write(keys_in_agent[0])
+            self.temp_pubkey.write(selected_key)
             self.temp_pubkey.flush()
             return self.temp_pubkey.name
 
@@ -704,6 +1286,17 @@ class SignatureAuthHandler(AuthHandlerBase):
             raise oscerr.OscIOError(None, "No SSH key configured or auto-detected")
         keyfile = os.path.expanduser(keyfile)
 
+        # sign in-process with ssh-agent or an unencrypted key, that's much faster than running ssh-keygen
+        signature = sshsig.sign(data, namespace, keyfile, agent=self.ssh_agent)
+        if signature is not None:
+            if self.temp_pubkey:
+                self.temp_pubkey.close()
+                self.temp_pubkey = None
+            return signature
+
+        if not self.ssh_keygen_path:
+            raise oscerr.OscIOError(None, "Unable to sign the request, ssh-keygen is not available")
+
         # ssh-keygen makes a decision about where to get the passphrase from based on whether the stdin is connected to a terminal
         # which is not the case when reading input from stdin
         # we want it to consider also other password inputs, so we're avoiding piping ``data`` to ssh-keygen
@@ -734,11 +1327,19 @@ class SignatureAuthHandler(AuthHandlerBase):
     def get_authorization(self, chal):
         realm = chal.get('realm', '')
         now = int(time.time())
+
+        # the signature covers only the creation time, reuse it while the server accepts it
+        cached = self.authorization_cache.get(realm, None)
+        if cached and 0 <= now - cached[0] < self.SIGNATURE_MAX_AGE:
+            return cached[1]
+
         sigdata = "(created): %d" % now
         signature = self.ssh_sign(sigdata, realm, self.sshkey)
         signature = decode_it(base64.b64encode(signature))
-        return 'keyId="%s",algorithm="ssh",headers="(created)",created=%d,signature="%s"' \
+        result = 'keyId="%s",algorithm="ssh",headers="(created)",created=%d,signature="%s"' \
             % (self.user, now, signature)
+        self.authorization_cache[realm] = (now, result)
+        return result
 
     def add_signature_auth_header(self, req, auth):
         token, challenge = auth.split(' ', 1)
@@ -767,23 +1368,35 @@ class SignatureAuthHandler(AuthHandlerBase):
             # prefer basic auth, but only if password is set
             return False
 
-        if not self.ssh_keygen_path:
-            output.print_msg("Skipping signature auth because ssh-keygen is not available", print_to="warning")
+        if not self.ssh_keygen_path and not self.ssh_agent.available:
+            output.print_msg("Skipping signature auth because neither ssh-keygen nor ssh-agent is available", print_to="warning")
             output.print_msg("This can be ignored if you are not using SSH keys for authentication", print_to="warning")
             return False
 
-        if not self.sshkey_known():
-            # ssh key not set, try to guess it
-            self.sshkey = self.guess_keyfile()
+        with self._sign_lock:
+            if not self.sshkey_known():
+                # ssh key not set, try to guess it
+                self.sshkey = self.guess_keyfile()
+                # a key from ssh agent is stored in a temporary file that gets removed after signing
+                from_agent = self.temp_pubkey is not None
+            else:
+                from_agent = False
 
-        if not self.sshkey_known():
-            # ssh key cannot be guessed
-            return False
+            if not self.sshkey_known():
+                # ssh key cannot be guessed
+                return False
 
-        return self.add_signature_auth_header(request_headers, auth_schemes["signature"])
+            try:
+                return self.add_signature_auth_header(request_headers, auth_schemes["signature"])
+            finally:
+                if from_agent:
+                    # the handler is reused by the following requests, guess the key again next time
+                    self.sshkey = None
 
     def process_response(self, url, request_headers, response):
-        pass
+        if response.status == 401 and request_headers.get("Authorization", "").startswith("Signature "):
+            # the server rejected the signature, don't reuse it
+            self.authorization_cache.clear()
 
     def sshkey_known(self):
         return self.sshkey is not None
@@ -8,6 +8,7 @@ import csv
 import datetime
 import difflib
 import errno
+import fcntl
 import fnmatch
 import glob
 import hashlib
@@ -33,6 +34,8 @@ from urllib.parse import parse_qs, urlsplit, urlunsplit, urlparse, urlunparse, q
 from urllib.error import HTTPError
 from xml.etree import ElementTree as ET
 
+import urllib3.exceptions
+
 try:
     import distro
 except ImportError:
@@ -45,7 +48,7 @@ from . import meter
 from . import oscerr
 from . import output
 from . import store as osc_store
-from .connection import http_request, http_GET, http_POST, http_PUT, http_DELETE
+from .connection import http_request, http_GET, http_GET_cached, http_POST, http_PUT, http_DELETE
 from .obs_scm import File
 from .obs_scm import Linkinfo
 from .obs_scm import Package
@@ -1229,7 +1232,7 @@ def meta_get_packagelist(apiurl: str, prj, deleted=None, expand=False):
         query['expand'] = 1
 
     u = makeurl(apiurl, ['source', prj], query)
-    f = http_GET(u)
+    f = http_GET_cached(u)
     root = xml_parse(f).getroot()
     return [node.get('name') for node in root.findall('entry')]
 
@@ -1292,7 +1295,7 @@ def show_project_meta(apiurl: str, prj: str, rev=None, blame=None):
         query['rev'] = rev
         url = makeurl(apiurl, ['source', prj, '_project', '_meta'], query)
         try:
-            f = http_GET(url)
+            f = http_GET_cached(url)
         except HTTPError as e:
             error_help = "%d" % e.code
             os_err = e.hdrs.get('X-Opensuse-Errorcode')
@@ -1307,7 +1310,7 @@ def show_project_meta(apiurl: str, prj: str, rev=None, blame=None):
             url = makeurl(apiurl, ['source', prj, '_project', '_meta'], query)
         else:
             url = makeurl(apiurl, ['source', prj, '_meta'])
-        f = http_GET(url)
+        f = http_GET_cached(url)
     return f.readlines()
 
 
@@ -1321,7 +1324,7 @@ def show_project_conf(apiurl: str, prj: str, rev=None, blame=None):
         url = makeurl(apiurl, ['source', prj, '_project', '_config'], query=query)
     else:
         url = makeurl(apiurl, ['source', prj, '_config'], query=query)
-    f = http_GET(url)
+    f = http_GET_cached(url)
     return f.readlines()
 
 
@@ -1345,7 +1348,7 @@ def show_package_meta(apiurl: str, prj: str, pac: str, meta=False, blame=None):
 
     url = makeurl(apiurl, ['source', prj, pac, '_meta'], query)
     try:
-        f = http_GET(url)
+        f = http_GET_cached(url)
         return f.readlines()
     except HTTPError as e:
         e.osc_msg = f'Error getting meta for project \'{unquote(prj)}\' package \'{pac}\''
@@ -1766,6 +1769,12 @@ def show_files_meta(
     meta=False,
     deleted=False,
 ):
+    query = _get_files_meta_query(revision, expand, linkrev, linkrepair, meta, deleted)
+    f = http_GET(makeurl(apiurl, ['source', prj, pac], query=query))
+    return f.read()
+
+
+def _get_files_meta_query(revision=None, expand=False, linkrev=None, linkrepair=False, meta=False, deleted=False):
     query = {}
     if not revision_is_empty(revision):
         query['rev'] = revision
@@ -1783,8 +1792,7 @@ def show_files_meta(
         query['expand'] = 1
     if linkrepair:
         query['emptylink'] = 1
-    f = http_GET(makeurl(apiurl, ['source', prj, pac], query=query))
-    return f.read()
+    return query
 
 
 def show_upstream_srcmd5(
@@ -1917,6 +1925,21 @@ def show_upstream_rev(
     return et.get('rev')
 
 
+def show_upstream_revs(apiurl: str, prj: str, pacs: List[str]):
+    """
+    Return the latest revisions of packages ``pacs`` in project ``prj`` in the same order.
+    Unlike calling ``show_upstream_rev()`` in a loop, the requests are sent concurrently.
+    """
+    paths = [["source", prj, pac] for pac in pacs]
+    queries = [_get_files_meta_query() for pac in pacs]
+    result = []
+    for root in _private.api.get_many(apiurl, paths, queries):
+        if isinstance(root, Exception):
+            raise root
+        result.append(root.get("rev"))
+    return result
+
+
 def read_meta_from_spec(specfile, *args):
     """
     Read tags and sections from spec file. To read out
@@ -2746,30 +2769,138 @@ def get_group_data(apiurl: str, group: str, *tags):
     return _get_xml_data(meta, *tags)
 
 
-def download(url: str, filename, progress_obj=None, mtime=None):
+def download(url: str, filename, progress_obj=None, mtime=None, text=None, resume=False, size=None, md5=None, timeout=None,
+             on_first_byte=None, abort=None):
+    """
+    Download ``url`` to ``filename``.
+
+    The data is written to a temporary file that replaces ``filename`` once the download is complete.
+    A broken transfer continues with a HTTP Range request instead of starting over (up to ``http_retries`` times).
+
+    :param resume: Write the data to ``<filename>.part`` and keep it when the download fails,
+                   the next download of the same file continues where the previous one stopped.
+    :param size: The expected size of the downloaded file.
+    :param md5: The expected md5 checksum of the downloaded file.
+    :param timeout: Fail if the server doesn't respond or the transfer stalls for the given number of seconds.
+                    Timeouts are not retried, the caller is expected to try a different server instead.
+    :param on_first_byte: Function called without arguments when the first data of the response arrive.
+    :param abort: ``threading.Event`` that stops the download with ``oscerr.UserAbort`` once it is set.
+                  Another thread can cancel the download with it.
+    """
     global BUFSIZE
 
-    o = None
-    try:
+    fd = None
+    if resume:
+        tmpfile = f"{filename}.part"
+        fd = os.open(tmpfile, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+        try:
+            # another process sharing the directory may be downloading the same file
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            # the file could have been renamed after the previous download was complete
+            if os.fstat(fd).st_ino != os.stat(tmpfile).st_ino:
+                raise BlockingIOError()
+        except OSError:
+            # download to a private file instead
+            os.close(fd)
+            fd = None
+            resume = False
+    if fd is None:
         prefix = os.path.basename(filename)
         path = os.path.dirname(filename)
         (fd, tmpfile) = tempfile.mkstemp(dir=path, prefix=prefix, suffix='.osctmp')
         os.fchmod(fd, 0o644)
-        try:
-            o = os.fdopen(fd, 'wb')
-            for buf in streamfile(url, http_GET, BUFSIZE, progress_obj=progress_obj, text=filename):
-                if isinstance(buf, str):
-                    o.write(bytes(buf, "utf-8"))
+
+    keep_tmpfile = resume
+    try:
+        # the lock of the partial file is held until the complete file is renamed
+        with os.fdopen(fd, 'ab') as o:
+            offset = os.fstat(o.fileno()).st_size
+            if size is not None and offset > size:
+                # the partial file doesn't belong to the expected file
+                o.truncate(0)
+                offset = 0
+
+            while True:
+                resumed = offset > 0
+                md5_obj = None
+                if md5:
+                    md5_obj = hashlib.md5()
+                    if offset:
+                        with open(tmpfile, "rb") as part:
+                            for buf in iter(lambda: part.read(BUFSIZE), b""):
+                                md5_obj.update(buf)
+
+                retries = 0
+                while True:
+                    try:
+                        if size is None or offset < size:
+                            # the binaries are downloaded as they are, the size and the offsets apply to the raw data
+                            chunks = streamfile(
+                                url,
+                                http_GET,
+                                BUFSIZE,
+                                progress_obj=progress_obj,
+                                text=text or filename,
+                                offset=offset,
+                                timeout=timeout,
+                                headers={"Accept-Encoding": "identity"},
+                            )
+                            for buf in chunks:
+                                if abort is not None and abort.is_set():
+                                    raise oscerr.UserAbort()
+                                if on_first_byte is not None:
+                                    on_first_byte()
+                                    on_first_byte = None
+                                if isinstance(buf, str):
+                                    buf = bytes(buf, "utf-8")
+                                o.write(buf)
+                                offset += len(buf)
+                                if md5_obj:
+                                    md5_obj.update(buf)
+                        break
+                    except HTTPError as e:
+                        if e.code != 416 or not offset:
+                            raise
+                        # Range Not Satisfiable: the partial file is not a prefix of the file on the server, start over
+                        error = e
+                        o.truncate(0)
+                        offset = 0
+                        md5_obj = hashlib.md5() if md5 else None
+                    except (IncompleteRead, ConnectionError, urllib3.exceptions.HTTPError, oscerr.OscIOError) as e:
+                        if timeout and isinstance(getattr(e, "reason", e), urllib3.exceptions.TimeoutError):
+                            raise
+                        error = e
+                        o.flush()
+                        offset = os.fstat(o.fileno()).st_size
+
+                    retries += 1
+                    if retries >= int(conf.config['http_retries']):
+                        raise error
+                    if conf.config['http_debug']:
+                        print(f"\n\nResuming download of {url} from byte {offset}: {error}", file=sys.stderr)
+
+                if size is not None and offset != size:
+                    msg = f"Size of the downloaded file {filename} does not match: {offset} (actual) != {size} (expected)"
+                elif md5_obj and md5_obj.hexdigest() != md5:
+                    msg = f"MD5 checksum of the downloaded file {filename} does not match: {md5_obj.hexdigest()} (actual) != {md5} (expected)"
                 else:
-                    o.write(buf)
-            o.close()
+                    break
+
+                if not resumed:
+                    keep_tmpfile = False
+                    raise oscerr.OscIOError(None, msg)
+                # the partial file comes from a different version of the file on the server, start over
+                if conf.config['http_debug']:
+                    print(f"\n\nRestarting download of {url}: {msg}", file=sys.stderr)
+                o.truncate(0)
+                offset = 0
+
+            o.flush()
             os.rename(tmpfile, filename)
-        except:
+    except:
+        if not keep_tmpfile and os.path.exists(tmpfile):
             os.unlink(tmpfile)
-            raise
-    finally:
-        if o is not None:
-            o.close()
+        raise
 
     if mtime:
         utime(filename, (-1, mtime))
@@ -2785,7 +2916,13 @@ def get_source_file(
     progress_obj=None,
     mtime=None,
     meta=False,
+    size=None,
+    md5=None,
 ):
+    """
+    Download a source file to ``targetfilename``.
+    The downloaded data are checked against the expected ``size`` and ``md5`` if they are specified.
+    """
     targetfilename = targetfilename or filename
     query = {}
     if meta:
@@ -2797,7 +2934,7 @@ def get_source_file(
         ["source", prj, package, filename],
         query=query,
     )
-    download(u, targetfilename, progress_obj, mtime)
+    download(u, targetfilename, progress_obj, mtime, size=size, md5=md5)
 
 
 def get_binary_file(
@@ -2810,6 +2947,7 @@ def get_binary_file(
     target_filename=None,
     target_mtime=None,
     progress_meter=False,
+    target_size=None,
 ):
     progress_obj = None
     if progress_meter:
@@ -2828,41 +2966,35 @@ def get_binary_file(
 
     where = package or '_repository'
     u = makeurl(apiurl, ['build', prj, repo, arch, where, filename])
-    download(u, target_filename, progress_obj, target_mtime)
+    download(u, target_filename, progress_obj, target_mtime, size=target_size)
     if target_filename.endswith('.AppImage'):
         os.chmod(target_filename, 0o755)
 
 
 def dgst(file):
-
-    # if not os.path.exists(file):
-    # return None
-
-    global BUFSIZE
-    s = hashlib.md5()
-    f = open(file, 'rb')
-    while True:
-        buf = f.read(BUFSIZE)
-        if not buf:
-            break
-        s.update(buf)
-    f.close()
-    return s.hexdigest()
+    return multi_dgst(file, "md5")[0]
 
 
 def sha256_dgst(file):
+    return multi_dgst(file, "sha256")[0]
 
+
+def multi_dgst(file, *algorithms):
+    """
+    Return hex digests of the ``file`` contents for the given hashlib ``algorithms``.
+    The file is read only once regardless of the number of the algorithms.
+    """
     global BUFSIZE
 
-    f = open(file, 'rb')
-    s = hashlib.sha256()
-    while True:
-        buf = f.read(BUFSIZE)
-        if not buf:
-            break
-        s.update(buf)
-    f.close()
-    return s.hexdigest()
+    hashes = [hashlib.new(i) for i in algorithms]
+    with open(file, "rb") as f:
+        while True:
+            buf = f.read(BUFSIZE)
+            if not buf:
+                break
+            for s in hashes:
+                s.update(buf)
+    return [s.hexdigest() for s in hashes]
 
 
 def binary(data: bytes):
@@ -3207,6 +3339,8 @@ def checkout_package(
     size_limit=None,
     meta=False,
     outdir=None,
+    cpio_bulk_download=None,
+    download_workers=None,
 ):
     try:
         # the project we're in might be deleted.
@@ -3313,7 +3447,8 @@ def checkout_package(
             prj_obj = Project(prj_dir)
         prj_obj.set_state(p.name, ' ')
         prj_obj.write_packages()
-    p.update(revision, server_service_files, size_limit)
+    p.update(revision, server_service_files, size_limit, cpio_bulk_download=cpio_bulk_download,
+             download_workers=download_workers)
     if service_files:
         print('Running all source services local')
         p.run_source_services()
@@ -4580,14 +4715,30 @@ def get_prj_results(
     return r
 
 
-def streamfile(url: str, http_meth=http_GET, bufsize=8192, data=None, progress_obj=None, text=None):
+def streamfile(url: str, http_meth=http_GET, bufsize=8192, data=None, progress_obj=None, text=None, offset=0, timeout=None, headers=None):
     """
     performs http_meth on url and read bufsize bytes from the response
     until EOF is reached. After each read bufsize bytes are yielded to the
     caller. A spezial usage is bufsize="line" to read line by line (text).
+
+    If ``offset`` is specified, only the data starting at the given position is yielded.
+    It is requested with a HTTP Range request; if the server doesn't support ranges,
+    the leading data of the full response is skipped.
+
+    If ``timeout`` is specified, the transfer fails when the server doesn't send any data for the given number of seconds.
+
+    A compressed response is decoded; the Content-Length check and the progress apply to the compressed data.
     """
     cl = ''
     retries = 0
+    http_meth_kwargs = {}
+    headers = dict(headers or {})
+    if offset:
+        headers["Range"] = f"bytes={offset}-"
+    if headers:
+        http_meth_kwargs["headers"] = headers
+    if timeout:
+        http_meth_kwargs["timeout"] = timeout
     # Repeat requests until we get reasonable Content-Length header
     # Server (or iChain) is corrupting data at some point, see bnc#656281
     while cl == '':
@@ -4596,7 +4747,7 @@ def streamfile(url: str, http_meth=http_GET, bufsize=8192, data=None, progress_o
         retries = retries + 1
         if retries > 1 and conf.config['http_debug']:
             print('\n\nRetry %d --' % (retries - 1), url, file=sys.stderr)
-        f = http_meth.__call__(url, data=data)
+        f = http_meth.__call__(url, data=data, **http_meth_kwargs)
         cl = f.info().get('Content-Length')
 
     if cl is not None:
@@ -4606,12 +4757,28 @@ def streamfile(url: str, http_meth=http_GET, bufsize=8192, data=None, progress_o
         cl = cl.split(',')[0]
         cl = int(cl)
 
+    # the data is decoded while reading, Content-Length is the number of bytes received from the server
+    encoded = f.info().get("Content-Encoding", "identity").lower() not in ("", "identity")
+
+    # the number of bytes of the response that precede the requested offset
+    skip = 0
+    # the number of bytes that precede the response in the requested resource
+    start = 0
+    if offset:
+        if getattr(f, "status", None) == 206:
+            content_range = re.match(r"bytes (\d+)-", f.info().get("Content-Range", ""))
+            if not content_range or int(content_range.group(1)) != offset:
+                raise oscerr.OscIOError(None, f'Unexpected Content-Range for {url}: {f.info().get("Content-Range")}')
+            start = offset
+        else:
+            skip = offset
+
     if progress_obj:
         if not text:
             basename = os.path.basename(urlsplit(url)[2])
         else:
             basename = text
-        progress_obj.start(basename, cl)
+        progress_obj.start(basename, cl + start if cl is not None else None)
 
     if bufsize == "line":
         bufsize = 8192
@@ -4626,11 +4793,19 @@ def streamfile(url: str, http_meth=http_GET, bufsize=8192, data=None, progress_o
             break
         read += len(data)
         if progress_obj:
-            progress_obj.update(read)
+            progress_obj.update((f.tell() if encoded else read) + start)
+        if skip:
+            if len(data) <= skip:
+                skip -= len(data)
+                continue
+            data = data[skip:]
+            skip = 0
         yield data
 
     if progress_obj:
         progress_obj.end()
+    if encoded:
+        read = f.tell()
     f.close()
 
     if cl is not None and read != cl:
@@ -4730,7 +4905,7 @@ def get_buildconfig(apiurl: str, prj: str, repository: str, path=None):
     query = {}
     query["path"] = path
     u = makeurl(apiurl, ['build', prj, repository, '_buildconfig'], query=query)
-    f = http_GET(u)
+    f = http_GET_cached(u)
     return f.read()
 
 
@@ -4793,6 +4968,24 @@ def get_source_rev(apiurl: str, project: str, package: str, revision=None):
         url = makeurl(apiurl, ['source', project, package, '_history'])
     f = http_GET(url)
     xml = xml_parse(f)
+    return _get_source_rev_from_history(xml)
+
+
+def get_source_revs(apiurl: str, packages):
+    """
+    Return ``get_source_rev()`` results for a list of ``(project, package)`` tuples in the same order.
+    The requests are sent concurrently.
+    """
+    paths = [["source", project, package, "_history"] for project, package in packages]
+    result = []
+    for root in _private.api.get_many(apiurl, paths):
+        if isinstance(root, Exception):
+            raise root
+        result.append(_get_source_rev_from_history(root))
+    return result
+
+
+def _get_source_rev_from_history(xml):
     ent = None
     for new in xml.findall('revision'):
         # remember the newest one.
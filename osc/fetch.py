@@ -4,29 +4,40 @@
 # either version 2, or (at your option) any later version.
 
 
+import concurrent.futures
 import glob
+import hashlib
+import multiprocessing
 import os
 import re
 import shutil
 import subprocess
 import sys
 import tempfile
+import threading
+from urllib.parse import urlencode
 from urllib.request import HTTPError
 
 from . import checker as osc_checker
 from . import conf
 from . import oscerr
-from .core import makeurl, dgst
-from .grabber import OscFileGrabber, OscMirrorGroup
+from .core import makeurl
+from .grabber import MirrorStats, OscFileGrabber, OscMirrorGroup
 from .meter import create_text_meter
 from .util import packagequery, cpio
+from .util.packagecache import Hdrmd5Index
+from .util.packagecache import PackageStore
 from .util.helper import decode_it
 
 
 class Fetcher:
+    # keep the cpio request URLs safely below the common request line limits (8 KiB) of the web servers
+    CPIO_MAX_URL_LENGTH = 7680
+
     def __init__(self, cachedir='/tmp', urllist=None,
                  http_debug=False, cookiejar=None, offline=False,
-                 enable_cpio=True, modules=None, download_api_only=False):
+                 enable_cpio=True, modules=None, download_api_only=False,
+                 download_workers=1):
         # set up progress bar callback
         self.progress_obj = None
         if sys.stdout.isatty():
@@ -39,38 +50,76 @@ class Fetcher:
         self.http_debug = http_debug
         self.offline = offline
         self.cpio = {}
+        # guards self.cpio when packages are fetched from multiple threads
+        self.cpio_lock = threading.Lock()
         self.enable_cpio = enable_cpio
         self.download_api_only = download_api_only
+        self.download_workers = max(1, int(download_workers))
+        self.hdrmd5_index = Hdrmd5Index(cachedir)
+        self.store = PackageStore(cachedir)
+        # {project: fingerprint of the project's signing keys}, see __signer()
+        self.signers = {}
+        self.mirror_stats = MirrorStats(os.path.join(cachedir, ".mirrorstats.json"))
+        # receives the packages for signature verification as they become available, see run()
+        self.verifier = None
 
         self.gr = OscFileGrabber(progress_obj=self.progress_obj)
 
     def __add_cpio(self, pac):
         prpap = f'{pac.project}/{pac.repository}/{pac.repoarch}/{pac.repopackage}'
-        self.cpio.setdefault(prpap, {})[pac.repofilename] = pac
+        with self.cpio_lock:
+            self.cpio.setdefault(prpap, {})[pac.repofilename] = pac
 
-    def __download_cpio_archive(self, apiurl, project, repo, arch, package, **pkgs):
-        if not pkgs:
-            return
+    def __cpio_query(self, pkgs):
         query = {}
-        query["binary"] = pkgs
+        query["binary"] = list(pkgs)
         query["view"] = "cpio"
         query["module"] = self.modules
+        return query
+
+    def __split_cpio_request(self, apiurl, project, repo, arch, package, pkgs):
+        """
+        Split ``pkgs`` into chunks whose cpio request URLs fit into ``CPIO_MAX_URL_LENGTH``
+        so that we don't have to wait for the server to return 414 before splitting them.
+        """
+        url = makeurl(apiurl, ['build', project, repo, arch, package], query=self.__cpio_query([]))
+        chunks = []
+        chunk = {}
+        chunk_len = len(url)
+        for name, pac in pkgs.items():
+            # '&binary=<name>'
+            item_len = 1 + len(urlencode({"binary": name}))
+            if chunk and chunk_len + item_len > self.CPIO_MAX_URL_LENGTH:
+                chunks.append(chunk)
+                chunk = {}
+                chunk_len = len(url)
+            chunk[name] = pac
+            chunk_len += item_len
+        if chunk:
+            chunks.append(chunk)
+        return chunks
+
+    def __download_cpio_archive(self, apiurl, project, repo, arch, package, pkgs, grabber=None):
+        if not pkgs:
+            return
+        query = self.__cpio_query(pkgs)
         try:
             url = makeurl(apiurl, ['build', project, repo, arch, package], query=query)
-            sys.stdout.write("preparing download ...\r")
-            sys.stdout.flush()
-            with tempfile.NamedTemporaryFile(prefix='osc_build_cpio') as tmparchive:
-                self.gr.urlgrab(url, filename=tmparchive.name,
-                                text=f'fetching packages for \'{project}\'')
-                archive = cpio.CpioRead(tmparchive.name)
-                archive.read()
+            if grabber is None:
+                sys.stdout.write("preparing download ...\r")
+                sys.stdout.flush()
+            # the archive is extracted while it is being downloaded,
+            # the members are written directly to the destination directories
+            with (grabber or self.gr).urlopen(url, text=f'fetching packages for \'{project}\'') as f:
+                archive = cpio.CpioStreamRead(f, name=url)
                 for hdr in archive:
                     # XXX: we won't have an .errors file because we're using
                     # getbinarylist instead of the public/... route
                     # (which is routed to getbinaries)
                     # getbinaries does not support kiwi builds
                     if hdr.filename == b'.errors':
-                        archive.copyin_file(hdr.filename)
+                        with open(hdr.filename, 'wb') as errors_file:
+                            archive.copyin_fileobj(errors_file)
                         raise oscerr.APIError('CPIO archive is incomplete '
                                               '(see .errors file)')
                     if package == '_repository':
@@ -85,26 +134,30 @@ class Fetcher:
                         # this is a kiwi product
                         pac = pkgs[decode_it(hdr.filename)]
 
-                    # Extract a single file from the cpio archive
-                    fd = None
-                    tmpfile = None
+                    # Extract a single file from the cpio archive;
+                    # the temporary file is on the same file system as the destination, moving it is just a rename
+                    fd, tmpfile = tempfile.mkstemp(prefix='.osc_build_file', dir=pac.localdir)
                     try:
-                        fd, tmpfile = tempfile.mkstemp(prefix='osc_build_file')
-                        archive.copyin_file(hdr.filename,
-                                            decode_it(os.path.dirname(tmpfile)),
-                                            decode_it(os.path.basename(tmpfile)))
+                        md5 = hashlib.md5()
+                        with os.fdopen(fd, 'wb') as tmp:
+                            archive.copyin_fileobj(tmp, md5)
                         self.move_package(tmpfile, pac.localdir, pac)
+                        if pac.name.startswith('container:') or pac.binary in ('updateinfo.xml', '_modulemd.yaml'):
+                            # hdrmd5 of these files is md5 of the whole file, there's no need to read them again
+                            self.hdrmd5_index.set(pac.fullfilename, md5.hexdigest(), pac.canonname)
+                        self.__package_ready(pac)
                     finally:
-                        if fd is not None:
-                            os.close(fd)
-                        if tmpfile is not None and os.path.exists(tmpfile):
+                        if os.path.exists(tmpfile):
                             os.unlink(tmpfile)
 
-                for pac in pkgs.values():
-                    if not os.path.isfile(pac.fullfilename):
-                        raise oscerr.APIError('failed to fetch file \'%s\': '
-                                              'missing in CPIO archive' %
-                                              pac.repofilename)
+                # read the rest of the stream (padding) to verify Content-Length of the response
+                f.read()
+
+            for pac in pkgs.values():
+                if not os.path.isfile(pac.fullfilename):
+                    raise oscerr.APIError('failed to fetch file \'%s\': '
+                                          'missing in CPIO archive' %
+                                          pac.repofilename)
         except HTTPError as e:
             if e.code != 414:
                 raise
@@ -116,36 +169,52 @@ class Fetcher:
             n = int(len(pkgs) / 2)
             new_pkgs = {k: pkgs[k] for k in keys[:n]}
             self.__download_cpio_archive(apiurl, project, repo, arch,
-                                         package, **new_pkgs)
+                                         package, new_pkgs, grabber)
             new_pkgs = {k: pkgs[k] for k in keys[n:]}
             self.__download_cpio_archive(apiurl, project, repo, arch,
-                                         package, **new_pkgs)
+                                         package, new_pkgs, grabber)
 
     def __fetch_cpio(self, apiurl):
+        requests = []
         for prpap, pkgs in self.cpio.items():
             project, repo, arch, package = prpap.split('/', 3)
-            self.__download_cpio_archive(apiurl, project, repo, arch, package, **pkgs)
+            for chunk in self.__split_cpio_request(apiurl, project, repo, arch, package, pkgs):
+                requests.append((project, repo, arch, package, chunk))
+
+        if self.download_workers > 1 and len(requests) > 1:
+            # the grabber has no progress bar, multiple progress bars would overwrite each other
+            grabber = OscFileGrabber()
 
-    def fetch(self, pac, prefix=''):
-        # for use by the failure callback
-        self.curpac = pac
+            def download(request):
+                project, repo, arch, package, pkgs = request
+                self.__download_cpio_archive(apiurl, project, repo, arch, package, pkgs, grabber)
+
+            self.__run_parallel(download, requests, f"fetching {len(requests)} archives from api")
+            return
 
-        mg = OscMirrorGroup(self.gr, pac.urllist)
+        for project, repo, arch, package, pkgs in requests:
+            self.__download_cpio_archive(apiurl, project, repo, arch, package, pkgs)
+
+    def fetch(self, pac, prefix='', grabber=None):
+        mg = OscMirrorGroup(grabber or self.gr, pac.urllist, stats=self.mirror_stats, timeout=conf.config["mirror_timeout"])
 
         if self.http_debug:
             print(f'\nURLs to try for package \'{pac}\':', file=sys.stderr)
             print('\n'.join(pac.urllist), file=sys.stderr)
             print(file=sys.stderr)
 
+        # a stable name in the cache dir allows resuming an interrupted download next time
+        tmpfile = os.path.join(pac.localdir, f'.osc_build_{pac.filename}')
         try:
-            with tempfile.NamedTemporaryFile(prefix='osc_build',
-                                             delete=False) as tmpfile:
-                mg_stat = mg.urlgrab(pac.filename, filename=tmpfile.name,
-                                     text=f'{prefix}({pac.project}) {pac.filename}')
-                if mg_stat:
-                    self.move_package(tmpfile.name, pac.localdir, pac)
+            mg_stat = mg.urlgrab(pac.filename, filename=tmpfile,
+                                 text=f'{prefix}({pac.project}) {pac.filename}', resume=True)
+            if mg_stat:
+                self.move_package(tmpfile, pac.localdir, pac)
 
             if not mg_stat:
+                # none of the mirrors has the file, drop the partial download
+                if os.path.exists(f'{tmpfile}.part'):
+                    os.unlink(f'{tmpfile}.part')
                 if self.enable_cpio:
                     print('%s/%s: attempting download from api, since not found'
                           % (pac.project, pac.name))
@@ -157,8 +226,84 @@ class Fetcher:
                 print('\n'.join(pac.urllist), file=sys.stderr)
                 sys.exit(1)
         finally:
-            if os.path.exists(tmpfile.name):
-                os.unlink(tmpfile.name)
+            if os.path.exists(tmpfile):
+                os.unlink(tmpfile)
+
+    def __fetch_and_check(self, apiurl, pac, prefix='', grabber=None):
+        """
+        Fetch a package from the mirrors and verify its hdrmd5.
+        Packages that cannot be fetched or fail the check are queued for the cpio download from the api.
+        """
+        self.fetch(pac, prefix=prefix, grabber=grabber)
+
+        if not os.path.isfile(pac.fullfilename):
+            # if the file wasn't downloaded and cannot be found on disk,
+            # mark it for downloading from the API
+            self.__add_cpio(pac)
+            return pac
+
+        hdrmd5 = self.hdrmd5_index.hdrmd5(pac.fullfilename)
+        if hdrmd5 != pac.hdrmd5:
+            if conf.config["api_host_options"][apiurl]["disable_hdrmd5_check"]:
+                print(f"Warning: Ignoring a hdrmd5 mismatch for {pac.fullfilename}: {hdrmd5} (actual) != {pac.hdrmd5} (expected)")
+            else:
+                print(f"The file will be redownloaded from the API due to a hdrmd5 mismatch for {pac.fullfilename}: {hdrmd5} (actual) != {pac.hdrmd5} (expected)")
+                os.unlink(pac.fullfilename)
+                self.__add_cpio(pac)
+                return pac
+        self.__package_ready(pac)
+        return pac
+
+    def __run_parallel(self, func, items, text, item_done=None):
+        """
+        Call ``func(item)`` for all ``items`` using a pool of ``self.download_workers`` threads.
+        Instead of a progress bar per download, a single progress bar counts the finished items.
+        If there is no progress bar, ``item_done(done, total, result)`` is called after each finished item.
+        """
+        total = len(items)
+
+        if self.progress_obj:
+            self.progress_obj.start(text, total)
+
+        executor = concurrent.futures.ThreadPoolExecutor(max_workers=self.download_workers)
+        futures = [executor.submit(func, item) for item in items]
+        try:
+            done = 0
+            for future in concurrent.futures.as_completed(futures):
+                result = future.result()
+                done += 1
+                if self.progress_obj:
+                    self.progress_obj.update(done)
+                elif item_done:
+                    item_done(done, total, result)
+        except KeyboardInterrupt:
+            for future in futures:
+                future.cancel()
+            executor.shutdown(wait=False)
+            print('Cancelled by user (ctrl-c)')
+            print('Exiting.')
+            sys.exit(0)
+        except BaseException:
+            for future in futures:
+                future.cancel()
+            executor.shutdown(wait=False)
+            raise
+
+        executor.shutdown()
+        if self.progress_obj:
+            self.progress_obj.end()
+
+    def __fetch_parallel(self, apiurl, pacs):
+        # the grabber has no progress bar, multiple progress bars would overwrite each other
+        grabber = OscFileGrabber()
+
+        def fetch(pac):
+            return self.__fetch_and_check(apiurl, pac, grabber=grabber)
+
+        def item_done(done, needed, pac):
+            print('%d/%d (%s) %s' % (done, needed, pac.project, pac.filename))
+
+        self.__run_parallel(fetch, pacs, f"fetching {len(pacs)} packages", item_done)
 
     def move_package(self, tmpfile, destdir, pac_obj=None):
         canonname = None
@@ -182,6 +327,7 @@ class Fetcher:
             pac_obj.fullfilename = fullfilename
         shutil.move(tmpfile, fullfilename)
         os.chmod(fullfilename, 0o644)
+        self.hdrmd5_index.set(fullfilename, canonname=canonname)
 
     def dirSetup(self, pac):
         dir = os.path.join(self.cachedir, pac.localdir)
@@ -203,8 +349,117 @@ class Fetcher:
             urllist = [project_repo_url]
         return urllist
 
-    def run(self, buildinfo):
+    def __signer(self, project):
+        """
+        Return a string identifying the keys the packages of the ``project`` are signed with.
+        Packages from projects with unknown keys are shared only within the project.
+        """
+        if project not in self.signers:
+            keys = glob.glob(os.path.join(self.cachedir, project, "_pubkey*"))
+            self.signers[project] = keyring_fingerprint(keys) if keys else f"project:{project}"
+        return self.signers[project]
+
+    def __update_store(self, buildinfo):
+        """
+        Add the packages from the package cache to the content-addressed store
+        and evict the least recently used packages if the store exceeds ``package_cache_max_size``.
+        """
+        for i in buildinfo.deps:
+            if not i.hdrmd5 or not os.path.exists(i.fullfilename):
+                continue
+            whole_file = i.name.startswith('container:') or i.binary == 'updateinfo.xml' or i.binary == '_modulemd.yaml'
+            if not whole_file and i.pacsuffix != 'rpm':
+                continue
+            if self.hdrmd5_index.hdrmd5(i.fullfilename, whole_file=whole_file) != i.hdrmd5:
+                continue
+            # the packages copied to other projects have the same hdrmd5 but a different signature
+            md5 = i.hdrmd5 if whole_file else self.hdrmd5_index.md5(i.fullfilename)
+            entry = self.hdrmd5_index.get(i.fullfilename)
+            if self.store.add(i.fullfilename, md5, i.hdrmd5, self.__signer(i.project)) and not self.hdrmd5_index.get(i.fullfilename):
+                # the file was replaced with a link to an identical package from the store
+                self.hdrmd5_index.set(i.fullfilename, i.hdrmd5, entry["canonname"] if entry else None)
+
+        max_size = conf.config["package_cache_max_size"]
+        if max_size:
+            keep = {i.hdrmd5 for i in buildinfo.deps if i.hdrmd5}
+            evicted, freed = self.store.prune(max_size * 1024 * 1024, keep=keep)
+            if evicted:
+                print(f"Removed {len(evicted)} least recently used packages ({freed // (1024 * 1024)} MiB) from the package cache")
+        self.store.save()
+
+    def fetch_keys(self, buildinfo):
+        """
+        Store the signing keys of the projects in the cache and add their paths to ``buildinfo.keys``.
+        """
+        prjs = list(buildinfo.projects.keys())
+        for prj in prjs:
+            dest = os.path.join(self.cachedir, prj)
+            pubkey_path_base = os.path.join(dest, "_pubkey")
+            pubkey_paths = glob.glob(f"{pubkey_path_base}*")
+
+            if self.offline:
+                # we're offline, only index the keys found on disk
+                if pubkey_paths:
+                    for pubkey_path in pubkey_paths:
+                        if pubkey_path not in buildinfo.keys:
+                            buildinfo.keys.append(pubkey_path)
+                    buildinfo.prjkeys.append(prj)
+                continue
+
+            from . import obs_api
+
+            os.makedirs(dest, mode=0o755, exist_ok=True)
+            pubkeys = []
+
+            try:
+                keyinfo = obs_api.Keyinfo.from_api(buildinfo.apiurl, prj)
+                for pubkey in keyinfo.pubkey_list or []:
+                    pubkeys.append(pubkey.value)
+            except HTTPError as e:
+                result = obs_api.Keyinfo.get_pubkey_deprecated(buildinfo.apiurl, prj, traverse=True)
+                if result:
+                    # overwrite ``prj`` with the project that contains the key we're using
+                    prj, pubkey = result
+                    pubkeys.append(pubkey)
+
+            # remove the existing files, we'll create new files with new contents
+            for pubkey_path in pubkey_paths:
+                os.unlink(pubkey_path)
+
+            if pubkeys:
+                for num, pubkey in enumerate(pubkeys):
+                    pubkey_path = f"{pubkey_path_base}-{num}"
+                    with open(pubkey_path, "w") as f:
+                        f.write(pubkey)
+                    if pubkey_path not in buildinfo.keys:
+                        buildinfo.keys.append(pubkey_path)
+                if prj not in buildinfo.prjkeys:
+                    buildinfo.prjkeys.append(prj)
+
+    def __package_ready(self, pac):
+        if self.verifier:
+            self.verifier.submit(pac.fullfilename)
+
+    def run(self, buildinfo, verifier=None, fetch_keys=True):
+        """
+        Update the package cache with the packages from ``buildinfo``.
+
+        If a ``verifier`` is specified, the signing keys are fetched first
+        and each package is submitted for signature verification as soon as it is available,
+        while the remaining packages are still being downloaded.
+
+        :param fetch_keys: Fetch the signing keys of the projects. Disable it when the keys
+                           were fetched by a previous run and the verifier may still be using them.
+        """
         apiurl = buildinfo.apiurl
+        if fetch_keys:
+            self.fetch_keys(buildinfo)
+        # the keys may have changed
+        self.signers = {}
+        self.verifier = verifier
+        if verifier:
+            verifier.start(buildinfo)
+
         cached = 0
         all = len(buildinfo.deps)
         for i in buildinfo.deps:
@@ -217,16 +472,20 @@ class Fetcher:
                         i.canonname = i.canonname[:-7] + ext
                         i.makeurls(self.cachedir, urllist)
 
+            if not os.path.exists(i.fullfilename) and i.hdrmd5 and self.store.link(i.fullfilename, i.hdrmd5, self.__signer(i.project)):
+                # the same package signed with the same keys was downloaded for a different project
+                self.hdrmd5_index.set(i.fullfilename, i.hdrmd5, i.canonname)
+
             if os.path.exists(i.fullfilename):
                 cached_is_valid = True
 
                 if i.hdrmd5:
                     if i.name.startswith('container:') or i.binary == 'updateinfo.xml' or i.binary == '_modulemd.yaml':
-                        hdrmd5 = dgst(i.fullfilename)
+                        hdrmd5 = self.hdrmd5_index.hdrmd5(i.fullfilename, whole_file=True)
                         if hdrmd5 != i.hdrmd5:
                             cached_is_valid = False
                     elif i.pacsuffix == 'rpm':
-                        hdrmd5 = packagequery.PackageQuery.queryhdrmd5(i.fullfilename)
+                        hdrmd5 = self.hdrmd5_index.hdrmd5(i.fullfilename)
                         if hdrmd5 != i.hdrmd5:
                             if conf.config["api_host_options"][apiurl]["disable_hdrmd5_check"]:
                                 print(f"Warning: Ignoring a hdrmd5 mismatch for {i.fullfilename}: {hdrmd5} (actual) != {i.hdrmd5} (expected)")
@@ -236,6 +495,7 @@ class Fetcher:
 
                 if cached_is_valid:
                     cached += 1
+                    self.__package_ready(i)
                 else:
                     os.unlink(i.fullfilename)
 
@@ -244,7 +504,7 @@ class Fetcher:
         if all:
             miss = 100.0 * needed / all
         print("%.1f%% cache miss. %d/%d dependencies cached.\n" % (miss, cached, all))
-        done = 1
+        pending = []
         for i in buildinfo.deps:
             if not os.path.exists(i.fullfilename):
                 if self.offline:
@@ -253,6 +513,13 @@ class Fetcher:
                                             '--offline not possible.' %
                                             i.fullfilename)
                 self.dirSetup(i)
+                pending.append(i)
+
+        if self.download_workers > 1 and len(pending) > 1:
+            self.__fetch_parallel(apiurl, pending)
+        else:
+            done = 1
+            for i in pending:
                 try:
                     # if there isn't a progress bar, there is no output at all
                     prefix = ''
@@ -260,72 +527,17 @@ class Fetcher:
                         print('%d/%d (%s) %s' % (done, needed, i.project, i.filename))
                     else:
                         prefix = '[%d/%d] ' % (done, needed)
-                    self.fetch(i, prefix=prefix)
-
-                    if not os.path.isfile(i.fullfilename):
-                        # if the file wasn't downloaded and cannot be found on disk,
-                        # mark it for downloading from the API
-                        self.__add_cpio(i)
-                    else:
-                        hdrmd5 = packagequery.PackageQuery.queryhdrmd5(i.fullfilename)
-                        if hdrmd5 != i.hdrmd5:
-                            if conf.config["api_host_options"][apiurl]["disable_hdrmd5_check"]:
-                                print(f"Warning: Ignoring a hdrmd5 mismatch for {i.fullfilename}: {hdrmd5} (actual) != {i.hdrmd5} (expected)")
-                            else:
-                                print(f"The file will be redownloaded from the API due to a hdrmd5 mismatch for {i.fullfilename}: {hdrmd5} (actual) != {i.hdrmd5} (expected)")
-                                os.unlink(i.fullfilename)
-                                self.__add_cpio(i)
-
+                    self.__fetch_and_check(apiurl, i, prefix=prefix)
                 except KeyboardInterrupt:
                     print('Cancelled by user (ctrl-c)')
                     print('Exiting.')
                     sys.exit(0)
                 done += 1
 
+        self.mirror_stats.save()
         self.__fetch_cpio(buildinfo.apiurl)
-
-        prjs = list(buildinfo.projects.keys())
-        for prj in prjs:
-            dest = os.path.join(self.cachedir, prj)
-            pubkey_path_base = os.path.join(dest, "_pubkey")
-            pubkey_paths = glob.glob(f"{pubkey_path_base}*")
-
-            if self.offline:
-                # we're offline, only index the keys found on disk
-                if pubkey_paths:
-                    for pubkey_path in pubkey_paths:
-                        buildinfo.keys.append(pubkey_path)
-                    buildinfo.prjkeys.append(prj)
-                continue
-
-            from . import obs_api
-
-            os.makedirs(dest, mode=0o755, exist_ok=True)
-            pubkeys = []
-
-            try:
-                keyinfo = obs_api.Keyinfo.from_api(buildinfo.apiurl, prj)
-                for pubkey in keyinfo.pubkey_list or []:
-                    pubkeys.append(pubkey.value)
-            except HTTPError as e:
-                result = obs_api.Keyinfo.get_pubkey_deprecated(buildinfo.apiurl, prj, traverse=True)
-                if result:
-                    # overwrite ``prj`` with the project that contains the key we're using
-                    prj, pubkey = result
-                    pubkeys.append(pubkey)
-
-            # remove the existing files, we'll create new files with new contents
-            for pubkey_path in pubkey_paths:
-                os.unlink(pubkey_path)
-
-            if pubkeys:
-                for num, pubkey in enumerate(pubkeys):
-                    pubkey_path = f"{pubkey_path_base}-{num}"
-                    with open(pubkey_path, "w") as f:
-                        f.write(pubkey)
-                    buildinfo.keys.append(pubkey_path)
-                if prj not in buildinfo.prjkeys:
-                    buildinfo.prjkeys.append(prj)
+        self.__update_store(buildinfo)
+        self.hdrmd5_index.save()
 
 
 def verify_pacs_old(pac_list):
@@ -395,7 +607,148 @@ def verify_pacs_old(pac_list):
             sys.exit(1)
 
 
-def verify_pacs(bi):
+# the checker of a signature verification worker process
+_VERIFY_CHECKER = None
+
+
+def _verify_worker_check(pkg, keys, tmpdir):
+    global _VERIFY_CHECKER
+    if _VERIFY_CHECKER is None:
+        # the keys are imported only once per worker process
+        _VERIFY_CHECKER = osc_checker.Checker(tmpdir=tmpdir)
+        _VERIFY_CHECKER.readkeys(keys)
+    try:
+        _VERIFY_CHECKER.check(pkg)
+    except Exception as e:
+        return str(e)
+    return None
+
+
+def keyring_fingerprint(keys):
+    """
+    Return a checksum identifying the set of the keys in the given files.
+    """
+    result = hashlib.sha256()
+    for key in sorted(keys):
+        with open(key, "rb") as f:
+            result.update(hashlib.sha256(f.read()).digest())
+    return result.hexdigest()
+
+
+class PackageVerifier:
+    """
+    Verify signatures of packages in a pool of worker processes, each with its own copy of the keyring.
+    The packages can be submitted one by one while they're being downloaded.
+
+    If ``hdrmd5_index`` is specified, the packages verified with the same keys are not checked again
+    as long as their files don't change.
+    """
+
+    def __init__(self, hdrmd5_index=None):
+        self.hdrmd5_index = hdrmd5_index
+        self.checker = None
+        self.keys = []
+        self.keyring = None
+        self.executor = None
+        self.tmpdir = None
+        # {path: (stat of the file at the time it was submitted, future)}
+        self.pending = {}
+        # the packages are submitted from multiple download threads
+        self.lock = threading.Lock()
+
+    def start(self, bi):
+        if self.checker:
+            # already started
+            return
+
+        if not bi.keys:
+            raise oscerr.APIError("can't verify packages due to lack of GPG keys")
+
+        print("using keys from", ', '.join(bi.prjkeys))
+
+        self.checker = osc_checker.Checker()
+        try:
+            self.checker.readkeys(bi.keys)
+        except:
+            self.checker.cleanup()
+            raise
+        self.keys = list(self.checker.imported)
+        self.keyring = keyring_fingerprint(self.keys)
+
+        executor_kwargs = {}
+        if sys.version_info >= (3, 7) and "forkserver" in multiprocessing.get_all_start_methods():
+            # fork the workers from a clean process because the packages are submitted from download threads
+            executor_kwargs["mp_context"] = multiprocessing.get_context("forkserver")
+        self.tmpdir = tempfile.mkdtemp(prefix="osc_verify")
+        # the worker processes are started on the first submit
+        self.executor = concurrent.futures.ProcessPoolExecutor(max_workers=os.cpu_count() or 1, **executor_kwargs)
+
+    def _stat(self, path):
+        st = os.stat(path)
+        return st.st_size, st.st_mtime_ns, st.st_ino
+
+    def submit(self, path):
+        if self.hdrmd5_index and self.hdrmd5_index.is_verified(path, self.keyring):
+            return
+        with self.lock:
+            if path in self.pending:
+                return
+            if self.executor is None:
+                raise RuntimeError("PackageVerifier.start() must be called before submitting packages")
+            future = self.executor.submit(_verify_worker_check, path, self.keys, self.tmpdir)
+            self.pending[path] = (self._stat(path), future)
+
+    def wait(self, paths=()):
+        """
+        Wait for the submitted packages to be verified; submit ``paths`` that haven't been submitted yet.
+        In case of failure, exit.
+        """
+        try:
+            for path in paths:
+                self.submit(path)
+
+            failed = False
+            while True:
+                with self.lock:
+                    pending = self.pending
+                    self.pending = {}
+                if not pending:
+                    break
+                for path, (st, future) in pending.items():
+                    error = future.result()
+                    if error is not None:
+                        failed = True
+                        print(path, ':', error)
+                    elif self._stat(path) != st:
+                        # the file was replaced after it was submitted, check the new one
+                        self.submit(path)
+                    elif self.hdrmd5_index:
+                        self.hdrmd5_index.set_verified(path, self.keyring)
+        finally:
+            self.cleanup()
+
+        if failed:
+            sys.exit(1)
+
+    def cleanup(self):
+        with self.lock:
+            pending = self.pending
+            self.pending = {}
+            executor = self.executor
+            self.executor = None
+        for _, future in pending.values():
+            future.cancel()
+        if executor:
+            executor.shutdown()
+        if self.tmpdir:
+            shutil.rmtree(self.tmpdir, ignore_errors=True)
+            self.tmpdir = None
+        if self.checker:
+            self.checker.cleanup()
+            self.checker = None
+
+
+def verify_pacs(bi, hdrmd5_index=None):
     """Take a list of rpm filenames and verify their signatures.
 
        In case of failure, exit.
@@ -408,29 +761,8 @@ def verify_pacs(bi):
     if not pac_list:
         return
 
-    if not bi.keys:
-        raise oscerr.APIError("can't verify packages due to lack of GPG keys")
-
-    print("using keys from", ', '.join(bi.prjkeys))
-
-    failed = False
-    checker = osc_checker.Checker()
-    try:
-        checker.readkeys(bi.keys)
-        for pkg in pac_list:
-            try:
-                checker.check(pkg)
-            except Exception as e:
-                failed = True
-                print(pkg, ':', e)
-    except:
-        checker.cleanup()
-        raise
-
-    if failed:
-        checker.cleanup()
-        sys.exit(1)
-
-    checker.cleanup()
+    verifier = PackageVerifier(hdrmd5_index)
+    verifier.start(bi)
+    verifier.wait(pac_list)
 
 # vim: sw=4 et
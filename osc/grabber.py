@@ -4,7 +4,12 @@
 # either version 2, or (at your option) any later version.
 
 
+import io
+import json
 import os
+import tempfile
+import threading
+import time
 from urllib.request import HTTPError
 from urllib.parse import urlparse
 from urllib.parse import unquote
@@ -16,36 +21,233 @@ except ImportError:
     class URLSchemeUnknown(Exception):
         pass
 
+import urllib3.exceptions
+
+from . import oscerr
+from .core import download
 from .core import streamfile
 
 
+class StreamFile(io.RawIOBase):
+    """
+    Read-only file object on top of an iterator of ``bytes`` chunks such as ``streamfile()``.
+    """
+
+    def __init__(self, chunks):
+        super().__init__()
+        self._chunks = chunks
+        self._pending = memoryview(b"")
+
+    def readable(self):
+        return True
+
+    def readinto(self, b):
+        while not self._pending:
+            try:
+                self._pending = memoryview(next(self._chunks))
+            except StopIteration:
+                return 0
+        size = min(len(b), len(self._pending))
+        b[:size] = self._pending[:size]
+        self._pending = self._pending[size:]
+        return size
+
+    def close(self):
+        if not self.closed and hasattr(self._chunks, "close"):
+            self._chunks.close()
+        super().close()
+
+
 class OscFileGrabber:
     def __init__(self, progress_obj=None):
         self.progress_obj = progress_obj
 
-    def urlgrab(self, url, filename=None, text=None):
+    def urlopen(self, url, text=None, bufsize=1024 * 1024):
+        """
+        Return a buffered file object that streams the data from ``url``.
+        The Content-Length check of ``streamfile()`` happens after reading all data.
+        """
+        chunks = streamfile(url, bufsize=bufsize, progress_obj=self.progress_obj, text=text, headers={"Accept-Encoding": "identity"})
+        return io.BufferedReader(StreamFile(chunks), buffer_size=bufsize)
+
+    def urlgrab(self, url, filename=None, text=None, resume=False, size=None, md5=None, timeout=None, on_first_byte=None,
+                abort=None):
+        """
+        Download ``url`` to ``filename``.
+        Broken transfers are resumed with HTTP Range requests, see ``core.download()`` for the details.
+        """
         if filename is None:
             parts = urlparse(url)
             filename = os.path.basename(unquote(parts[2]))
-        with open(filename, 'wb') as f:
-            for i in streamfile(url, progress_obj=self.progress_obj,
-                                text=text):
-                f.write(i)
+        download(url, filename, progress_obj=self.progress_obj, text=text, resume=resume, size=size, md5=md5, timeout=timeout,
+                 on_first_byte=on_first_byte, abort=abort)
+
+
+class MirrorStats:
+    """
+    Download performance of the mirrors measured over a sliding window of the recent downloads.
+    The stats are kept per mirror host in a json file, usually in the package cache dir.
+
+    The mirrors are ranked by the estimated time to download a file of ``TYPICAL_SIZE`` bytes,
+    which is the time to the first byte plus the transfer time at the measured throughput.
+    The latency matters for the many small packages of a build, the throughput for the large ones.
+    """
+
+    VERSION = 2
+    # the number of recent downloads the stats are computed from
+    WINDOW = 20
+    # the size of a typical package the mirrors are ranked for
+    TYPICAL_SIZE = 1024 * 1024
+
+    def __init__(self, path=None):
+        self.path = path
+        # {"scheme://host": [[bytes, seconds, failed, first_byte_seconds], ...]}
+        self._samples = {}
+        self._lock = threading.Lock()
+        self.load()
+
+    def load(self):
+        if not self.path:
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        if not isinstance(data, dict) or data.get("version") != self.VERSION:
+            return
+        self._samples = data.get("mirrors", {})
+
+    def save(self):
+        """
+        Atomically write the stats to disk. Failures are ignored.
+        """
+        if not self.path:
+            return
+        with self._lock:
+            data = {"version": self.VERSION, "mirrors": self._samples}
+            try:
+                fd, tmp_path = tempfile.mkstemp(prefix=f"{os.path.basename(self.path)}.", dir=os.path.dirname(self.path))
+            except OSError:
+                return
+            try:
+                with os.fdopen(fd, "w", encoding="utf-8") as f:
+                    json.dump(data, f)
+                os.chmod(tmp_path, 0o644)
+                os.replace(tmp_path, self.path)
+            except OSError:
+                pass
+            finally:
+                if os.path.exists(tmp_path):
+                    os.unlink(tmp_path)
+
+    @staticmethod
+    def _key(url):
+        parts = urlparse(url)
+        return f"{parts.scheme}://{parts.netloc}"
+
+    def add(self, url, size, seconds, failed=False, first_byte=None):
+        """
+        Record a download of ``size`` bytes from ``url`` that took ``seconds``.
+        A failed download counts as a download of zero bytes.
+
+        :param first_byte: Seconds until the first byte of the response arrived, ``None`` if it's unknown.
+        """
+        with self._lock:
+            samples = self._samples.setdefault(self._key(url), [])
+            samples.append([size, seconds, failed, first_byte])
+            del samples[:-self.WINDOW]
+
+    def throughput(self, url):
+        """
+        Return the average throughput of the mirror in bytes per second
+        or ``None`` if there are no measurements.
+        The waiting for the first byte is not counted as transfer time.
+        """
+        with self._lock:
+            samples = self._samples.get(self._key(url), None)
+            if not samples:
+                return None
+            size = sum(i[0] for i in samples)
+            seconds = sum(i[1] - (i[3] or 0) for i in samples)
+        return size / max(seconds, 0.001)
+
+    def latency(self, url):
+        """
+        Return the average time to the first byte of the mirror in seconds
+        or ``None`` if there are no measurements.
+        """
+        with self._lock:
+            samples = self._samples.get(self._key(url), None) or []
+            latencies = [i[3] for i in samples if i[3] is not None]
+        if not latencies:
+            return None
+        return sum(latencies) / len(latencies)
+
+    def estimate(self, url):
+        """
+        Return the estimated seconds to download a file of ``TYPICAL_SIZE`` bytes from the mirror
+        or ``None`` if there are no measurements.
+        """
+        throughput = self.throughput(url)
+        if throughput is None:
+            return None
+        if not throughput:
+            return float("inf")
+        return (self.latency(url) or 0) + self.TYPICAL_SIZE / throughput
+
+    def sort(self, urls):
+        """
+        Return ``urls`` ordered from the fastest mirror to the slowest one.
+        Mirrors without measurements come first so they get measured;
+        the original order is preserved for mirrors with equal performance.
+        """
+        def key(url):
+            estimate = self.estimate(url)
+            return estimate if estimate is not None else float("-inf")
+        return sorted(urls, key=key)
 
 
 class OscMirrorGroup:
-    def __init__(self, grabber, mirrors):
+    def __init__(self, grabber, mirrors, stats=None, timeout=None):
+        """
+        :param stats: ``MirrorStats`` instance that decides the order the mirrors are tried in
+                      and that gets updated with the measured download performance.
+        :param timeout: Skip to the next mirror if a mirror doesn't respond or stalls for the given number of seconds.
+        """
         self._grabber = grabber
         self._mirrors = mirrors
+        self._stats = stats
+        self._timeout = timeout
+
+    def urlgrab(self, url, filename=None, text=None, resume=False):
+        mirrors = self._mirrors
+        if self._stats:
+            mirrors = self._stats.sort(mirrors)
+
+        for mirror in mirrors:
+            part_size = 0
+            if resume and filename and os.path.exists(f"{filename}.part"):
+                part_size = os.path.getsize(f"{filename}.part")
+            start = time.monotonic()
+            first_byte = []
+
+            def on_first_byte():
+                first_byte.append(time.monotonic() - start)
 
-    def urlgrab(self, url, filename=None, text=None):
-        for mirror in self._mirrors:
             try:
-                self._grabber.urlgrab(mirror, filename, text)
+                self._grabber.urlgrab(mirror, filename, text, resume=resume, timeout=self._timeout, on_first_byte=on_first_byte)
+                if self._stats:
+                    self._stats.add(mirror, os.path.getsize(filename) - part_size, time.monotonic() - start,
+                                    first_byte=first_byte[0] if first_byte else None)
                 return True
             except (HTTPError, URLError, URLSchemeUnknown, KeyError) as e:
                 # urllib3 1.25.10 throws a KeyError: pool_key_constructor = self.key_fn_by_scheme[scheme]
                 # try next mirror
                 pass
+            except (ConnectionError, urllib3.exceptions.HTTPError, oscerr.OscIOError) as e:
+                # the mirror is unreachable, stalled or broken; try next mirror
+                if self._stats:
+                    self._stats.add(mirror, 0, time.monotonic() - start, failed=True)
 
         return False
@@ -1,15 +1,21 @@
 import difflib
 import fnmatch
 import glob
+import operator
 import shutil
 import os
 import sys
 import tempfile
+import time
 from functools import total_ordering
 from typing import Optional
 
+import urllib3.exceptions
+
 from .. import conf
 from .. import oscerr
+from .. import output
+from ..util.indexedlist import IndexedList
 from ..util.xml import ET
 from ..util.xml import xml_fromstring
 from ..util.xml import xml_parse
@@ -38,7 +44,11 @@ class Package:
     REQ_STOREFILES = ('_project', '_package', '_apiurl', '_files', '_osclib_version')
     OPT_STOREFILES = ('_to_be_added', '_to_be_deleted', '_in_conflict', '_in_update',
                       '_in_commit', '_meta', '_meta_mode', '_frozenlink', '_pulled', '_linkrepair',
-                      '_size_limit', '_commit_msg', '_last_buildroot')
+                      '_size_limit', '_commit_msg', '_last_buildroot', '_stat_cache')
+
+    # files modified less than the given number of seconds ago are not cached in ``_stat_cache``
+    # because their contents could change without changing their timestamps
+    STAT_CACHE_RACY_SECONDS = 2
 
     def __init__(self, workingdir, progress_obj=None, size_limit=None, wc_check=True):
         from .. import store as osc_store
@@ -46,6 +56,8 @@ class Package:
         global store
 
         self.todo = []
+        self._stat_cache = None
+        self._stat_cache_changed = False
         if os.path.isfile(workingdir) or not os.path.exists(workingdir):
             # workingdir is a file
             # workingdir doesn't exist -> it points to a non-existing file in a working dir (e.g. during mv)
@@ -216,7 +228,7 @@ class Package:
                 # if get_source_file fails we're screwed up...
                 get_source_file(self.apiurl, self.prjname, self.name, f.name,
                                 targetfilename=self.store.sources_get_path(f.name), revision=self.rev,
-                                mtime=f.mtime)
+                                mtime=f.mtime, size=f.size, md5=f.md5)
                 repaired = True
 
         for fname in store:
@@ -391,6 +403,34 @@ class Package:
         if n in self.to_be_added:
             self.to_be_added.remove(n)
 
+    def put_source_files(self, filenames, tdir, max_workers=None):
+        """
+        Upload multiple files concurrently, see ``put_source_file()``.
+        A dot is printed after each uploaded file.
+
+        :param max_workers: Maximum number of concurrent uploads. Defaults to ``http_pool_size`` from oscrc.
+        """
+        import concurrent.futures
+
+        if not filenames:
+            return
+
+        if max_workers is None:
+            max_workers = int(conf.config["http_pool_size"])
+
+        with concurrent.futures.ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(filenames)))) as executor:
+            futures = [executor.submit(self.put_source_file, filename, tdir) for filename in filenames]
+            try:
+                for future in concurrent.futures.as_completed(futures):
+                    future.result()
+                    sys.stdout.write('.')
+                    sys.stdout.flush()
+            except BaseException:
+                # don't start the remaining uploads
+                for future in futures:
+                    future.cancel()
+                raise
+
     def __commit_update_store(self, tdir):
         """move files from transaction directory into the store"""
         for filename in os.listdir(tdir):
@@ -457,10 +497,10 @@ class Package:
     def commit(self, msg='', verbose=False, skip_local_service_run=False, can_branch=False, force=False):
         from ..core import ET_ENCODING
         from ..core import branch_pkg
-        from ..core import dgst
         from ..core import getTransActPath
         from ..core import http_GET
         from ..core import makeurl
+        from ..core import multi_dgst
         from ..core import print_request_list
         from ..core import sha256_dgst
         from ..core import statfrmt
@@ -497,6 +537,7 @@ class Package:
 
         pathn = getTransActPath(self.dir)
 
+        todo = set(self.todo)
         todo_send = {}
         todo_delete = []
         real_send = []
@@ -508,10 +549,9 @@ class Package:
             if st == 'C':
                 print('Please resolve all conflicts before committing using "osc resolved FILE"!')
                 return 1
-            elif filename in self.todo:
+            elif filename in todo:
                 if st in ('A', 'R', 'M'):
-                    todo_send[filename] = dgst(os.path.join(self.absdir, filename))
-                    sha256sums[filename] = sha256_dgst(os.path.join(self.absdir, filename))
+                    todo_send[filename], sha256sums[filename] = multi_dgst(os.path.join(self.absdir, filename), "md5", "sha256")
                     real_send.append(filename)
                     print(statfrmt('Sending', os.path.join(pathn, filename)))
                 elif st in (' ', '!', 'S'):
@@ -546,6 +586,7 @@ class Package:
                 # pulled/linkrepair wc, the file cannot have state 'S')
                 storefile = self.store.sources_get_path(filename)
                 sha256sums[filename] = sha256_dgst(storefile)
+        self.write_stat_cache()
 
         if not force and not real_send and not todo_delete and not self.islinkrepair() and not self.ispulled():
             print(f'nothing to do for package {self.name}')
@@ -570,7 +611,8 @@ class Package:
                 fileelem.set('hash', f'sha256:{sha256sums[filename]}')
             sfilelist = self.__send_commitlog(msg, filelist)
         send = self.commit_get_missing(sfilelist)
-        real_send = [i for i in real_send if i not in send]
+        missing = set(send)
+        real_send = [i for i in real_send if i not in missing]
         # abort after 3 tries
         tries = 3
         tdir = None
@@ -580,11 +622,7 @@ class Package:
                 shutil.rmtree(tdir)
             os.mkdir(tdir)
             while send and tries:
-                for filename in send[:]:
-                    sys.stdout.write('.')
-                    sys.stdout.flush()
-                    self.put_source_file(filename, tdir)
-                    send.remove(filename)
+                self.put_source_files(send, tdir)
                 tries -= 1
                 sfilelist = self.__send_commitlog(msg, filelist)
                 send = self.commit_get_missing(sfilelist)
@@ -654,7 +692,15 @@ class Package:
     def write_conflictlist(self):
         self.store.in_conflict = self.in_conflict or None
 
-    def updatefile(self, n, revision, mtime=None):
+    def updatefile(self, n, revision, mtime=None, progress=True, source=None, size=None, md5=None):
+        """
+        Update file ``n`` in the store and in the working copy to the given ``revision``.
+
+        :param source: Path to a file with the new contents that was already downloaded,
+                       it is moved to the store instead of downloading the file again.
+        :param size: The expected size of the downloaded file.
+        :param md5: The expected md5 checksum of the downloaded file.
+        """
         from ..core import get_source_file
         from ..core import utime
 
@@ -668,8 +714,15 @@ class Package:
         else:
             origfile = None
 
-        get_source_file(self.apiurl, self.prjname, self.name, n, targetfilename=storefilename,
-                        revision=revision, progress_obj=self.progress_obj, mtime=mtime, meta=self.meta)
+        if source is None:
+            progress_obj = self.progress_obj if progress else None
+            get_source_file(self.apiurl, self.prjname, self.name, n, targetfilename=storefilename,
+                            revision=revision, progress_obj=progress_obj, mtime=mtime, meta=self.meta,
+                            size=size, md5=md5)
+        else:
+            os.rename(source, storefilename)
+            if mtime:
+                utime(storefilename, (-1, mtime))
 
         shutil.copyfile(storefilename, filename)
         if mtime:
@@ -677,7 +730,130 @@ class Package:
         if origfile is not None:
             os.unlink(origfile)
 
-    def mergefile(self, n, revision, mtime=None):
+    def _map_files(self, func, files, max_workers=None):
+        """
+        Call ``func(file, progress)`` for each of the ``files`` from a pool of threads.
+        ``progress`` is ``False`` if the calls run concurrently and their progress bars would be mixed up.
+
+        If a call fails, the calls that haven't started yet are cancelled
+        and the exception is raised after the running calls have finished.
+
+        :param max_workers: Maximum number of concurrent calls. Defaults to ``http_pool_size`` from oscrc.
+        """
+        import concurrent.futures
+
+        if max_workers is None:
+            max_workers = int(conf.config["http_pool_size"])
+        max_workers = max(1, min(max_workers, len(files)))
+
+        if max_workers == 1:
+            for f in files:
+                func(f, True)
+            return
+
+        # the output belongs to the ordered_map() task the package is updated in, if any
+        func = output.bind_task_output(func)
+        with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = [executor.submit(func, f, False) for f in files]
+            try:
+                for future in futures:
+                    future.result()
+            except BaseException:
+                # the running calls finish on leaving the executor's context
+                # so they don't leave incomplete files behind
+                for future in futures:
+                    future.cancel()
+                raise
+
+    def updatefiles(self, files, revision, max_workers=None):
+        """
+        Update multiple files concurrently, see ``updatefile()``.
+
+        :param files: ``File`` objects of the files to update, their ``mtime`` is set on the updated files.
+        :param max_workers: Maximum number of concurrent downloads. Defaults to ``http_pool_size`` from oscrc.
+        """
+        def update(f, progress):
+            self.updatefile(f.name, revision, f.mtime, progress=progress, size=f.size, md5=f.md5)
+
+        self._map_files(update, files, max_workers)
+
+    def _update_from_cpio(self, to_update, to_fetch, revision, rfiles):
+        """
+        Update files from a single cpio archive with the sources of the ``revision``.
+
+        The archive contains all files of the revision, ``rfiles``. It is not downloaded
+        if the files that are not needed take more than half of its size.
+        Each member is verified against the md5 from ``_files`` while it is written.
+
+        :param to_update: ``File`` objects of the files to update as with ``updatefile()``.
+        :param to_fetch: ``(File, path)`` pairs of the files that are only written to ``path``.
+        :returns: The ``to_update`` and ``to_fetch`` items that were not obtained from the archive
+                  and need to be downloaded one by one.
+        """
+        import hashlib
+
+        from ..core import HTTPError
+        from ..core import IncompleteRead
+        from ..core import http_GET
+        from ..core import makeurl
+        from ..core import revision_is_empty
+        from ..core import utime
+        from ..util import cpio
+        from ..util.helper import decode_it
+
+        # name -> (File, path); path is None for the files to update
+        pending = {f.name: (f, None) for f in to_update}
+        pending.update({f.name: (f, path) for f, path in to_fetch})
+        needed_size = sum(f.size for f, _ in pending.values())
+        if sum(f.size for f in rfiles) - needed_size > needed_size:
+            return to_update, to_fetch
+
+        query = {"view": "cpio"}
+        if self.meta:
+            query["meta"] = 1
+        if not revision_is_empty(revision):
+            query["rev"] = revision
+        url = makeurl(self.apiurl, ["source", self.prjname, self.name], query=query)
+
+        try:
+            with http_GET(url) as response:
+                archive = cpio.CpioStreamRead(response, name=url)
+                for hdr in archive:
+                    name = decode_it(hdr.filename)
+                    if name not in pending:
+                        continue
+                    f, path = pending[name]
+                    target = path or self.store.sources_get_path(name)
+                    # the temporary file is on the same file system as the target, moving it is just a rename
+                    fd, tmpfile = tempfile.mkstemp(dir=os.path.dirname(target), prefix=name, suffix='.osctmp')
+                    try:
+                        md5 = hashlib.md5()
+                        with os.fdopen(fd, 'wb') as tmp:
+                            archive.copyin_fileobj(tmp, md5)
+                        if md5.hexdigest() != f.md5:
+                            # leave it to the download of the single file
+                            continue
+                        if path is None:
+                            self.updatefile(name, revision, f.mtime, source=tmpfile)
+                        else:
+                            os.rename(tmpfile, path)
+                            if f.mtime:
+                                utime(path, (-1, f.mtime))
+                        del pending[name]
+                    finally:
+                        if os.path.exists(tmpfile):
+                            os.unlink(tmpfile)
+        except (HTTPError, IncompleteRead, ConnectionError, urllib3.exceptions.HTTPError, cpio.CpioError) as e:
+            # the server doesn't provide the archive or the transfer failed,
+            # the files that were already extracted are complete
+            if conf.config["http_debug"]:
+                print(f"Unable to download the sources as cpio archive: {e}", file=sys.stderr)
+
+        to_update = [f for f in to_update if f.name in pending]
+        to_fetch = [(f, path) for f, path in to_fetch if f.name in pending]
+        return to_update, to_fetch
+
+    def mergefile(self, n, revision, mtime=None, size=None, md5=None):
         from ..core import binary_file
         from ..core import get_source_file
         from ..core import run_external
@@ -694,7 +870,7 @@ class Package:
 
         get_source_file(self.apiurl, self.prjname, self.name, n,
                         revision=revision, targetfilename=upfilename,
-                        progress_obj=self.progress_obj, mtime=mtime, meta=self.meta)
+                        progress_obj=self.progress_obj, mtime=mtime, meta=self.meta, size=size, md5=md5)
 
         if binary_file(myfilename) or binary_file(upfilename):
             # don't try merging
@@ -809,12 +985,12 @@ class Package:
         from ..git_scm import GitStore
 
         if self.scm_url or isinstance(self.store, GitStore):
-            self.filenamelist = []
-            self.filelist = []
-            self.skipped = []
-            self.to_be_added = []
-            self.to_be_deleted = []
-            self.in_conflict = []
+            self.filenamelist = IndexedList()
+            self.filelist = IndexedList(key=operator.attrgetter("name"))
+            self.skipped = IndexedList()
+            self.to_be_added = IndexedList()
+            self.to_be_deleted = IndexedList()
+            self.in_conflict = IndexedList()
             self.linkrepair = None
             self.rev = None
             self.srcmd5 = None
@@ -823,7 +999,7 @@ class Package:
             self.size_limit = None
             self.meta = None
             self.excluded = []
-            self.filenamelist_unvers = []
+            self.filenamelist_unvers = IndexedList()
             return
 
         files_tree = read_filemeta(self.dir)
@@ -836,9 +1012,10 @@ class Package:
         self.linkinfo.read(files_tree_root.find('linkinfo'))
         self.serviceinfo = DirectoryServiceinfo()
         self.serviceinfo.read(files_tree_root.find('serviceinfo'))
-        self.filenamelist = []
-        self.filelist = []
-        self.skipped = []
+        # the lists are indexed by file names for fast lookups in packages with many files
+        self.filenamelist = IndexedList()
+        self.filelist = IndexedList(key=operator.attrgetter("name"))
+        self.skipped = IndexedList()
 
         for node in files_tree_root.findall('entry'):
             try:
@@ -855,9 +1032,9 @@ class Package:
             self.filelist.append(f)
             self.filenamelist.append(f.name)
 
-        self.to_be_added = read_tobeadded(self.absdir)
-        self.to_be_deleted = read_tobedeleted(self.absdir)
-        self.in_conflict = read_inconflict(self.absdir)
+        self.to_be_added = IndexedList(read_tobeadded(self.absdir))
+        self.to_be_deleted = IndexedList(read_tobedeleted(self.absdir))
+        self.in_conflict = IndexedList(read_inconflict(self.absdir))
         self.linkrepair = self.store.exists("_linkrepair")
         self.size_limit = read_sizelimit(self.dir)
         self.meta = self.ismetamode()
@@ -869,9 +1046,9 @@ class Package:
                 if fnmatch.fnmatch(i, j):
                     self.excluded.append(i)
                     break
-        self.filenamelist_unvers = [i for i in os.listdir(self.dir)
-                                    if i not in self.excluded
-                                    if i not in self.filenamelist]
+        self.filenamelist_unvers = IndexedList(i for i in os.listdir(self.dir)
+                                               if i not in self.excluded
+                                               if i not in self.filenamelist)
 
     def islink(self):
         """tells us if the package is a link (has 'linkinfo').
@@ -937,9 +1114,58 @@ class Package:
             store_write_string(self.absdir, '_meta', meta)
 
     def findfilebyname(self, n):
-        for i in self.filelist:
-            if i.name == n:
-                return i
+        return self.filelist.get(n)
+
+    def file_md5(self, n):
+        """
+        Return md5 checksum of the working copy file ``n``.
+
+        The checksums are cached in the store together with size, mtime, ctime and inode of the files
+        and a file is read again only if any of them changes.
+        Call ``write_stat_cache()`` to save the newly computed checksums.
+        """
+        from ..core import dgst
+
+        localfile = os.path.join(self.absdir, n)
+        if not isinstance(self.store, Store):
+            return dgst(localfile)
+
+        if self._stat_cache is None:
+            self._stat_cache = self.store.stat_cache
+
+        now = time.time()
+        st = os.stat(localfile)
+        stat_data = (st.st_size, st.st_mtime_ns, st.st_ctime_ns, st.st_ino)
+        entry = self._stat_cache.get(n, None)
+        if entry is not None and entry[:4] == stat_data:
+            return entry[4]
+
+        md5 = dgst(localfile)
+        if max(st.st_mtime_ns, st.st_ctime_ns) < (now - self.STAT_CACHE_RACY_SECONDS) * 1e9:
+            self._stat_cache[n] = stat_data + (md5,)
+            self._stat_cache_changed = True
+        elif entry is not None:
+            # the file was modified just now and it could change again without changing its timestamps,
+            # don't trust the stat data until the file gets older
+            del self._stat_cache[n]
+            self._stat_cache_changed = True
+        return md5
+
+    def write_stat_cache(self):
+        """
+        Save checksums computed by ``file_md5()`` to the store.
+        The entries of files that are no longer in the working copy are dropped.
+        """
+        if not self._stat_cache_changed:
+            return
+        known = set(self.filenamelist) | set(self.to_be_added)
+        self._stat_cache = {name: entry for name, entry in self._stat_cache.items() if name in known}
+        try:
+            self.store.stat_cache = self._stat_cache
+        except OSError:
+            # the cache is only an optimization, the working copy may be read-only
+            pass
+        self._stat_cache_changed = False
 
     def get_status(self, excluded=False, *exclude_states):
         global store
@@ -955,6 +1181,7 @@ class Package:
             st = self.status(fname)
             if st not in exclude_states:
                 res.append((st, fname))
+        self.write_stat_cache()
         return res
 
     def status(self, n):
@@ -976,8 +1203,6 @@ class Package:
               -       x            x        '!'
               -       -            -        NOT DEFINED
         """
-        from ..core import dgst
-
         known_by_meta = False
         exists = False
         exists_in_store = False
@@ -1003,9 +1228,9 @@ class Package:
             filemeta = self.findfilebyname(n)
             state = ' '
             if conf.config['status_mtime_heuristic']:
-                if os.path.getmtime(localfile) != filemeta.mtime and dgst(localfile) != filemeta.md5:
+                if os.path.getmtime(localfile) != filemeta.mtime and self.file_md5(n) != filemeta.md5:
                     state = 'M'
-            elif dgst(localfile) != filemeta.md5:
+            elif self.file_md5(n) != filemeta.md5:
                 state = 'M'
         elif n in self.to_be_added and not exists:
             state = '!'
@@ -1154,6 +1379,7 @@ class Package:
                     if tmpfile is not None and os.path.exists(tmpfile):
                         os.unlink(tmpfile)
                 yield diff
+        self.write_stat_cache()
 
         for f in added:
             yield diff_add_delete(f, True, revision)
@@ -1308,9 +1534,9 @@ rev: %s
         added = []
         deleted = []
         services = []
-        revfilenames = []
+        revfilenames = set()
         for f in revfiles:
-            revfilenames.append(f.name)
+            revfilenames.add(f.name)
             # treat skipped like deleted files
             if f.skipped:
                 if f.name.startswith('_service:'):
@@ -1367,7 +1593,14 @@ rev: %s
                 return True
         return sinfo.get('srcmd5') != self.srcmd5
 
-    def update(self, rev=None, service_files=False, size_limit=None):
+    def update(self, rev=None, service_files=False, size_limit=None, cpio_bulk_download=None, download_workers=None):
+        """
+        Update the working copy to revision ``rev`` (the latest revision by default).
+
+        :param cpio_bulk_download: Download the files as a single cpio archive if possible.
+                                   Defaults to ``checkout_cpio_bulk_download`` from oscrc.
+        :param download_workers: Maximum number of concurrent downloads. Defaults to ``http_pool_size`` from oscrc.
+        """
         from ..core import ET_ENCODING
         from ..core import dgst
 
@@ -1383,25 +1616,29 @@ rev: %s
             root = xml_parse(os.path.join(self.storedir, '_in_update', '_files')).getroot()
             rfiles = self.__get_files(root)
             kept, added, deleted, services = self.__get_rev_changes(rfiles)
-            # check if we aborted in the middle of a file update
-            broken_file = os.listdir(os.path.join(self.storedir, '_in_update'))
-            broken_file.remove('_files')
-            if len(broken_file) == 1:
-                origfile = os.path.join(self.storedir, '_in_update', broken_file[0])
-                wcfile = os.path.join(self.absdir, broken_file[0])
-                origfile_md5 = dgst(origfile)
-                origfile_meta = self.findfilebyname(broken_file[0])
+            # check if we aborted in the middle of file updates
+            # (several files are updated concurrently, each of them has its original in the _in_update dir)
+            broken_files = sorted(os.listdir(os.path.join(self.storedir, '_in_update')))
+            broken_files.remove('_files')
+            # the working copy files of the broken updates contain the original data again,
+            # they must be updated even if their storefiles are already up to date
+            interrupted = set()
+            for broken_file in broken_files:
+                origfile = os.path.join(self.storedir, '_in_update', broken_file)
+                wcfile = os.path.join(self.absdir, broken_file)
                 if origfile.endswith('.copy'):
                     # ok it seems we aborted at some point during the copy process
                     # (copy process == copy wcfile to the _in_update dir). remove file+continue
                     os.unlink(origfile)
-                elif self.findfilebyname(broken_file[0]) is None:
+                    continue
+                origfile_md5 = dgst(origfile)
+                if self.findfilebyname(broken_file) is None:
                     # should we remove this file from _in_update? if we don't
                     # the user has no chance to continue without removing the file manually
                     raise oscerr.PackageInternalError(self.prjname, self.name,
-                                                      '\'%s\' is not known by meta but exists in \'_in_update\' dir')
+                                                      '\'%s\' is not known by meta but exists in \'_in_update\' dir' % broken_file)
                 elif os.path.isfile(wcfile) and dgst(wcfile) != origfile_md5:
-                    (fd, tmpfile) = tempfile.mkstemp(dir=self.absdir, prefix=broken_file[0] + '.')
+                    (fd, tmpfile) = tempfile.mkstemp(dir=self.absdir, prefix=broken_file + '.')
                     os.close(fd)
                     os.rename(wcfile, tmpfile)
                     os.rename(origfile, wcfile)
@@ -1414,10 +1651,14 @@ rev: %s
                 else:
                     # everything seems to be ok
                     os.unlink(origfile)
-            elif len(broken_file) > 1:
-                raise oscerr.PackageInternalError(self.prjname, self.name, 'too many files in \'_in_update\' dir')
+                interrupted.add(broken_file)
             tmp = rfiles[:]
             for f in tmp:
+                if f.name in interrupted:
+                    continue
+                if f in added and not os.path.isfile(os.path.join(self.absdir, f.name)):
+                    # aborted after the storefile was downloaded, the working copy file is missing
+                    continue
                 if self.store.sources_is_file(f.name):
                     if dgst(self.store.sources_get_path(f.name)) == f.md5:
                         if f in kept:
@@ -1429,7 +1670,8 @@ rev: %s
                             deleted.remove(f)
             if not service_files:
                 services = []
-            self.__update(kept, added, deleted, services, ET.tostring(root, encoding=ET_ENCODING), root.get('rev'))
+            self.__update(kept, added, deleted, services, ET.tostring(root, encoding=ET_ENCODING), root.get('rev'),
+                          cpio_bulk_download=cpio_bulk_download)
             os.unlink(os.path.join(self.storedir, '_in_update', '_files'))
             os.rmdir(os.path.join(self.storedir, '_in_update'))
         # ok everything is ok (hopefully)...
@@ -1440,13 +1682,14 @@ rev: %s
         kept, added, deleted, services = self.__get_rev_changes(rfiles)
         if not service_files:
             services = []
-        self.__update(kept, added, deleted, services, fm, root.get('rev'))
+        self.__update(kept, added, deleted, services, fm, root.get('rev'), cpio_bulk_download=cpio_bulk_download,
+                      download_workers=download_workers)
         os.unlink(os.path.join(self.storedir, '_in_update', '_files'))
         if os.path.isdir(os.path.join(self.storedir, '_in_update')):
             os.rmdir(os.path.join(self.storedir, '_in_update'))
         self.size_limit = old_size_limit
 
-    def __update(self, kept, added, deleted, services, fm, rev):
+    def __update(self, kept, added, deleted, services, fm, rev, cpio_bulk_download=None, download_workers=None):
         from ..core import get_source_file
         from ..core import getTransActPath
         from ..core import statfrmt
@@ -1458,8 +1701,43 @@ rev: %s
                 raise oscerr.PackageFileConflict(self.prjname, self.name, f.name,
                                                  f'failed to add file \'{f.name}\' file/dir with the same name already exists')
         # ok, the update can't fail due to existing files
+        # the files that don't need a merge are downloaded first, all at once
+        states = {f.name: self.status(f.name) for f in kept}
+        to_update = list(added)
+        to_fetch = []
+        for f in kept:
+            state = states[f.name]
+            if state == '!':
+                to_update.append(f)
+            elif state == 'C':
+                to_fetch.append((f, self.store.sources_get_path(f.name)))
+            elif state == 'D' and self.findfilebyname(f.name).md5 != f.md5:
+                if not os.path.exists(os.path.join(self.absdir, f.name)):
+                    to_update.append(f)
+            elif state == ' ' and self.findfilebyname(f.name).md5 != f.md5:
+                to_update.append(f)
+
+        # checkout service files
+        for f in services:
+            to_fetch.append((f, os.path.join(self.absdir, f.name)))
+
+        def fetch(item, progress):
+            f, targetfilename = item
+            get_source_file(self.apiurl, self.prjname, self.name, f.name,
+                            targetfilename=targetfilename, revision=rev,
+                            progress_obj=self.progress_obj if progress else None, mtime=f.mtime, meta=self.meta,
+                            size=f.size, md5=f.md5)
+
+        updated = {f.name for f in to_update}
+        if cpio_bulk_download is None:
+            cpio_bulk_download = conf.config["checkout_cpio_bulk_download"]
+        if cpio_bulk_download and len(to_update) + len(to_fetch) > 1:
+            rfiles = self.__get_files(xml_fromstring(fm))
+            to_update, to_fetch = self._update_from_cpio(to_update, to_fetch, rev, rfiles)
+        self.updatefiles(to_update, rev, max_workers=download_workers)
+        self._map_files(fetch, to_fetch, max_workers=download_workers)
+
         for f in added:
-            self.updatefile(f.name, rev, f.mtime)
             print(statfrmt('A', os.path.join(pathn, f.name)))
         for f in deleted:
             # if the storefile doesn't exist we're resuming an aborted update:
@@ -1478,28 +1756,24 @@ rev: %s
                 self.write_conflictlist()
 
         for f in kept:
-            state = self.status(f.name)
+            state = states[f.name]
 #            print f.name, state
             if state == 'M' and self.findfilebyname(f.name).md5 == f.md5:
                 # remote file didn't change
                 pass
             elif state == 'M':
                 # try to merge changes
-                merge_status = self.mergefile(f.name, rev, f.mtime)
+                merge_status = self.mergefile(f.name, rev, f.mtime, f.size, f.md5)
                 print(statfrmt(merge_status, os.path.join(pathn, f.name)))
             elif state == '!':
-                self.updatefile(f.name, rev, f.mtime)
                 print(f'Restored \'{os.path.join(pathn, f.name)}\'')
             elif state == 'C':
-                get_source_file(self.apiurl, self.prjname, self.name, f.name,
-                                targetfilename=self.store.sources_get_path(f.name), revision=rev,
-                                progress_obj=self.progress_obj, mtime=f.mtime, meta=self.meta)
                 print(f'skipping \'{f.name}\' (this is due to conflicts)')
             elif state == 'D' and self.findfilebyname(f.name).md5 != f.md5:
                 # XXX: in the worst case we might end up with f.name being
                 # in _to_be_deleted and in _in_conflict... this needs to be checked
-                if os.path.exists(os.path.join(self.absdir, f.name)):
-                    merge_status = self.mergefile(f.name, rev, f.mtime)
+                if f.name not in updated:
+                    merge_status = self.mergefile(f.name, rev, f.mtime, f.size, f.md5)
                     print(statfrmt(merge_status, os.path.join(pathn, f.name)))
                     if merge_status == 'C':
                         # state changes from delete to conflict
@@ -1508,17 +1782,11 @@ rev: %s
                 else:
                     # XXX: we cannot recover this case because we've no file
                     # to backup
-                    self.updatefile(f.name, rev, f.mtime)
                     print(statfrmt('U', os.path.join(pathn, f.name)))
             elif state == ' ' and self.findfilebyname(f.name).md5 != f.md5:
-                self.updatefile(f.name, rev, f.mtime)
                 print(statfrmt('U', os.path.join(pathn, f.name)))
 
-        # checkout service files
         for f in services:
-            get_source_file(self.apiurl, self.prjname, self.name, f.name,
-                            targetfilename=os.path.join(self.absdir, f.name), revision=rev,
-                            progress_obj=self.progress_obj, mtime=f.mtime, meta=self.meta)
             print(statfrmt('A', os.path.join(pathn, f.name)))
         store_write_string(self.absdir, '_files', fm)
         if not self.meta:
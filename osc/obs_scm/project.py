@@ -1,10 +1,12 @@
 import fnmatch
 import os
+import threading
 from pathlib import Path
 from typing import Optional
 
 from .. import conf
 from .. import oscerr
+from .. import output
 from ..util.xml import ET
 from ..util.xml import xml_parse
 from .store import Store
@@ -90,6 +92,8 @@ class Project:
         self.absdir = os.path.abspath(dir)
         self.store = Store(dir, check=wc_check)
         self.progress_obj = progress_obj
+        # guards ``pac_root`` and the ``_packages`` file when the packages are checked out concurrently
+        self.packages_lock = threading.RLock()
 
         self.name = store_read_project(self.dir)
         self.scm_url = self.store.scmurl
@@ -165,11 +169,31 @@ class Project:
 
         return repaired
 
-    def checkout_missing_pacs(self, sinfos, expand_link=False, unexpand_link=False):
+    @staticmethod
+    def get_download_workers(jobs):
+        """
+        Return the maximum number of concurrent downloads of a package when ``jobs`` packages are processed concurrently.
+        The downloads of all packages share the ``http_pool_size`` connections to the server.
+        ``None`` stands for the default of a single package.
+        """
+        if jobs <= 1:
+            return None
+        return max(1, int(conf.config["http_pool_size"]) // jobs)
+
+    def checkout_missing_pacs(self, sinfos, expand_link=False, unexpand_link=False, jobs=1):
+        """
+        Check out packages that exist on the server but not in the working copy.
+
+        :param jobs: Number of packages checked out concurrently.
+        """
         from ..core import checkout_package
         from ..core import getTransActPath
 
-        for pac in self.pacs_missing:
+        # progress bars of concurrent downloads would mix up
+        progress_obj = self.progress_obj if jobs <= 1 else None
+        download_workers = self.get_download_workers(jobs)
+
+        def checkout(pac):
             if conf.config['do_package_tracking'] and pac in self.pacs_unvers:
                 # pac is not under version control but a local file/dir exists
                 msg = f'can\'t add package \'{pac}\': Object already exists'
@@ -179,20 +203,23 @@ class Project:
                 sinfo = sinfos.get(pac)
                 if sinfo is None:
                     # should never happen...
-                    continue
+                    return
                 linked = sinfo.find('linked')
                 if linked is not None and linked.get('project') == self.name:
                     # hmm what about a linkerror (sinfo.get('lsrcmd5') is None)?
                     # Should we skip the package as well or should we it out?
                     # let's skip it for now
                     print(f"Skipping {pac} (link to package {linked.get('package')})")
-                    continue
+                    return
 
             print(f'checking out new package {pac}')
             checkout_package(self.apiurl, self.name, pac,
                              pathname=getTransActPath(os.path.join(self.dir, pac)),
                              prj_obj=self, prj_dir=self.dir,
-                             expand_link=expand_link or not unexpand_link, progress_obj=self.progress_obj)
+                             expand_link=expand_link or not unexpand_link, progress_obj=progress_obj,
+                             download_workers=download_workers)
+
+        output.ordered_map(checkout, self.pacs_missing, jobs)
 
     def status(self, pac: str):
         exists = os.path.exists(os.path.join(self.absdir, pac))
@@ -230,11 +257,12 @@ class Project:
             return None
 
     def set_state(self, pac, state):
-        node = self.get_package_node(pac)
-        if node is None:
-            self.new_package_entry(pac, state)
-        else:
-            node.set('state', state)
+        with self.packages_lock:
+            node = self.get_package_node(pac)
+            if node is None:
+                self.new_package_entry(pac, state)
+            else:
+                node.set('state', state)
 
     def get_package_node(self, pac: str):
         for node in self.pac_root.findall('package'):
@@ -243,9 +271,10 @@ class Project:
         return None
 
     def del_package_node(self, pac):
-        for node in self.pac_root.findall('package'):
-            if pac == node.get('name'):
-                self.pac_root.remove(node)
+        with self.packages_lock:
+            for node in self.pac_root.findall('package'):
+                if pac == node.get('name'):
+                    self.pac_root.remove(node)
 
     def get_state(self, pac: str):
         node = self.get_package_node(pac)
@@ -263,7 +292,8 @@ class Project:
         return r
 
     def new_package_entry(self, name, state):
-        ET.SubElement(self.pac_root, 'package', name=name, state=state)
+        with self.packages_lock:
+            ET.SubElement(self.pac_root, 'package', name=name, state=state)
 
     def read_packages(self):
         """
@@ -301,8 +331,9 @@ class Project:
         from ..core import ET_ENCODING
         from ..core import xmlindent
 
-        xmlindent(self.pac_root)
-        store_write_string(self.absdir, '_packages', ET.tostring(self.pac_root, encoding=ET_ENCODING))
+        with self.packages_lock:
+            xmlindent(self.pac_root)
+            store_write_string(self.absdir, '_packages', ET.tostring(self.pac_root, encoding=ET_ENCODING))
 
     def addPackage(self, pac):
         for i in conf.config['exclude_glob']:
@@ -362,16 +393,28 @@ class Project:
         else:
             print('unsupported state')
 
-    def update(self, pacs=(), expand_link=False, unexpand_link=False, service_files=False):
+    def update(self, pacs=(), expand_link=False, unexpand_link=False, service_files=False, jobs=1):
+        """
+        Update the packages and check out the new ones.
+
+        :param jobs: Number of packages updated concurrently.
+                     The output is printed in the same order as if the packages were updated one by one.
+        """
         from ..core import Package
         from ..core import checkout_package
         from ..core import get_project_sourceinfo
         from ..core import getTransActPath
         from ..core import show_upstream_xsrcmd5
 
+        # progress bars of concurrent downloads would mix up
+        progress_obj = self.progress_obj if jobs <= 1 else None
+        download_workers = self.get_download_workers(jobs)
+
         if pacs:
-            for pac in pacs:
-                Package(os.path.join(self.dir, pac), progress_obj=self.progress_obj).update()
+            def update_package(pac):
+                Package(os.path.join(self.dir, pac), progress_obj=progress_obj).update(download_workers=download_workers)
+
+            output.ordered_map(update_package, pacs, jobs)
         else:
             # we need to make sure that the _packages file will be written (even if an exception
             # occurs)
@@ -395,22 +438,23 @@ class Project:
                     self.pac_root.remove(self.get_package_node(pac))
                     self.pacs_have.remove(pac)
 
-                for pac in self.pacs_have:
+                def update_package(pac):
                     state = self.get_state(pac)
                     if pac in self.pacs_broken:
                         if self.get_state(pac) != 'A':
                             checkout_package(self.apiurl, self.name, pac,
                                              pathname=getTransActPath(os.path.join(self.dir, pac)), prj_obj=self,
-                                             prj_dir=self.dir, expand_link=not unexpand_link, progress_obj=self.progress_obj)
+                                             prj_dir=self.dir, expand_link=not unexpand_link, progress_obj=progress_obj,
+                                             download_workers=download_workers)
                     elif state == ' ':
                         # do a simple update
-                        p = Package(os.path.join(self.dir, pac), progress_obj=self.progress_obj)
+                        p = Package(os.path.join(self.dir, pac), progress_obj=progress_obj)
                         rev = None
                         needs_update = True
                         if p.scm_url is not None:
                             # git managed.
                             print("Skipping git managed package ", pac)
-                            continue
+                            return
                         elif expand_link and p.islink() and not p.isexpanded():
                             if p.haslinkerror():
                                 try:
@@ -438,16 +482,16 @@ class Project:
                             needs_update = p.update_needed(sinfos[p.name])
                         print(f'Updating {p.name}')
                         if needs_update:
-                            p.update(rev, service_files)
+                            p.update(rev, service_files, download_workers=download_workers)
                         else:
                             print(f'At revision {p.rev}.')
                         if unexpand_link:
                             p.unmark_frozen()
                     elif state == 'D':
                         # pac exists (the non-existent pac case was handled in the first if block)
-                        p = Package(os.path.join(self.dir, pac), progress_obj=self.progress_obj)
+                        p = Package(os.path.join(self.dir, pac), progress_obj=progress_obj)
                         if p.update_needed(sinfos[p.name]):
-                            p.update()
+                            p.update(download_workers=download_workers)
                     elif state == 'A' and pac in self.pacs_available:
                         # file/dir called pac already exists and is under version control
                         msg = f'can\'t add package \'{pac}\': Object already exists'
@@ -458,7 +502,9 @@ class Project:
                     else:
                         print(f'unexpected state.. package \'{pac}\'')
 
-                self.checkout_missing_pacs(sinfos, expand_link, unexpand_link)
+                output.ordered_map(update_package, self.pacs_have, jobs)
+
+                self.checkout_missing_pacs(sinfos, expand_link, unexpand_link, jobs=jobs)
             finally:
                 self.write_packages()
 
@@ -269,6 +269,33 @@ class Store:
         self.assert_is_package()
         return self.write_list("_in_conflict", value)
 
+    @property
+    def stat_cache(self):
+        """
+        Checksums of the working copy files along with their stat data
+        as a dictionary ``{file name: (size, mtime_ns, ctime_ns, inode, md5)}``.
+        """
+        self.assert_is_package()
+        result = {}
+        for line in self.read_list("_stat_cache") or []:
+            try:
+                md5, size, mtime_ns, ctime_ns, inode, name = line.split(" ", 5)
+                result[name] = (int(size), int(mtime_ns), int(ctime_ns), int(inode), md5)
+            except ValueError:
+                # the cache gets rebuilt, ignore invalid lines
+                continue
+        return result
+
+    @stat_cache.setter
+    def stat_cache(self, value):
+        self.assert_is_package()
+        lines = []
+        for name, (size, mtime_ns, ctime_ns, inode, md5) in sorted(value.items()):
+            if "\n" in name:
+                continue
+            lines.append(f"{md5} {size} {mtime_ns} {ctime_ns} {inode} {name}")
+        return self.write_list("_stat_cache", lines)
+
     @property
     def osclib_version(self):
         return self.read_string("_osclib_version")
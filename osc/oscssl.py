@@ -5,7 +5,10 @@ import ssl
 import subprocess
 import sys
 import tempfile
+import threading
+import time
 import typing
+import weakref
 
 from cryptography import x509
 from cryptography.hazmat.primitives import hashes
@@ -21,14 +24,101 @@ X509_V_ERR_DEPTH_ZERO_SELF_SIGNED_CERT = 18
 X509_V_ERR_SELF_SIGNED_CERT_IN_CHAIN = 19
 
 
-def create_ssl_context():
+class SessionReuseSSLSocket(ssl.SSLSocket):
+    def close(self):
+        # remember the session before the connection is closed
+        if isinstance(self.context, SessionReuseSSLContext):
+            self.context._store_session(self)
+        super().close()
+
+
+class SessionReuseSSLContext(ssl.SSLContext):
+    """
+    SSL context that resumes the TLS session of the previous connections to the server.
+    A resumed session skips the certificate exchange and verification
+    and saves a round trip on TLSv1.2 when the pool opens a new connection.
+
+    Use the context for connections to a single server only.
+    """
+
+    sslsocket_class = SessionReuseSSLSocket
+
+    @classmethod
+    def from_context(cls, ssl_context):
+        """
+        Create a new context with the same settings as ``ssl_context``.
+        Certificates loaded into ``ssl_context`` are not copied.
+        """
+        result = cls(ssl_context.protocol)
+        result.options = ssl_context.options
+        result.verify_flags = ssl_context.verify_flags
+        # check_hostname must be disabled before verify_mode can be set to CERT_NONE
+        result.check_hostname = ssl_context.check_hostname
+        result.verify_mode = ssl_context.verify_mode
+        ciphers = [i["name"] for i in ssl_context.get_ciphers() if i["protocol"] != "TLSv1.3"]
+        if ciphers:
+            result.set_ciphers(":".join(ciphers))
+        # the attributes are not available in older python versions
+        for name in ("minimum_version", "maximum_version", "post_handshake_auth", "hostname_checks_common_name", "keylog_filename"):
+            if hasattr(ssl_context, name):
+                setattr(result, name, getattr(ssl_context, name))
+        result._init_session_reuse()
+        return result
+
+    def _init_session_reuse(self):
+        self._session_lock = threading.RLock()
+        self._session = None
+        # TLSv1.3 servers send the session ticket after the handshake, it can be obtained from an open socket later
+        self._sockets = weakref.WeakSet()
+
+    def _store_session(self, sock):
+        with self._session_lock:
+            if sock not in self._sockets:
+                return
+            try:
+                session = sock.session
+                version = sock.version()
+            except (OSError, ValueError):
+                return
+            if session is None:
+                return
+            if session.has_ticket or (version != "TLSv1.3" and session.id):
+                self._session = session
+                self._sockets.discard(sock)
+
+    def _get_session(self):
+        with self._session_lock:
+            for sock in list(self._sockets):
+                self._store_session(sock)
+            session = self._session
+            if session is not None and time.time() > session.time + session.timeout:
+                # expired
+                self._session = session = None
+            return session
+
+    def wrap_socket(self, sock, *args, **kwargs):
+        if kwargs.get("session", None) is None and not kwargs.get("server_side", False):
+            kwargs["session"] = self._get_session()
+        ssl_sock = super().wrap_socket(sock, *args, **kwargs)
+        if not ssl_sock.session_reused:
+            with self._session_lock:
+                self._sockets.add(ssl_sock)
+        return ssl_sock
+
+
+def create_ssl_context(session_reuse=False):
     """
     Create a ssl context with disabled weak crypto.
 
     Relatively safe defaults are set in urllib3 already,
     but we restrict crypto even more.
+
+    :param session_reuse: Return ``SessionReuseSSLContext`` that resumes TLS sessions.
     """
     ssl_context = create_urllib3_context()
+    if session_reuse:
+        # keep urllib3's defaults
+        ssl_context = SessionReuseSSLContext.from_context(ssl_context)
     # we consider anything older than TLSv1_2 insecure
     if sys.version_info[:2] <= (3, 6):
         # deprecated since py3.7
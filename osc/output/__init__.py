@@ -1,5 +1,7 @@
 from .key_value_table import KeyValueTable
 from .input import get_user_input
+from .ordered import bind_task_output
+from .ordered import ordered_map
 from .output import get_default_pager
 from .output import pipe_to_pager
 from .output import print_msg
@@ -0,0 +1,154 @@
+import concurrent.futures
+import io
+import sys
+import threading
+
+
+# buffers of the ordered_map() task running in the current thread
+_local = threading.local()
+_install_lock = threading.Lock()
+
+
+class TaskBufferedStream:
+    """
+    Replacement for ``sys.stdout`` or ``sys.stderr`` that writes to a buffer of the ``ordered_map()`` task
+    running in the current thread, otherwise to the original stream.
+    """
+
+    def __init__(self, stream, name):
+        self._stream = stream
+        self._name = name
+
+    def _target(self):
+        buffers = getattr(_local, "buffers", None)
+        if buffers is None:
+            return self._stream
+        return buffers[self._name]
+
+    def write(self, text):
+        return self._target().write(text)
+
+    def flush(self):
+        return self._target().flush()
+
+    @property
+    def buffer(self):
+        return self._target().buffer
+
+    def __getattr__(self, name):
+        # isatty(), fileno(), encoding etc. are answered by the original stream
+        return getattr(self._stream, name)
+
+
+def _install_streams():
+    """
+    Route ``sys.stdout`` and ``sys.stderr`` through ``TaskBufferedStream``.
+
+    The streams are not swapped back once the tasks finish.
+    The output of threads that don't run a task goes straight to the original streams,
+    so other threads such as progress meters are never captured and their output can't get lost
+    by restoring the streams while they write.
+    """
+    with _install_lock:
+        for name in ("stdout", "stderr"):
+            stream = getattr(sys, name)
+            if not isinstance(stream, TaskBufferedStream):
+                setattr(sys, name, TaskBufferedStream(stream, name))
+
+
+def bind_task_output(func):
+    """
+    Return a function that calls ``func`` with the output buffers of the ``ordered_map()`` task
+    running in the current thread. Use it for passing work of a task to other threads
+    whose output belongs to the task.
+    """
+    buffers = getattr(_local, "buffers", None)
+    if buffers is None:
+        return func
+
+    def wrapper(*args, **kwargs):
+        previous = getattr(_local, "buffers", None)
+        _local.buffers = buffers
+        try:
+            return func(*args, **kwargs)
+        finally:
+            _local.buffers = previous
+
+    return wrapper
+
+
+def _create_buffer(stream):
+    encoding = getattr(stream, "encoding", None) or "utf-8"
+    # write_through keeps the order of the text and binary writes
+    return io.TextIOWrapper(io.BytesIO(), encoding=encoding, errors="replace", write_through=True)
+
+
+def _replay_buffer(buf, stream):
+    data = buf.buffer.getvalue()
+    if not data:
+        return
+    stream.flush()
+    if hasattr(stream, "buffer"):
+        stream.buffer.write(data)
+        stream.buffer.flush()
+    else:
+        stream.write(data.decode(buf.encoding, errors="replace"))
+        stream.flush()
+
+
+def ordered_map(func, items, jobs=1):
+    """
+    Call ``func(item)`` for each of the ``items`` from up to ``jobs`` threads and return the results in the same order.
+
+    Output that ``func`` prints to stdout and stderr is buffered and printed in the order of ``items``
+    as soon as the calls for all previous items have finished. The output looks the same as if the calls
+    were made one by one. ``func`` must not ask for user input.
+
+    If a call raises an exception, the remaining items are not started.
+    The exception of the first failed item is raised after the output of the finished calls is printed.
+    """
+    items = list(items)
+    if jobs <= 1 or len(items) <= 1:
+        return [func(item) for item in items]
+
+    _install_streams()
+
+    def worker(item):
+        buffers = {
+            "stdout": _create_buffer(sys.stdout),
+            "stderr": _create_buffer(sys.stderr),
+        }
+        previous = getattr(_local, "buffers", None)
+        _local.buffers = buffers
+        try:
+            return buffers, func(item), None
+        except BaseException as e:
+            return buffers, None, e
+        finally:
+            _local.buffers = previous
+
+    results = [None] * len(items)
+    error = None
+    with concurrent.futures.ThreadPoolExecutor(max_workers=min(jobs, len(items))) as executor:
+        futures = [executor.submit(worker, item) for item in items]
+        try:
+            for num, future in enumerate(futures):
+                if future.cancelled():
+                    continue
+                buffers, result, exc = future.result()
+                # the output goes to the buffer of the calling task if ordered_map() is nested in another one
+                _replay_buffer(buffers["stdout"], sys.stdout)
+                _replay_buffer(buffers["stderr"], sys.stderr)
+                results[num] = result
+                if exc is not None and error is None:
+                    error = exc
+                    for i in futures:
+                        i.cancel()
+        except BaseException:
+            for i in futures:
+                i.cancel()
+            raise
+
+    if error is not None:
+        raise error
+    return results
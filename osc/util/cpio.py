@@ -215,6 +215,114 @@ class CpioRead:
             self._copyin_file(h, dest, h.filename)
 
 
+class CpioStreamRead:
+    """
+    Represents a cpio archive that is read sequentially from a file-like object
+    which doesn't have to be seekable (a HTTP response for example).
+    The members are available only while iterating over the archive,
+    their data must be consumed before advancing to the next member.
+    Supported formats:
+    * ascii SVR4 no CRC also called "new_ascii"
+    """
+
+    sfmt = CpioRead.sfmt
+    hdr_fmt = CpioRead.hdr_fmt
+    hdr_len = CpioRead.hdr_len
+
+    def __init__(self, fileobj, name=None):
+        self._file = fileobj
+        self.filename = name or getattr(fileobj, "name", "<stream>")
+        # the header of the current member
+        self._hdr = None
+        # unread data of the current member incl. padding
+        self._remaining = 0
+        self._padding = 0
+
+    def __iter__(self):
+        while True:
+            hdr = self._read_hdr()
+            if hdr is None:
+                break
+            yield hdr
+
+    @staticmethod
+    def _calc_padding(off):
+        return (4 - (off % 4)) % 4
+
+    def _read_exact(self, size):
+        result = bytearray()
+        while len(result) < size:
+            data = self._file.read(size - len(result))
+            if not data:
+                raise CpioError(self.filename, 'unexpected end of archive')
+            result.extend(data)
+        return bytes(result)
+
+    def _skip(self, size):
+        while size > 0:
+            data = self._file.read(min(size, 1024 * 1024))
+            if not data:
+                raise CpioError(self.filename, 'unexpected end of archive')
+            size -= len(data)
+
+    def _read_hdr(self):
+        # skip data of the previous member that wasn't consumed
+        self._skip(self._remaining + self._padding)
+        self._remaining = 0
+        self._padding = 0
+        self._hdr = None
+
+        data = self._read_exact(self.hdr_len)
+        if data[:6] not in self.sfmt.values():
+            raise CpioError(self.filename, '\'%s\' is not a supported cpio format' % data[:6])
+        hdr = CpioHdr(*struct.unpack(self.hdr_fmt, data))
+        name = self._read_exact(hdr.namesize)
+        self._skip(self._calc_padding(self.hdr_len + hdr.namesize))
+        hdr.filename = name[:-1]
+        if hdr.filename == b'TRAILER!!!':
+            return None
+
+        self._hdr = hdr
+        self._remaining = hdr.filesize
+        self._padding = self._calc_padding(hdr.filesize)
+        return hdr
+
+    def read(self, size=-1):
+        """
+        Read up to ``size`` bytes of data of the current member.
+        Read all remaining data of the member if ``size`` is negative.
+        """
+        if size < 0 or size > self._remaining:
+            size = self._remaining
+        if not size:
+            return b''
+        data = self._file.read(size)
+        if not data:
+            raise CpioError(self.filename, 'unexpected end of archive')
+        self._remaining -= len(data)
+        return data
+
+    def copyin_fileobj(self, fileobj, *hashers, bufsize=1024 * 1024):
+        """
+        Write data of the current member to ``fileobj``.
+        The ``hashers`` (for example ``hashlib.md5()`` objects) get updated with the data on the fly,
+        which saves reading the written file again when its checksum is needed.
+        """
+        hdr = self._hdr
+        if hdr is None:
+            raise CpioError(self.filename, 'there is no member to extract')
+        if not stat.S_ISREG(stat.S_IFMT(hdr.mode)):
+            msg = '\'%s\' is no regular file - only regular files are supported atm' % hdr.filename
+            raise NotImplementedError(msg)
+        while True:
+            data = self.read(bufsize)
+            if not data:
+                break
+            fileobj.write(data)
+            for hasher in hashers:
+                hasher.update(data)
+
+
 class CpioWrite:
     """cpio archive small files in memory, using new style portable header format"""
 
@@ -0,0 +1,122 @@
+"""
+A list that keeps its items indexed for membership tests and lookups in constant time.
+"""
+
+
+class IndexedList(list):
+    """
+    List with O(1) ``in`` operator and lookups by key.
+
+    :param key: Function returning the key of an item. The items themselves are the keys by default.
+                If it is specified, the ``in`` operator compares the items as a plain list does
+                and the items are looked up by their keys with ``get()``.
+                The list can be pickled only if the function can, use ``operator.attrgetter()``
+                or a module-level function rather than a lambda.
+    """
+
+    def __init__(self, iterable=(), key=None):
+        super().__init__(iterable)
+        self._key = key
+        self._reindex()
+
+    def __reduce__(self):
+        # don't share the index with copies
+        return (self.__class__, (list(self), self._key))
+
+    def _get_key(self, item):
+        if self._key is None:
+            return item
+        return self._key(item)
+
+    def _reindex(self):
+        self._index = {}
+        for item in self:
+            self._index_add(item)
+
+    def _index_add(self, item):
+        self._index.setdefault(self._get_key(item), []).append(item)
+
+    def _index_remove(self, item):
+        key = self._get_key(item)
+        items = self._index[key]
+        items.remove(item)
+        if not items:
+            del self._index[key]
+
+    def __contains__(self, item):
+        if self._key is not None:
+            return super().__contains__(item)
+        try:
+            return item in self._index
+        except TypeError:
+            # unhashable items cannot be in the index
+            return False
+
+    def get(self, key, default=None):
+        """
+        Return the first item with the given ``key`` or ``default`` if there is no such item.
+        """
+        items = self._index.get(key, None)
+        if not items:
+            return default
+        return items[0]
+
+    def append(self, item):
+        super().append(item)
+        self._index_add(item)
+
+    def extend(self, iterable):
+        items = list(iterable)
+        super().extend(items)
+        for item in items:
+            self._index_add(item)
+
+    def __iadd__(self, iterable):
+        self.extend(iterable)
+        return self
+
+    def insert(self, index, item):
+        super().insert(index, item)
+        # the order of the items with the same key has changed
+        self._reindex()
+
+    def remove(self, item):
+        super().remove(item)
+        if self._key is None:
+            self._index_remove(item)
+        else:
+            # the removed item is equal to ``item`` but its key may differ
+            self._reindex()
+
+    def pop(self, index=-1):
+        item = super().pop(index)
+        if self._key is None:
+            self._index_remove(item)
+        else:
+            self._reindex()
+        return item
+
+    def clear(self):
+        super().clear()
+        self._index = {}
+
+    def __setitem__(self, index, value):
+        super().__setitem__(index, value)
+        self._reindex()
+
+    def __delitem__(self, index):
+        super().__delitem__(index)
+        self._reindex()
+
+    def __imul__(self, value):
+        super().__imul__(value)
+        self._reindex()
+        return self
+
+    def sort(self, *args, **kwargs):
+        super().sort(*args, **kwargs)
+        self._reindex()
+
+    def reverse(self):
+        super().reverse()
+        self._reindex()
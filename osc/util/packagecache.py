@@ -0,0 +1,413 @@
+"""
+Helpers for the package cache (``packagecachedir``) used by ``osc build``.
+"""
+
+
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+
+from . import packagequery
+
+
+class Hdrmd5Index:
+    """
+    Persistent index of hdrmd5 checksums of the files in the package cache.
+
+    The entries are keyed by a path relative to the cache directory
+    and they are valid only as long as size, mtime and inode of the file match.
+    That way only new or changed files need to be parsed again.
+
+    For containers and other non-package files, the hdrmd5 is the md5 of the whole file.
+    """
+
+    FILENAME = ".hdrmd5index.json"
+    VERSION = 1
+
+    def __init__(self, cachedir):
+        self.cachedir = cachedir
+        self.path = os.path.join(cachedir, self.FILENAME)
+        self._entries = {}
+        self._dirty = False
+        # the index is shared by the download threads
+        self._lock = threading.Lock()
+        self.load()
+
+    def load(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        if not isinstance(data, dict) or data.get("version") != self.VERSION:
+            return
+        self._entries = data.get("entries", {})
+
+    def save(self):
+        """
+        Atomically write the index to disk if it has changed.
+        Entries of files that no longer exist are dropped.
+        Failures are ignored, the index is just a cache.
+        """
+        with self._lock:
+            if not self._dirty:
+                return
+            entries = {key: value for key, value in self._entries.items() if os.path.exists(self._abspath(key))}
+            data = {"version": self.VERSION, "entries": entries}
+            try:
+                fd, tmp_path = tempfile.mkstemp(prefix=f"{self.FILENAME}.", dir=self.cachedir)
+            except OSError:
+                return
+            try:
+                with os.fdopen(fd, "w", encoding="utf-8") as f:
+                    json.dump(data, f)
+                os.chmod(tmp_path, 0o644)
+                os.replace(tmp_path, self.path)
+                self._entries = entries
+                self._dirty = False
+            except OSError:
+                pass
+            finally:
+                if os.path.exists(tmp_path):
+                    os.unlink(tmp_path)
+
+    def _key(self, path):
+        return os.path.relpath(os.path.abspath(path), os.path.abspath(self.cachedir))
+
+    def _abspath(self, key):
+        return os.path.join(self.cachedir, key)
+
+    @staticmethod
+    def _stat_key(st):
+        return [st.st_size, st.st_mtime_ns, st.st_ino]
+
+    def get(self, path):
+        """
+        Return the index entry ``{"hdrmd5": ..., "canonname": ...}`` for the given ``path``
+        or ``None`` if the file is not indexed or it has changed since it was indexed.
+        """
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        with self._lock:
+            entry = self._entries.get(self._key(path), None)
+        if not entry or entry["stat"] != self._stat_key(st):
+            return None
+        return entry
+
+    def set(self, path, hdrmd5=None, canonname=None):
+        st = os.stat(path)
+        entry = {
+            "stat": self._stat_key(st),
+            "hdrmd5": hdrmd5,
+            "canonname": canonname,
+        }
+        with self._lock:
+            self._entries[self._key(path)] = entry
+            self._dirty = True
+
+    def is_verified(self, path, keyring):
+        """
+        Return ``True`` if signature of the package in ``path`` was verified with the ``keyring``
+        (a fingerprint of the keys) and the file hasn't changed since.
+        """
+        entry = self.get(path)
+        return bool(entry) and keyring in entry.get("verified", [])
+
+    def set_verified(self, path, keyring):
+        entry = self.get(path)
+        if not entry:
+            try:
+                self.set(path)
+            except OSError:
+                # the file has disappeared
+                return
+            entry = self.get(path)
+            if entry is None:
+                # the file has changed in the meantime
+                return
+        with self._lock:
+            verified = entry.setdefault("verified", [])
+            if keyring not in verified:
+                verified.append(keyring)
+                # the keys of a project change rarely, remember only the recent keyrings
+                del verified[:-4]
+                self._dirty = True
+
+    def md5(self, path):
+        """
+        Return md5 of the whole file in ``path``; re-compute it only if the file has changed.
+        Unlike hdrmd5, it covers the signature header of the package too.
+        """
+        entry = self.get(path)
+        if entry and entry.get("md5", None):
+            return entry["md5"]
+
+        from ..core import dgst
+        md5 = dgst(path)
+        if not entry:
+            self.set(path)
+            entry = self.get(path)
+        if entry:
+            with self._lock:
+                entry["md5"] = md5
+                self._dirty = True
+        return md5
+
+    def hdrmd5(self, path, whole_file=False):
+        """
+        Return hdrmd5 of the package in ``path``; re-compute it only if the file has changed.
+        If ``whole_file`` is set, the checksum is md5 of the whole file (used for containers).
+        """
+        entry = self.get(path)
+        if entry and entry["hdrmd5"]:
+            return entry["hdrmd5"]
+
+        if whole_file:
+            from ..core import dgst
+            hdrmd5 = dgst(path)
+        else:
+            hdrmd5 = packagequery.PackageQuery.queryhdrmd5(path)
+        if hdrmd5:
+            if entry:
+                # the file hasn't changed, keep canonname and the other cached data
+                with self._lock:
+                    entry["hdrmd5"] = hdrmd5
+                    self._dirty = True
+            else:
+                self.set(path, hdrmd5)
+        return hdrmd5
+
+
+class PackageStore:
+    """
+    Content-addressed store of the cached packages keyed by md5 of the whole file.
+
+    The files in the per-project layout of the package cache are hardlinks to the files in the store.
+    Identical binaries cached for different projects are stored only once.
+
+    OBS signs the packages with the key of the project they are published in,
+    so copies of a package share hdrmd5 but may differ in the signature header.
+    The entries therefore also record hdrmd5 and the ``signer`` (a fingerprint of the signing keys)
+    and a package is taken from the store instead of being downloaded only if both match.
+
+    The store also tracks when the packages were used last
+    so the least recently used ones can be evicted when the store exceeds a size limit.
+    """
+
+    DIRNAME = ".store"
+    INDEX_FILENAME = "index.json"
+    VERSION = 2
+
+    def __init__(self, cachedir):
+        self.cachedir = cachedir
+        self.topdir = os.path.join(cachedir, self.DIRNAME)
+        self.index_path = os.path.join(self.topdir, self.INDEX_FILENAME)
+        # {md5: {"hdrmd5": str, "signer": str, "size": int, "last_used": float, "links": [path relative to cachedir]}}
+        self._entries = {}
+        self._dirty = False
+        self._lock = threading.Lock()
+        self.load()
+
+    def load(self):
+        try:
+            with open(self.index_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        if not isinstance(data, dict):
+            return
+        if data.get("version") != self.VERSION:
+            self._remove_stored_files()
+            return
+        self._entries = data.get("entries", {})
+
+    def _remove_stored_files(self):
+        """
+        Remove files of a store with an incompatible index.
+        They are only additional hardlinks to the files in the per-project layout.
+        """
+        try:
+            names = os.listdir(self.topdir)
+        except OSError:
+            return
+        for name in names:
+            path = os.path.join(self.topdir, name)
+            if os.path.isdir(path):
+                shutil.rmtree(path, ignore_errors=True)
+        self._dirty = True
+
+    def save(self):
+        """
+        Atomically write the store index to disk if it has changed.
+        Failures are ignored, the store gets rebuilt as the packages are used again.
+        """
+        with self._lock:
+            if not self._dirty:
+                return
+            data = {"version": self.VERSION, "entries": self._entries}
+            try:
+                os.makedirs(self.topdir, mode=0o755, exist_ok=True)
+                fd, tmp_path = tempfile.mkstemp(prefix=f"{self.INDEX_FILENAME}.", dir=self.topdir)
+            except OSError:
+                return
+            try:
+                with os.fdopen(fd, "w", encoding="utf-8") as f:
+                    json.dump(data, f)
+                os.chmod(tmp_path, 0o644)
+                os.replace(tmp_path, self.index_path)
+                self._dirty = False
+            except OSError:
+                pass
+            finally:
+                if os.path.exists(tmp_path):
+                    os.unlink(tmp_path)
+
+    def __contains__(self, md5):
+        return md5 in self._entries and os.path.isfile(self.path(md5))
+
+    def __len__(self):
+        return len(self._entries)
+
+    def path(self, md5):
+        return os.path.join(self.topdir, md5[:2], md5)
+
+    def find(self, hdrmd5, signer):
+        """
+        Return md5 of a stored package with the given ``hdrmd5`` that was signed by ``signer``
+        or ``None`` if there is no such package.
+        """
+        with self._lock:
+            for md5, entry in self._entries.items():
+                if entry["hdrmd5"] == hdrmd5 and entry["signer"] == signer:
+                    return md5
+        return None
+
+    @property
+    def size(self):
+        return sum(entry["size"] for entry in self._entries.values())
+
+    @property
+    def links(self):
+        return sum(len(entry["links"]) for entry in self._entries.values())
+
+    def _key(self, path):
+        return os.path.relpath(os.path.abspath(path), os.path.abspath(self.cachedir))
+
+    def _record(self, md5, hdrmd5, signer, path, size):
+        entry = self._entries.setdefault(md5, {"hdrmd5": hdrmd5, "signer": signer, "size": size, "last_used": 0, "links": []})
+        key = self._key(path)
+        if key not in entry["links"]:
+            entry["links"].append(key)
+        entry["last_used"] = time.time()
+        self._dirty = True
+
+    @staticmethod
+    def _replace_with_link(src, dst):
+        """
+        Atomically replace ``dst`` with a hardlink to ``src``.
+        """
+        tmp_path = f"{dst}.osc-link-{os.getpid()}-{threading.get_ident()}"
+        os.link(src, tmp_path)
+        try:
+            os.replace(tmp_path, dst)
+        except OSError:
+            os.unlink(tmp_path)
+            raise
+
+    def add(self, path, md5, hdrmd5, signer):
+        """
+        Add a verified package from the per-project layout to the store.
+        ``md5`` is the checksum of the whole file and ``signer`` identifies the keys the package was verified with.
+        If the store contains an identical file already, ``path`` gets replaced with a hardlink to the stored copy.
+        Return ``False`` if the file couldn't be stored, hardlinks are not supported for example.
+        """
+        store_path = self.path(md5)
+        with self._lock:
+            try:
+                st = os.stat(path)
+                try:
+                    store_st = os.stat(store_path)
+                except FileNotFoundError:
+                    store_st = None
+
+                if store_st is None:
+                    os.makedirs(os.path.dirname(store_path), mode=0o755, exist_ok=True)
+                    os.link(path, store_path)
+                elif md5 not in self._entries:
+                    # a file not tracked by the index, store the verified package instead
+                    self._replace_with_link(path, store_path)
+                elif (store_st.st_dev, store_st.st_ino) != (st.st_dev, st.st_ino):
+                    # deduplicate
+                    self._replace_with_link(store_path, path)
+            except OSError:
+                return False
+            self._record(md5, hdrmd5, signer, path, st.st_size)
+        return True
+
+    def link(self, path, hdrmd5, signer):
+        """
+        Make a package with the given ``hdrmd5`` that was signed by ``signer``
+        available in ``path`` in the per-project layout.
+        Return ``False`` if the store doesn't contain such package.
+        """
+        md5 = self.find(hdrmd5, signer)
+        if md5 is None or md5 not in self:
+            return False
+        store_path = self.path(md5)
+        with self._lock:
+            try:
+                os.makedirs(os.path.dirname(path), mode=0o755, exist_ok=True)
+                self._replace_with_link(store_path, path)
+            except OSError:
+                return False
+            self._record(md5, hdrmd5, signer, path, os.stat(store_path).st_size)
+        return True
+
+    def prune(self, max_size, keep=None, dry_run=False):
+        """
+        Evict the least recently used packages until the store size is ``max_size`` bytes or less.
+        The evicted packages are removed from the per-project layout too.
+        Packages with hdrmd5 listed in ``keep`` are never evicted.
+
+        :returns: List of md5 checksums of the evicted files and the number of freed bytes.
+        """
+        keep = keep or set()
+        evicted = []
+        freed = 0
+        with self._lock:
+            size = sum(entry["size"] for entry in self._entries.values())
+            entries = sorted(self._entries.items(), key=lambda item: item[1]["last_used"])
+            for md5, entry in entries:
+                if size <= max_size:
+                    break
+                if entry["hdrmd5"] in keep:
+                    continue
+                evicted.append(md5)
+                freed += entry["size"]
+                size -= entry["size"]
+                if dry_run:
+                    continue
+                store_path = self.path(md5)
+                try:
+                    store_st = os.stat(store_path)
+                except FileNotFoundError:
+                    store_st = None
+                for key in entry["links"]:
+                    link_path = os.path.join(self.cachedir, key)
+                    try:
+                        st = os.stat(link_path)
+                        # remove only links that still point to the stored file
+                        if store_st and (st.st_dev, st.st_ino) == (store_st.st_dev, store_st.st_ino):
+                            os.unlink(link_path)
+                    except OSError:
+                        pass
+                if store_st:
+                    os.unlink(store_path)
+                del self._entries[md5]
+                self._dirty = True
+        return evicted, freed
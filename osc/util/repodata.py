@@ -3,11 +3,15 @@ information instead of scanning individual rpms."""
 
 
 import gzip
+import hashlib
+import json
 import os
+import tempfile
 from xml.etree import ElementTree as ET
 
 from . import rpmquery
 from . import packagequery
+from . import xdg
 
 
 def namespace(name):
@@ -22,6 +26,9 @@ OPERATOR_BY_FLAGS = {
     "GT": ">"
 }
 
+# version of the format of the cached repository data
+CACHE_VERSION = 1
+
 
 def primaryPath(directory):
     """Returns path to the primary repository data file.
@@ -50,28 +57,192 @@ def primaryPath(directory):
     return primaryPath
 
 
-def queries(directory):
+def repomdChecksum(directory):
+    """Returns sha256 checksum of the repomd.xml file that identifies the repository data.
+
+    :param directory: repository directory that contains the repodata subdirectory
+    :rtype: str
+    """
+    metaDataPath = os.path.join(directory, "repodata", "repomd.xml")
+    with open(metaDataPath, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+# the elements of a package in primary.xml that are needed for resolving dependencies
+_DEPENDENCY_COLLECTIONS = (
+    "provides",
+    "requires",
+    "conflicts",
+    "obsoletes",
+    "recommends",
+    "suggests",
+    "supplements",
+    "enhances",
+)
+
+
+def _parseEntry(element):
+    entry = element.get("name")
+    flags = element.get("flags")
+
+    if flags is not None:
+        version = element.get("ver")
+        operator = OPERATOR_BY_FLAGS[flags]
+        entry += " %s %s" % (operator, version)
+
+        release = element.get("rel")
+        if release is not None:
+            entry += "-%s" % release
+
+    return entry
+
+
+def _packageData(element):
+    """Returns a dictionary with the data of a package Element from a primary.xml file
+    that is needed by RepoDataQueryResult.
+    """
+    versionElement = element.find(namespace("common") + "version")
+    locationElement = element.find(namespace("common") + "location")
+    data = {
+        "name": element.findtext(namespace("common") + "name"),
+        "arch": element.findtext(namespace("common") + "arch"),
+        "epoch": versionElement.get("epoch"),
+        "ver": versionElement.get("ver"),
+        "rel": versionElement.get("rel"),
+        "href": locationElement.get("href"),
+    }
+
+    formatElement = element.find(namespace("common") + "format")
+    for collection in _DEPENDENCY_COLLECTIONS:
+        collectionElement = None
+        if formatElement is not None:
+            collectionElement = formatElement.find(namespace("rpm") + collection)
+        if collectionElement is None:
+            continue
+        data[collection] = [_parseEntry(i) for i in collectionElement.findall(namespace("rpm") + "entry")]
+
+    return data
+
+
+def iterPrimary(path):
+    """Yields data of the packages from a gzipped primary.xml file.
+
+    The file is parsed incrementally and the processed elements are discarded,
+    so even primary.xml of a huge repository doesn't have to fit in memory.
+
+    :param path: path to the primary.xml.gz file
+    :return: iterator of dictionaries with the package data
+    """
+    packageTag = namespace("common") + "package"
+    with gzip.open(path) as f:
+        root = None
+        for event, element in ET.iterparse(f, events=("start", "end")):
+            if root is None:
+                root = element
+            if event == "end" and element.tag == packageTag:
+                yield _packageData(element)
+                # drop the processed package from the tree
+                root.clear()
+
+
+def _readDescription(path, href):
+    """Returns the description of the package with the location ``href`` from a gzipped primary.xml file.
+    The file is parsed only until the package is found and the processed packages are not kept in memory.
+    """
+    packageTag = namespace("common") + "package"
+    with gzip.open(path) as f:
+        root = None
+        for event, element in ET.iterparse(f, events=("start", "end")):
+            if root is None:
+                root = element
+            if event == "end" and element.tag == packageTag:
+                if element.find(namespace("common") + "location").get("href") == href:
+                    return element.findtext(namespace("common") + "description")
+                root.clear()
+    return None
+
+
+def _cachePrefix(directory):
+    # identifies the cache files of the repository directory
+    return hashlib.sha256(os.path.abspath(directory).encode("utf-8")).hexdigest()[:16]
+
+
+def _cachePath(directory, cachedir):
+    cachedir = cachedir or os.path.join(xdg.XDG_CACHE_HOME, "osc", "repodata")
+    return os.path.join(os.path.expanduser(cachedir), "%s-%s.json" % (_cachePrefix(directory), repomdChecksum(directory)))
+
+
+def _pruneCache(path):
+    """Removes the cache files of previous versions of the repository that was just cached in ``path``."""
+    cachedir, filename = os.path.split(path)
+    prefix = filename.split("-", 1)[0] + "-"
+    try:
+        names = os.listdir(cachedir)
+    except OSError:
+        return
+    for name in names:
+        if name == filename or not name.startswith(prefix) or not name.endswith(".json"):
+            continue
+        try:
+            os.unlink(os.path.join(cachedir, name))
+        except OSError:
+            pass
+
+
+def _readCache(path):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if not isinstance(data, dict) or data.get("version") != CACHE_VERSION:
+        return None
+    return data["packages"]
+
+
+def _writeCache(path, packages):
+    # failures are ignored, the cache only speeds up the next build
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmpPath = tempfile.mkstemp(prefix=".osc-repodata-", dir=os.path.dirname(path))
+    except OSError:
+        return
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump({"version": CACHE_VERSION, "packages": packages}, f)
+        os.replace(tmpPath, path)
+    except OSError:
+        return
+    finally:
+        if os.path.exists(tmpPath):
+            os.unlink(tmpPath)
+    _pruneCache(path)
+
+
+def queries(directory, cachedir=None, use_cache=True):
     """Returns a list of RepoDataQueries constructed from the repodata under
     the directory.
 
+    The parsed data are cached under ``$XDG_CACHE_HOME/osc/repodata`` (or ``cachedir``)
+    by the checksum of repomd.xml, so the primary.xml is parsed only when the repository changes.
+
     :param directory: path to a repository directory (parent directory of repodata directory)
+    :param cachedir: directory with the cached repository data
+    :param use_cache: read and write the cache
     :return: list of RepoDataQueryResult instances
     :raise IOError: if repomd.xml contains no primary location
     """
-    from .xml import xml_parse
-
-    path = primaryPath(directory)
-
-    gunzippedPrimary = gzip.GzipFile(path)
-    elementTree = xml_parse(gunzippedPrimary)
-    root = elementTree.getroot()
+    packages = None
+    if use_cache:
+        cachePath = _cachePath(directory, cachedir)
+        packages = _readCache(cachePath)
 
-    packageQueries = []
-    for packageElement in root:
-        packageQuery = RepoDataQueryResult(directory, packageElement)
-        packageQueries.append(packageQuery)
+    if packages is None:
+        packages = list(iterPrimary(primaryPath(directory)))
+        if use_cache:
+            _writeCache(cachePath, packages)
 
-    return packageQueries
+    return [RepoDataQueryResult(directory, data) for data in packages]
 
 
 def _to_bytes_or_None(method):
@@ -95,71 +266,48 @@ def _to_bytes_list(method):
 class RepoDataQueryResult(packagequery.PackageQueryResult):
     """PackageQueryResult that reads in data from the repodata directory files."""
 
-    def __init__(self, directory, element):
-        """Creates a RepoDataQueryResult from the a package Element under a metadata
-        Element in a primary.xml file.
+    def __init__(self, directory, data):
+        """Creates a RepoDataQueryResult from the package data parsed from a primary.xml file.
 
         :param directory: repository directory path. Used to convert relative paths to full paths.
-        :param element: package Element
+        :param data: package data as returned by iterPrimary()
+                     or a package Element under a metadata Element in a primary.xml file
         """
+        if ET.iselement(data):
+            description = data.findtext(namespace("common") + "description")
+            data = _packageData(data)
+            data["description"] = description
         self.__directory = os.path.abspath(directory)
-        self.__element = element
-
-    def __formatElement(self):
-        return self.__element.find(namespace("common") + "format")
-
-    def __parseEntry(self, element):
-        entry = element.get("name")
-        flags = element.get("flags")
-
-        if flags is not None:
-            version = element.get("ver")
-            operator = OPERATOR_BY_FLAGS[flags]
-            entry += " %s %s" % (operator, version)
-
-            release = element.get("rel")
-            if release is not None:
-                entry += "-%s" % release
-
-        return entry
+        self.__data = data
 
     def __parseEntryCollection(self, collection):
-        formatElement = self.__formatElement()
-        collectionElement = formatElement.find(namespace("rpm") + collection)
-
-        entries = []
-        if collectionElement is not None:
-            for entryElement in collectionElement.findall(namespace("rpm") + "entry"):
-                entry = self.__parseEntry(entryElement)
-                entries.append(entry)
-
-        return entries
-
-    def __versionElement(self):
-        return self.__element.find(namespace("common") + "version")
+        return self.__data.get(collection, [])
 
     @_to_bytes_or_None
     def arch(self):
-        return self.__element.findtext(namespace("common") + "arch")
+        return self.__data["arch"]
 
     @_to_bytes_or_None
     def description(self):
-        return self.__element.findtext(namespace("common") + "description")
+        if "description" in self.__data:
+            return self.__data["description"]
+        # descriptions are not needed for resolving dependencies,
+        # they are read from primary.xml only when they are asked for to save memory
+        return _readDescription(primaryPath(self.__directory), self.__data["href"])
 
     def distribution(self):
         return None
 
     @_to_bytes_or_None
     def epoch(self):
-        return self.__versionElement().get("epoch")
+        return self.__data["epoch"]
 
     @_to_bytes_or_None
     def name(self):
-        return self.__element.findtext(namespace("common") + "name")
+        return self.__data["name"]
 
     def path(self):
-        locationElement = self.__element.find(namespace("common") + "location")
-        relativePath = locationElement.get("href")
+        relativePath = self.__data["href"]
         absolutePath = os.path.join(self.__directory, relativePath)
 
         return absolutePath
@@ -170,7 +318,7 @@ class RepoDataQueryResult(packagequery.PackageQueryResult):
 
     @_to_bytes_or_None
     def release(self):
-        return self.__versionElement().get("rel")
+        return self.__data["rel"]
 
     @_to_bytes_list
     def requires(self):
@@ -226,4 +374,4 @@ class RepoDataQueryResult(packagequery.PackageQueryResult):
 
     @_to_bytes_or_None
     def version(self):
-        return self.__versionElement().get("ver")
+        return self.__data["ver"]
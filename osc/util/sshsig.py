@@ -0,0 +1,267 @@
+"""
+In-process creation of SSH signatures compatible with ``ssh-keygen -Y sign``.
+
+The data is signed either by ssh-agent over its socket or with a private key loaded from a file.
+The functions return ``None`` if they cannot sign in-process (encrypted or hardware-backed keys, for example)
+and the caller is expected to fall back to running ``ssh-keygen``.
+
+The format is described in https://github.com/openssh/openssh-portable/blob/master/PROTOCOL.sshsig
+and the ssh-agent protocol in https://datatracker.ietf.org/doc/html/draft-miller-ssh-agent
+"""
+
+
+import base64
+import hashlib
+import os
+import socket
+import struct
+
+
+SSHSIG_MAGIC = b"SSHSIG"
+SSHSIG_VERSION = 1
+SSHSIG_HASH_ALGORITHM = "sha512"
+
+SSH_AGENTC_REQUEST_IDENTITIES = 11
+SSH_AGENT_IDENTITIES_ANSWER = 12
+SSH_AGENTC_SIGN_REQUEST = 13
+SSH_AGENT_SIGN_RESPONSE = 14
+SSH_AGENT_RSA_SHA2_512 = 4
+
+
+class SshAgentError(Exception):
+    pass
+
+
+def _pack_string(data):
+    if isinstance(data, str):
+        data = data.encode("utf-8")
+    return struct.pack(">I", len(data)) + data
+
+
+def _unpack_string(data, offset):
+    (size,) = struct.unpack_from(">I", data, offset)
+    offset += 4
+    if offset + size > len(data):
+        raise SshAgentError("Truncated message")
+    return data[offset:offset + size], offset + size
+
+
+def _pack_mpint(value):
+    data = value.to_bytes((value.bit_length() + 8) // 8, "big") if value else b""
+    return _pack_string(data)
+
+
+def key_type(key_blob):
+    """
+    Return type of a public key in the SSH wire format, such as ``ssh-ed25519``.
+    """
+    return _unpack_string(key_blob, 0)[0].decode("utf-8")
+
+
+def fingerprint(key_blob):
+    """
+    Return ``SHA256:...`` fingerprint of a public key in the same format as ``ssh-add -l``.
+    """
+    digest = base64.b64encode(hashlib.sha256(key_blob).digest()).decode("ascii").rstrip("=")
+    return f"SHA256:{digest}"
+
+
+def read_public_key(path):
+    """
+    Return the public key blob from a file in the OpenSSH format (``<type> <base64> [comment]``)
+    or ``None`` if the file doesn't contain a public key.
+    """
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            line = f.readline()
+    except (OSError, UnicodeDecodeError):
+        return None
+    fields = line.split()
+    if len(fields) < 2 or not fields[0].startswith(("ssh-", "ecdsa-", "sk-")):
+        return None
+    try:
+        return base64.b64decode(fields[1])
+    except ValueError:
+        return None
+
+
+def signed_data(data, namespace):
+    """
+    Return the data that is actually signed for the given message ``data`` and ``namespace``.
+    """
+    if isinstance(data, str):
+        data = data.encode("utf-8")
+    return (
+        SSHSIG_MAGIC
+        + _pack_string(namespace)
+        + _pack_string(b"")
+        + _pack_string(SSHSIG_HASH_ALGORITHM)
+        + _pack_string(hashlib.sha512(data).digest())
+    )
+
+
+def signature_blob(key_blob, namespace, signature):
+    """
+    Return the binary signature as produced by ``ssh-keygen -Y sign`` (without the armor).
+
+    :param key_blob: Public key in the SSH wire format.
+    :param signature: SSH signature (algorithm name and the signature itself) of ``signed_data()``.
+    """
+    return (
+        SSHSIG_MAGIC
+        + struct.pack(">I", SSHSIG_VERSION)
+        + _pack_string(key_blob)
+        + _pack_string(namespace)
+        + _pack_string(b"")
+        + _pack_string(SSHSIG_HASH_ALGORITHM)
+        + _pack_string(signature)
+    )
+
+
+class SshAgentClient:
+    """
+    Minimal ssh-agent client that lists the keys and signs data.
+    """
+
+    def __init__(self, socket_path=None, timeout=10):
+        self.socket_path = socket_path or os.environ.get("SSH_AUTH_SOCK", None)
+        self.timeout = timeout
+
+    @property
+    def available(self):
+        return bool(self.socket_path) and os.path.exists(self.socket_path)
+
+    def _request(self, message):
+        if not self.available:
+            raise SshAgentError("ssh-agent is not running")
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.settimeout(self.timeout)
+            sock.connect(self.socket_path)
+            sock.sendall(struct.pack(">I", len(message)) + message)
+            header = self._recv(sock, 4)
+            (size,) = struct.unpack(">I", header)
+            return self._recv(sock, size)
+
+    @staticmethod
+    def _recv(sock, size):
+        result = b""
+        while len(result) < size:
+            data = sock.recv(size - len(result))
+            if not data:
+                raise SshAgentError("Connection to ssh-agent closed")
+            result += data
+        return result
+
+    def list_keys(self):
+        """
+        Return a list of ``(key_blob, comment)`` tuples of the keys in the agent.
+        """
+        response = self._request(bytes([SSH_AGENTC_REQUEST_IDENTITIES]))
+        if not response or response[0] != SSH_AGENT_IDENTITIES_ANSWER:
+            raise SshAgentError("Unexpected response to the request for identities")
+        (count,) = struct.unpack_from(">I", response, 1)
+        offset = 5
+        result = []
+        for _ in range(count):
+            key_blob, offset = _unpack_string(response, offset)
+            comment, offset = _unpack_string(response, offset)
+            result.append((key_blob, comment.decode("utf-8", errors="replace")))
+        return result
+
+    def sign(self, key_blob, data):
+        """
+        Sign ``data`` with the key and return the SSH signature (algorithm name and the signature itself).
+        RSA keys sign with rsa-sha2-512 as ``ssh-keygen -Y sign`` does.
+        """
+        flags = SSH_AGENT_RSA_SHA2_512 if key_type(key_blob) == "ssh-rsa" else 0
+        message = bytes([SSH_AGENTC_SIGN_REQUEST]) + _pack_string(key_blob) + _pack_string(data) + struct.pack(">I", flags)
+        response = self._request(message)
+        if not response or response[0] != SSH_AGENT_SIGN_RESPONSE:
+            raise SshAgentError("ssh-agent refused to sign the data")
+        signature, _ = _unpack_string(response, 1)
+        return signature
+
+
+def _load_private_key(path):
+    """
+    Load an unencrypted private key and return ``(key_blob, sign)`` where ``sign(data)`` returns the SSH signature.
+    Return ``None`` if the key cannot be used in-process.
+    """
+    try:
+        from cryptography.exceptions import UnsupportedAlgorithm
+        from cryptography.hazmat.primitives import hashes
+        from cryptography.hazmat.primitives import serialization
+        from cryptography.hazmat.primitives.asymmetric import ec
+        from cryptography.hazmat.primitives.asymmetric import ed25519
+        from cryptography.hazmat.primitives.asymmetric import padding
+        from cryptography.hazmat.primitives.asymmetric import rsa
+        from cryptography.hazmat.primitives.asymmetric.utils import decode_dss_signature
+    except ImportError:
+        return None
+
+    try:
+        with open(path, "rb") as f:
+            key = serialization.load_ssh_private_key(f.read(), password=None)
+    except (AttributeError, OSError, ValueError, TypeError, UnsupportedAlgorithm):
+        # encrypted keys raise TypeError, the passphrase is handled by ssh-keygen
+        # AttributeError: cryptography < 3.0 cannot load keys in the OpenSSH format
+        return None
+
+    public_key = key.public_key().public_bytes(serialization.Encoding.OpenSSH, serialization.PublicFormat.OpenSSH)
+    key_blob = base64.b64decode(public_key.split()[1])
+
+    if isinstance(key, ed25519.Ed25519PrivateKey):
+        def sign(data):
+            return _pack_string("ssh-ed25519") + _pack_string(key.sign(data))
+    elif isinstance(key, rsa.RSAPrivateKey):
+        def sign(data):
+            return _pack_string("rsa-sha2-512") + _pack_string(key.sign(data, padding.PKCS1v15(), hashes.SHA512()))
+    elif isinstance(key, ec.EllipticCurvePrivateKey):
+        hash_algorithms = {256: hashes.SHA256, 384: hashes.SHA384, 521: hashes.SHA512}
+        hash_algorithm = hash_algorithms.get(key.curve.key_size, None)
+        if hash_algorithm is None:
+            return None
+
+        def sign(data):
+            r, s = decode_dss_signature(key.sign(data, ec.ECDSA(hash_algorithm())))
+            return _pack_string(key_type(key_blob)) + _pack_string(_pack_mpint(r) + _pack_mpint(s))
+    else:
+        return None
+
+    return key_blob, sign
+
+
+def sign(data, namespace, keyfile, agent=None):
+    """
+    Sign ``data`` like ``ssh-keygen -Y sign -f <keyfile> -n <namespace>`` does.
+
+    If ``keyfile`` contains a public key or if its ``.pub`` counterpart is loaded in ssh-agent, the agent signs the data.
+    Otherwise the data is signed with the private key loaded from ``keyfile``.
+
+    :returns: The binary signature or ``None`` if the data cannot be signed in-process.
+    """
+    agent = agent or SshAgentClient()
+    data = signed_data(data, namespace)
+
+    key_blob = read_public_key(keyfile)
+    is_public_key = key_blob is not None
+    if key_blob is None:
+        key_blob = read_public_key(f"{keyfile}.pub")
+
+    if key_blob is not None and agent.available:
+        try:
+            agent_keys = [blob for blob, _ in agent.list_keys()]
+            if key_blob in agent_keys:
+                return signature_blob(key_blob, namespace, agent.sign(key_blob, data))
+        except (OSError, SshAgentError):
+            pass
+
+    if is_public_key:
+        # the private key is not available
+        return None
+
+    private_key = _load_private_key(keyfile)
+    if private_key is None:
+        return None
+    key_blob, sign_func = private_key
+    return signature_blob(key_blob, namespace, sign_func(data))
@@ -1,8 +1,10 @@
+import functools
 import io
 import os
 import shutil
 import sys
 import tempfile
+import threading
 import unittest
 from unittest.mock import patch
 from urllib.request import HTTPHandler, addinfourl, build_opener
@@ -90,6 +92,9 @@ class RequestDataMismatch(Exception):
 
 
 EXPECTED_REQUESTS = []
+EXPECTED_REQUESTS_LOCK = threading.Lock()
+# set by the UNORDERED decorator
+EXPECTED_REQUESTS_UNORDERED = False
 
 
 # HACK: Fix "ValueError: I/O operation on closed file." error in tests on openSUSE Leap 15.2.
@@ -104,10 +109,21 @@ class MockHTTPConnectionPool:
 
     def urlopen(self, method, url, body=None, headers=None, retries=None, **response_kw):
         global EXPECTED_REQUESTS
-        request = EXPECTED_REQUESTS.pop(0)
-
         url = f"http://localhost{url}"
 
+        with EXPECTED_REQUESTS_LOCK:
+            # files are downloaded and uploaded concurrently, the tests marked with UNORDERED accept
+            # GET and PUT requests in any order as long as they are consecutive in the expected requests
+            index = 0
+            if EXPECTED_REQUESTS_UNORDERED and method in ("GET", "PUT"):
+                for num, i in enumerate(EXPECTED_REQUESTS):
+                    if i["method"] != method:
+                        break
+                    if urlcompare(i["url"], url):
+                        index = num
+                        break
+            request = EXPECTED_REQUESTS.pop(index)
+
         if not urlcompare(request["url"], url) or request["method"] != method:
             raise RequestWrongOrder(url, request["url"], method, request["method"])
 
@@ -124,6 +140,9 @@ class MockHTTPConnectionPool:
             if hasattr(body, "read"):
                 # if it is a file-like object, read it
                 body = body.read()
+            if isinstance(body, memoryview):
+                # memory-mapped file
+                body = body.tobytes()
             if hasattr(body, "encode"):
                 # if it can be encoded to bytes, do it
                 body = body.encode("utf-8")
@@ -200,6 +219,23 @@ def DELETE(path, **kwargs):
     return urldecorator('DELETE', path, **kwargs)
 
 
+def UNORDERED(test_method):
+    """
+    Accept consecutive expected GET and PUT requests in any order.
+    Use it for tests of code that downloads or uploads files concurrently.
+    """
+    @functools.wraps(test_method)
+    def wrapped_test_method(self):
+        global EXPECTED_REQUESTS_UNORDERED
+        EXPECTED_REQUESTS_UNORDERED = True
+        try:
+            test_method(self)
+        finally:
+            EXPECTED_REQUESTS_UNORDERED = False
+
+    return wrapped_test_method
+
+
 class OscTestCase(unittest.TestCase):
     def setUp(self, copytree=True):
         global EXPECTED_REQUESTS
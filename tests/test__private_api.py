@@ -1,7 +1,16 @@
+import os
 import unittest
+import urllib.error
 
+from osc._private.api import get_many
 from osc._private.api import xml_escape
 
+from .common import GET
+from .common import OscTestCase
+
+
+FIXTURES_DIR = os.path.join(os.path.dirname(__file__), "fixtures", "packages")
+
 
 class TestXmlEscape(unittest.TestCase):
     def test_lt(self):
@@ -30,5 +39,33 @@ class TestXmlEscape(unittest.TestCase):
         self.assertEqual(actual, expected)
 
 
+class TestGetMany(OscTestCase):
+    def _get_fixtures_dir(self):
+        return FIXTURES_DIR
+
+    def setUp(self):
+        super().setUp(copytree=False)
+
+    @GET("http://localhost/source/prj/pkg1/_meta", text="<package name='pkg1'/>")
+    @GET("http://localhost/source/prj/pkg2/_meta", text="<error/>", code=404)
+    @GET("http://localhost/source/prj/pkg3/_meta?rev=2", text="<package name='pkg3'/>")
+    def test_results_in_order(self):
+        paths = [["source", "prj", f"pkg{i}", "_meta"] for i in range(1, 4)]
+        queries = [None, None, {"rev": "2"}]
+        # a single worker keeps the order of the mocked requests
+        results = get_many("http://localhost", paths, queries=queries, max_workers=1)
+        self.assertEqual(len(results), 3)
+        self.assertEqual(results[0].get("name"), "pkg1")
+        self.assertIsInstance(results[1], urllib.error.HTTPError)
+        self.assertEqual(results[1].code, 404)
+        self.assertEqual(results[2].get("name"), "pkg3")
+
+    def test_empty(self):
+        self.assertEqual(get_many("http://localhost", []), [])
+
+    def test_queries_length(self):
+        self.assertRaises(ValueError, get_many, "http://localhost", [["source"]], queries=[])
+
+
 if __name__ == "__main__":
     unittest.main()
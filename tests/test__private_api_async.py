@@ -0,0 +1,76 @@
+import asyncio
+import os
+import unittest
+
+import osc.conf
+from osc._private.api_async import AsyncApiClient
+
+from .common import GET
+from .common import PUT
+from .common import OscTestCase
+
+
+FIXTURES_DIR = os.path.join(os.path.dirname(__file__), "fixtures", "packages")
+
+
+class TestAsyncApiClient(OscTestCase):
+    def _get_fixtures_dir(self):
+        return FIXTURES_DIR
+
+    def setUp(self):
+        super().setUp(copytree=False)
+        self.loop = asyncio.new_event_loop()
+
+    def tearDown(self):
+        self.loop.close()
+        super().tearDown()
+
+    def _run(self, coro):
+        return self.loop.run_until_complete(coro)
+
+    @GET("http://localhost/source/prj/_meta", text="<project name='prj'/>")
+    def test_get(self):
+        async def run():
+            async with AsyncApiClient("http://localhost") as client:
+                return await client.get(["source", "prj", "_meta"])
+
+        root = self._run(run())
+        self.assertEqual(root.tag, "project")
+        self.assertEqual(root.get("name"), "prj")
+
+    @PUT("http://localhost/source/prj/_meta", exp="<project name='prj'/>", text="<status code='ok'/>")
+    def test_put(self):
+        async def run():
+            async with AsyncApiClient("http://localhost") as client:
+                return await client.put(["source", "prj", "_meta"], data="<project name='prj'/>")
+
+        root = self._run(run())
+        self.assertEqual(root.get("code"), "ok")
+
+    @GET("http://localhost/source/prj1/_meta", text="<project name='prj1'/>")
+    @GET("http://localhost/source/prj2/_meta", text="<project name='prj2'/>")
+    def test_gather(self):
+        async def run():
+            # a single worker keeps the order of the mocked requests
+            async with AsyncApiClient("http://localhost", workers=1) as client:
+                return await asyncio.gather(
+                    client.get(["source", "prj1", "_meta"]),
+                    client.get(["source", "prj2", "_meta"]),
+                )
+
+        roots = self._run(run())
+        self.assertEqual([i.get("name") for i in roots], ["prj1", "prj2"])
+
+    def test_workers(self):
+        async def run(**kwargs):
+            async with AsyncApiClient("http://localhost", **kwargs) as client:
+                return client.workers, client._executor._max_workers
+
+        osc.conf.config["http_pool_size"] = 10
+        self.assertEqual(self._run(run()), (10, 10))
+        # the number of workers is not capped by the connection pool
+        self.assertEqual(self._run(run(workers=50)), (50, 50))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,8 +1,17 @@
+import contextlib
+import io
+import os
+import shutil
+import tempfile
 import unittest
+from unittest.mock import patch
+from urllib.error import HTTPError
 
 import osc.conf
 from osc.build import check_trusted_projects
+from osc.build import get_preinstall_image
 from osc.oscerr import UserAbort
+from osc.util.xml import xml_fromstring
 
 
 class TestTrustedProjects(unittest.TestCase):
@@ -29,5 +38,51 @@ class TestTrustedProjects(unittest.TestCase):
         check_trusted_projects(apiurl, ["foo"], interactive=False)
 
 
+
+class TestGetPreinstallImage(unittest.TestCase):
+    IMG_INFO = """
+        <preinstallimage project="prj" repository="repo" package="pkg" filename="image.tar.zst" hdrmd5="0123">
+          <binary>bash</binary>
+        </preinstallimage>
+    """
+
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp(prefix="osc_test_")
+
+    def tearDown(self):
+        shutil.rmtree(self.cache_dir)
+
+    @patch("osc.build._get_preinstall_image_size", return_value=None)
+    @patch("osc.build.OscFileGrabber")
+    def test_messages(self, grabber, _):
+        def urlgrab(url, filename, **kwargs):
+            if url.endswith(".info"):
+                raise HTTPError(url, 404, "Not Found", {}, None)
+            with open(filename, "w") as f:
+                f.write("image")
+
+        grabber.return_value.urlgrab.side_effect = urlgrab
+
+        messages = []
+        stdout = io.StringIO()
+        with contextlib.redirect_stdout(stdout):
+            result = get_preinstall_image(
+                "http://localhost", "x86_64", self.cache_dir, xml_fromstring(self.IMG_INFO), show_progress=False, messages=messages
+            )
+
+        # nothing is printed while the other downloads show their progress
+        self.assertEqual(stdout.getvalue(), "")
+        self.assertEqual(
+            messages,
+            [
+                ("downloading preinstall image prj/repo/pkg [0123]", None),
+                ("downloading preinstall image info file", None),
+                ("Failed to download info file! ecode:404 reason:Not Found", None),
+            ],
+        )
+        self.assertEqual(result[0], os.path.join(self.cache_dir, "prj/repo/x86_64/image.tar.zst"))
+        self.assertEqual(result[3], ["bash"])
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -7,7 +7,7 @@ from xml.etree import ElementTree as ET
 import osc.core
 import osc.oscerr
 
-from .common import GET, PUT, POST, DELETE, OscTestCase
+from .common import GET, PUT, POST, DELETE, UNORDERED, OscTestCase
 
 
 FIXTURES_DIR = os.path.join(os.path.dirname(__file__), 'commit_fixtures')
@@ -122,6 +122,7 @@ class TestCommit(OscTestCase):
         self._check_status(p, 'merge', '!')
         self._check_status(p, 'nochange', ' ')
 
+    @UNORDERED
     @GET('http://localhost/source/osctest/multiple?rev=latest', file='testMultiple_filesremote')
     @POST('http://localhost/source/osctest/multiple?cmd=getprojectservices',
           exp='', text='<services />')
@@ -152,6 +153,7 @@ class TestCommit(OscTestCase):
         self._check_status(p, 'add2', ' ')
         self._check_status(p, 'nochange', ' ')
 
+    @UNORDERED
     @GET('http://localhost/source/osctest/multiple?rev=latest', file='testPartial_filesremote')
     @POST('http://localhost/source/osctest/multiple?cmd=getprojectservices',
           exp='', text='<services />')
@@ -198,6 +200,7 @@ class TestCommit(OscTestCase):
         self.assertTrue(os.path.exists('nochange'))
         self._check_status(p, 'nochange', 'M')
 
+    @UNORDERED
     @GET('http://localhost/source/osctest/allstates?rev=latest', file='testPartial_filesremote')
     @POST('http://localhost/source/osctest/allstates?cmd=getprojectservices',
           exp='', text='<services />')
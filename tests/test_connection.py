@@ -0,0 +1,402 @@
+import gzip
+import io
+import json
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+from unittest.mock import patch
+
+import urllib3.response
+
+import osc.conf
+import osc.connection
+import osc.core
+import osc.oscssl
+
+
+FIXTURES_DIR = os.path.join(os.path.dirname(__file__), "conf_fixtures")
+
+
+class CountingHTTPConnectionPool:
+    instances = []
+
+    def __init__(self, host, port=None, **conn_kw):
+        self.conn_kw = conn_kw
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.instances.append(self)
+
+    def urlopen(self, method, url, body=None, headers=None, retries=None, **response_kw):
+        with self.lock:
+            self.requests += 1
+        data = url.encode("utf-8")
+        response = urllib3.response.HTTPResponse(body=data, status=200)
+        response._fp = io.BytesIO(data)
+        return response
+
+
+class TestThreadSafeHttpRequest(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp(prefix="osc_test")
+        oscrc = os.path.join(FIXTURES_DIR, "oscrc")
+        osc.conf.get_config(override_conffile=oscrc, override_no_keyring=True)
+        osc.conf.config["cookiejar"] = os.path.join(self.tmpdir, "cookiejar")
+        osc.conf.config["http_pool_size"] = 4
+        osc.connection.CONNECTION_POOLS.clear()
+        CountingHTTPConnectionPool.instances = []
+
+    def tearDown(self):
+        osc.connection.CONNECTION_POOLS.clear()
+        shutil.rmtree(self.tmpdir)
+
+    @patch("urllib3.HTTPConnectionPool", CountingHTTPConnectionPool)
+    def test_shared_pool(self):
+        results = {}
+        errors = []
+
+        def worker(num):
+            try:
+                response = osc.connection.http_request("GET", f"http://localhost/source/prj/pkg{num}")
+                results[num] = response.read()
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=worker, args=(i,)) for i in range(20)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        self.assertEqual(results, {i: f"/source/prj/pkg{i}".encode("utf-8") for i in range(20)})
+        self.assertEqual(len(CountingHTTPConnectionPool.instances), 1)
+        pool = CountingHTTPConnectionPool.instances[0]
+        self.assertEqual(pool.conn_kw["maxsize"], 4)
+        self.assertEqual(pool.requests, 20)
+
+
+class TestSessionReuseOption(unittest.TestCase):
+    def setUp(self):
+        osc.connection.CONNECTION_POOLS.clear()
+
+    def tearDown(self):
+        osc.connection.CONNECTION_POOLS.clear()
+
+    def _create_ssl_context(self, session_reuse):
+        apiurl = "https://localhost"
+        purl = urllib3.util.parse_url(apiurl)
+        options = {"http_session_reuse": session_reuse, "cafile": None, "capath": None, "sslcertck": True}
+        with patch("osc.oscssl.TrustedCertStore"):
+            pool = osc.connection._create_connection_pool(apiurl, purl, apiurl, options)
+        return pool.ssl_context
+
+    def test_disabled(self):
+        self.assertNotIsInstance(self._create_ssl_context(False), osc.oscssl.SessionReuseSSLContext)
+
+    def test_enabled(self):
+        self.assertIsInstance(self._create_ssl_context(True), osc.oscssl.SessionReuseSSLContext)
+
+
+class CachingServerPool:
+    """
+    Serve ``body`` with an ETag, respond with 304 to a matching If-None-Match header.
+    """
+
+    body = b"<project name='prj'/>"
+    etag = '"1"'
+    requests = []
+
+    def __init__(self, host, port=None, **conn_kw):
+        pass
+
+    def urlopen(self, method, url, body=None, headers=None, retries=None, **response_kw):
+        self.requests.append(headers)
+        if headers.get("If-None-Match") == self.etag:
+            status, data = 304, b""
+        else:
+            status, data = 200, self.body
+        response = urllib3.response.HTTPResponse(body=data, status=status, headers={"ETag": self.etag})
+        response._fp = io.BytesIO(data)
+        return response
+
+
+class TestHttpCache(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp(prefix="osc_test")
+        oscrc = os.path.join(FIXTURES_DIR, "oscrc")
+        osc.conf.get_config(override_conffile=oscrc, override_no_keyring=True)
+        osc.conf.config["cookiejar"] = os.path.join(self.tmpdir, "cookiejar")
+        self.host_options = osc.conf.config["api_host_options"]["http://localhost"]
+        self.host_options["http_cache"] = True
+        osc.connection.CONNECTION_POOLS.clear()
+        CachingServerPool.requests = []
+        CachingServerPool.body = b"<project name='prj'/>"
+        CachingServerPool.etag = '"1"'
+
+    def tearDown(self):
+        osc.connection.CONNECTION_POOLS.clear()
+        shutil.rmtree(self.tmpdir)
+
+    def _get(self):
+        with patch("urllib3.HTTPConnectionPool", CachingServerPool), patch("osc.util.xdg.XDG_CACHE_HOME", self.tmpdir):
+            return osc.connection.http_GET_cached("http://localhost/source/prj/_meta").read()
+
+    def test_revalidate(self):
+        self.assertEqual(self._get(), CachingServerPool.body)
+        self.assertEqual(self._get(), CachingServerPool.body)
+        self.assertNotIn("If-None-Match", CachingServerPool.requests[0])
+        self.assertEqual(CachingServerPool.requests[1]["If-None-Match"], '"1"')
+
+        CachingServerPool.body = b"<project name='changed'/>"
+        CachingServerPool.etag = '"2"'
+        self.assertEqual(self._get(), b"<project name='changed'/>")
+        self.assertEqual(len(CachingServerPool.requests), 3)
+
+    def test_ttl(self):
+        self.host_options["http_cache_ttl"] = 3600
+        self._get()
+        self.assertEqual(self._get(), CachingServerPool.body)
+        self.assertEqual(len(CachingServerPool.requests), 1)
+
+    def test_disabled(self):
+        self.host_options["http_cache"] = False
+        self._get()
+        self._get()
+        self.assertNotIn("If-None-Match", CachingServerPool.requests[1])
+        self.assertFalse(os.path.exists(os.path.join(self.tmpdir, "osc", "http")))
+
+
+class CompressingServerPool:
+    """
+    Serve gzip compressed ``body`` if the client accepts it.
+    """
+
+    body = b"<buildlog>" + b"line\n" * 10000 + b"</buildlog>"
+    requests = []
+
+    def __init__(self, host, port=None, **conn_kw):
+        pass
+
+    def urlopen(self, method, url, body=None, headers=None, retries=None, **response_kw):
+        self.requests.append(headers)
+        data = self.body
+        response_headers = {}
+        if "gzip" in headers.get("Accept-Encoding", ""):
+            data = gzip.compress(data)
+            response_headers["Content-Encoding"] = "gzip"
+        response_headers["Content-Length"] = str(len(data))
+        return urllib3.response.HTTPResponse(body=io.BytesIO(data), status=200, headers=response_headers, preload_content=False)
+
+
+class TestCompressedResponse(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp(prefix="osc_test")
+        oscrc = os.path.join(FIXTURES_DIR, "oscrc")
+        osc.conf.get_config(override_conffile=oscrc, override_no_keyring=True)
+        osc.conf.config["cookiejar"] = os.path.join(self.tmpdir, "cookiejar")
+        osc.connection.CONNECTION_POOLS.clear()
+        CompressingServerPool.requests = []
+
+    def tearDown(self):
+        osc.connection.CONNECTION_POOLS.clear()
+        shutil.rmtree(self.tmpdir)
+
+    @patch("urllib3.HTTPConnectionPool", CompressingServerPool)
+    def test_streamfile(self):
+        data = b"".join(osc.core.streamfile("http://localhost/build/prj/repo/x86_64/pkg/_log", bufsize=1000))
+        self.assertEqual(data, CompressingServerPool.body)
+        self.assertIn("gzip", CompressingServerPool.requests[0]["Accept-Encoding"])
+
+    @patch("urllib3.HTTPConnectionPool", CompressingServerPool)
+    def test_download_uncompressed(self):
+        path = os.path.join(self.tmpdir, "file")
+        osc.core.download("http://localhost/build/prj/repo/x86_64/pkg/file", path, size=len(CompressingServerPool.body))
+        self.assertEqual(CompressingServerPool.requests[0]["Accept-Encoding"], "identity")
+        with open(path, "rb") as f:
+            self.assertEqual(f.read(), CompressingServerPool.body)
+
+
+class UploadServerPool:
+    """
+    Record the request bodies and headers.
+    """
+
+    requests = []
+
+    def __init__(self, host, port=None, **conn_kw):
+        pass
+
+    def urlopen(self, method, url, body=None, headers=None, retries=None, **response_kw):
+        self.requests.append((body if hasattr(body, "read") else bytes(body), headers))
+        return urllib3.response.HTTPResponse(body=io.BytesIO(b"<status code='ok'/>"), status=200, preload_content=False)
+
+
+class TestUpload(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp(prefix="osc_test")
+        oscrc = os.path.join(FIXTURES_DIR, "oscrc")
+        osc.conf.get_config(override_conffile=oscrc, override_no_keyring=True)
+        osc.conf.config["cookiejar"] = os.path.join(self.tmpdir, "cookiejar")
+        osc.connection.CONNECTION_POOLS.clear()
+        UploadServerPool.requests = []
+
+    def tearDown(self):
+        osc.connection.CONNECTION_POOLS.clear()
+        shutil.rmtree(self.tmpdir)
+
+    @patch("urllib3.HTTPConnectionPool", UploadServerPool)
+    def test_mmap(self):
+        path = os.path.join(self.tmpdir, "file")
+        with open(path, "wb") as f:
+            f.write(b"data" * 1000)
+        osc.connection.http_PUT("http://localhost/source/prj/pkg/file", file=path)
+        body, headers = UploadServerPool.requests[0]
+        self.assertEqual(body, b"data" * 1000)
+        self.assertEqual(headers["Content-Length"], "4000")
+
+    @patch("urllib3.HTTPConnectionPool", UploadServerPool)
+    def test_empty_file(self):
+        path = os.path.join(self.tmpdir, "file")
+        with open(path, "wb"):
+            pass
+        osc.connection.http_PUT("http://localhost/source/prj/pkg/file", file=path)
+        body, headers = UploadServerPool.requests[0]
+        self.assertTrue(hasattr(body, "read"))
+        self.assertNotIn("Content-Length", headers)
+
+
+class CookieServerPool:
+    """
+    Set a session cookie in each response.
+    """
+
+    session = "1"
+
+    def __init__(self, host, port=None, **conn_kw):
+        pass
+
+    def urlopen(self, method, url, body=None, headers=None, retries=None, **response_kw):
+        headers = {"Set-Cookie": f"openSUSE_session={self.session}; path=/; Max-Age=86400"}
+        response = urllib3.response.HTTPResponse(body=io.BytesIO(b""), status=200, headers=headers, preload_content=False)
+        return response
+
+
+class TestAuthHandlers(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp(prefix="osc_test")
+        oscrc = os.path.join(FIXTURES_DIR, "oscrc")
+        osc.conf.get_config(override_conffile=oscrc, override_no_keyring=True)
+        self.cookiejar = os.path.join(self.tmpdir, "cookiejar")
+        osc.conf.config["cookiejar"] = self.cookiejar
+        osc.connection.CONNECTION_POOLS.clear()
+        CookieServerPool.session = "1"
+
+    def tearDown(self):
+        osc.connection.CONNECTION_POOLS.clear()
+        osc.connection.CookieJarAuthHandler.COOKIEJARS.pop(self.cookiejar, None)
+        osc.connection.CookieJarAuthHandler.COOKIEJARS_DIRTY.discard(self.cookiejar)
+        shutil.rmtree(self.tmpdir)
+
+    def _get(self):
+        with patch("urllib3.HTTPConnectionPool", CookieServerPool):
+            osc.connection.http_GET("http://localhost/about").read()
+
+    def _saved_session(self):
+        with open(self.cookiejar, encoding="utf-8") as f:
+            return "openSUSE_session=" + CookieServerPool.session in f.read()
+
+    def test_reuse_handlers(self):
+        self._get()
+        handlers = osc.connection.AUTH_HANDLERS["http://localhost"][2]
+        self._get()
+        self.assertIs(osc.connection.AUTH_HANDLERS["http://localhost"][2], handlers)
+
+        # a new config gets new handlers
+        osc.conf.get_config(override_conffile=os.path.join(FIXTURES_DIR, "oscrc"), override_no_keyring=True)
+        osc.conf.config["cookiejar"] = self.cookiejar
+        self._get()
+        self.assertIsNot(osc.connection.AUTH_HANDLERS["http://localhost"][2], handlers)
+
+    def test_save_cookies(self):
+        # a new session cookie gets saved immediately
+        self._get()
+        self.assertTrue(self._saved_session())
+
+        # the same cookie is saved on exit
+        mtime = os.stat(self.cookiejar).st_mtime_ns
+        self._get()
+        self.assertEqual(os.stat(self.cookiejar).st_mtime_ns, mtime)
+        self.assertIn(self.cookiejar, osc.connection.CookieJarAuthHandler.COOKIEJARS_DIRTY)
+        osc.connection.CookieJarAuthHandler.save_cookiejars()
+        self.assertNotIn(self.cookiejar, osc.connection.CookieJarAuthHandler.COOKIEJARS_DIRTY)
+
+        CookieServerPool.session = "2"
+        self._get()
+        self.assertTrue(self._saved_session())
+
+
+class TestHttpTrace(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp(prefix="osc_test")
+        oscrc = os.path.join(FIXTURES_DIR, "oscrc")
+        osc.conf.get_config(override_conffile=oscrc, override_no_keyring=True)
+        osc.conf.config["cookiejar"] = os.path.join(self.tmpdir, "cookiejar")
+        osc.connection.CONNECTION_POOLS.clear()
+        self.traces = []
+        osc.connection.add_http_request_hook(self.traces.append)
+
+    def tearDown(self):
+        osc.connection.remove_http_request_hook(self.traces.append)
+        osc.connection.CONNECTION_POOLS.clear()
+        shutil.rmtree(self.tmpdir)
+
+    def test_url_template(self):
+        self.assertEqual(
+            osc.connection.url_template("http://localhost/source/openSUSE:Factory/osc/_meta?rev=1&meta=1"),
+            "/source/*/*/_meta?meta&rev",
+        )
+        self.assertEqual(osc.connection.url_template("http://localhost/build/prj/_result"), "/build/*/_result")
+        self.assertEqual(osc.connection.url_template("https://mirror/repo/x.rpm"), "https://mirror/repo/*")
+
+    @patch("urllib3.HTTPConnectionPool", CountingHTTPConnectionPool)
+    def test_hook(self):
+        with osc.connection.http_GET("http://localhost/source/prj/pkg/_meta") as f:
+            self.assertEqual(self.traces, [])
+            data = f.read()
+
+        self.assertEqual(len(self.traces), 1)
+        trace = self.traces[0]
+        self.assertEqual(trace.method, "GET")
+        self.assertEqual(trace.url_template, "/source/*/*/_meta")
+        self.assertEqual(trace.status, 200)
+        self.assertEqual(trace.bytes, len(data))
+        self.assertEqual(trace.retries, 0)
+        self.assertLessEqual(trace.ttfb, trace.total)
+
+    @patch("urllib3.HTTPConnectionPool", CountingHTTPConnectionPool)
+    def test_writer(self):
+        path = os.path.join(self.tmpdir, "trace.jsonl")
+        writer = osc.connection.HttpTraceWriter(path)
+        osc.connection.add_http_request_hook(writer)
+        try:
+            osc.connection.http_GET("http://localhost/source/prj/pkg1/_meta").close()
+            # the response is not read, the trace is written on exit
+            osc.connection.http_GET("http://localhost/source/prj/pkg2/_meta")
+            writer.close()
+        finally:
+            osc.connection.remove_http_request_hook(writer)
+
+        with open(path, encoding="utf-8") as f:
+            lines = [json.loads(line) for line in f]
+        self.assertEqual([i["url"] for i in lines], [f"http://localhost/source/prj/pkg{i}/_meta" for i in (1, 2)])
+
+        summary = io.StringIO()
+        writer.print_summary(file=summary)
+        self.assertIn("     2      0", summary.getvalue())
+        self.assertIn("GET /source/*/*/_meta", summary.getvalue())
+
+
+if __name__ == "__main__":
+    unittest.main()
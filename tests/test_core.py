@@ -1,14 +1,26 @@
+import hashlib
 import os
 import shutil
 import tempfile
 import unittest
+import urllib.error
 
 from osc.core import binary_file
+from osc.core import get_source_revs
 from osc.core import makeurl
+from osc.core import multi_dgst
 from osc.core import UrlQueryArray
 from osc.core import parseRevisionOption
+from osc.core import show_upstream_revs
 from osc.oscerr import OscInvalidRevision
 
+from .common import GET
+from .common import UNORDERED
+from .common import OscTestCase
+
+
+FIXTURES_DIR = os.path.join(os.path.dirname(__file__), "fixtures", "packages")
+
 
 class TestParseRevisionOption(unittest.TestCase):
     def test_empty(self):
@@ -196,5 +208,74 @@ class TestBinaryFile(unittest.TestCase):
         self.assertFalse(binary_file(path))
 
 
+class TestMultiDgst(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp(prefix="osc_test_")
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_multi_dgst(self):
+        path = os.path.join(self.tmpdir, "file")
+        data = 3 * 1024 * 1024 * b"a" + b"b"
+        with open(path, "wb") as f:
+            f.write(data)
+        md5, sha256 = multi_dgst(path, "md5", "sha256")
+        self.assertEqual(md5, hashlib.md5(data).hexdigest())
+        self.assertEqual(sha256, hashlib.sha256(data).hexdigest())
+
+    def test_empty(self):
+        path = os.path.join(self.tmpdir, "file")
+        with open(path, "wb"):
+            pass
+        self.assertEqual(multi_dgst(path, "md5"), [hashlib.md5(b"").hexdigest()])
+
+
+
+class TestBatchRequests(OscTestCase):
+    def _get_fixtures_dir(self):
+        return FIXTURES_DIR
+
+    def setUp(self):
+        super().setUp(copytree=False)
+
+    @UNORDERED
+    @GET("http://localhost/source/prj/pkg1?rev=latest", text="<directory name='pkg1' rev='3'/>")
+    @GET("http://localhost/source/prj/pkg2?rev=latest", text="<directory name='pkg2' rev='7'/>")
+    @GET("http://localhost/source/prj/pkg3?rev=latest", text="<directory name='pkg3' rev='1'/>")
+    def test_show_upstream_revs(self):
+        revs = show_upstream_revs("http://localhost", "prj", ["pkg1", "pkg2", "pkg3"])
+        self.assertEqual(revs, ["3", "7", "1"])
+
+    @UNORDERED
+    @GET("http://localhost/source/prj/pkg1?rev=latest", text="<directory name='pkg1' rev='3'/>")
+    @GET("http://localhost/source/prj/pkg2?rev=latest", text="<status code='unknown_package'/>", code=404)
+    def test_show_upstream_revs_error(self):
+        with self.assertRaises(urllib.error.HTTPError):
+            show_upstream_revs("http://localhost", "prj", ["pkg1", "pkg2"])
+
+    @UNORDERED
+    @GET(
+        "http://localhost/source/prj1/pkg1/_history",
+        text="""
+            <revisionlist>
+              <revision rev="1" vrev="1"><srcmd5>aaa</srcmd5><version>1.0</version><time>100</time></revision>
+              <revision rev="2" vrev="2"><srcmd5>bbb</srcmd5><version>1.1</version><time>200</time></revision>
+            </revisionlist>
+        """,
+    )
+    @GET("http://localhost/source/prj2/pkg2/_history", text="<revisionlist/>")
+    @GET(
+        "http://localhost/source/prj3/pkg3/_history",
+        text="""<revisionlist><revision rev="5" vrev="1"><version>3.0</version><time>100</time></revision></revisionlist>""",
+    )
+    def test_get_source_revs(self):
+        revs = get_source_revs("http://localhost", [("prj1", "pkg1"), ("prj2", "pkg2"), ("prj3", "pkg3")])
+        self.assertEqual([i.get("version") for i in revs], ["1.1", None, "3.0"])
+        self.assertEqual(revs[0]["rev"], "2")
+        self.assertEqual(revs[0]["srcmd5"], "bbb")
+        self.assertIn("error", revs[1])
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -1,6 +1,14 @@
+import fcntl
+import hashlib
+import io
 import os
+import shutil
 import tempfile
+import threading
 import unittest
+from unittest.mock import patch
+
+import urllib3.exceptions
 
 import osc.conf
 import osc.grabber as osc_grabber
@@ -30,5 +38,202 @@ class TestMirrorGroup(unittest.TestCase):
         mg.urlgrab(None, os.path.join(self.tmpdir, "file"))
 
 
+class FakeResponse:
+    """
+    Serve ``data`` starting at the offset from the Range header; optionally break after ``fail_after`` bytes.
+    """
+
+    def __init__(self, data, headers=None, ranges=True, fail_after=None):
+        offset = 0
+        self.status = 200
+        self.headers = {}
+        range_header = (headers or {}).get("Range")
+        if range_header and ranges:
+            offset = int(range_header[len("bytes="):-1])
+            self.status = 206
+            self.headers["Content-Range"] = f"bytes {offset}-{len(data) - 1}/{len(data)}"
+        self.headers["Content-Length"] = str(len(data) - offset)
+        self.fp = io.BytesIO(data[offset:])
+        self.fail_after = fail_after
+
+    def info(self):
+        return self.headers
+
+    def read(self, size):
+        if self.fail_after is not None and self.fp.tell() >= self.fail_after:
+            raise urllib3.exceptions.ProtocolError("Connection broken")
+        return self.fp.read(size)
+
+    def close(self):
+        pass
+
+
+class TestResumableDownload(unittest.TestCase):
+    DATA = bytes(range(256)) * 100
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp(prefix='osc_test')
+        oscrc = os.path.join(FIXTURES_DIR, "oscrc")
+        osc.conf.get_config(override_conffile=oscrc, override_no_keyring=True)
+        self.path = os.path.join(self.tmpdir, "file")
+        self.requests = []
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def _http_GET(self, responses):
+        def http_GET(url, data=None, headers=None):
+            self.requests.append(headers)
+            return FakeResponse(self.DATA, headers, **responses.pop(0))
+        return http_GET
+
+    def _urlgrab(self, responses, **kwargs):
+        gr = osc_grabber.OscFileGrabber()
+        with patch("osc.core.BUFSIZE", 1000), patch("osc.core.http_GET", self._http_GET(responses)):
+            gr.urlgrab("http://example.com/file", self.path, **kwargs)
+
+    def _read(self, path=None):
+        with open(path or self.path, "rb") as f:
+            return f.read()
+
+    def test_resume_broken_transfer(self):
+        self._urlgrab([{"fail_after": 5000}, {}], md5=hashlib.md5(self.DATA).hexdigest())
+        self.assertEqual(self._read(), self.DATA)
+        self.assertEqual(
+            self.requests,
+            [
+                {"Accept-Encoding": "identity"},
+                {"Accept-Encoding": "identity", "Range": "bytes=5000-"},
+            ],
+        )
+        self.assertEqual(os.listdir(self.tmpdir), ["file"])
+
+    def test_first_byte(self):
+        calls = []
+        self._urlgrab([{"fail_after": 5000}, {}], on_first_byte=lambda: calls.append(len(self.requests)))
+        # called once, when the data of the first response arrived
+        self.assertEqual(calls, [1])
+
+    def test_abort(self):
+        abort = threading.Event()
+        abort.set()
+        self.assertRaises(osc.oscerr.UserAbort, self._urlgrab, [{}], resume=True, abort=abort)
+        # the partial download is kept for the next time
+        self.assertTrue(os.path.exists(f"{self.path}.part"))
+        self.assertFalse(os.path.exists(self.path))
+
+    def test_resume_without_range_support(self):
+        self._urlgrab([{"fail_after": 5000}, {"ranges": False}], size=len(self.DATA))
+        self.assertEqual(self._read(), self.DATA)
+
+    def test_resume_part_file(self):
+        with open(f"{self.path}.part", "wb") as f:
+            f.write(self.DATA[:1234])
+        self._urlgrab([{}], resume=True, size=len(self.DATA), md5=hashlib.md5(self.DATA).hexdigest())
+        self.assertEqual(self._read(), self.DATA)
+        self.assertEqual(self.requests, [{"Accept-Encoding": "identity", "Range": "bytes=1234-"}])
+        self.assertFalse(os.path.exists(f"{self.path}.part"))
+
+    def test_keep_part_file(self):
+        responses = [{"fail_after": 5000} for i in range(int(osc.conf.config["http_retries"]))]
+        self.assertRaises(urllib3.exceptions.ProtocolError, self._urlgrab, responses, resume=True)
+        self.assertFalse(os.path.exists(self.path))
+        # every retry resumed the download and added 5000 bytes
+        self.assertEqual(self._read(f"{self.path}.part"), self.DATA[:5000 * len(self.requests)])
+
+    def test_md5_mismatch(self):
+        self.assertRaises(osc.oscerr.OscIOError, self._urlgrab, [{}], resume=True, md5=hashlib.md5(b"other").hexdigest())
+        self.assertFalse(os.path.exists(self.path))
+        self.assertFalse(os.path.exists(f"{self.path}.part"))
+
+    def test_corrupted_part_file(self):
+        # a partial file left by a download of a different version of the file
+        with open(f"{self.path}.part", "wb") as f:
+            f.write(b"garbage")
+        self._urlgrab([{}, {}], resume=True, md5=hashlib.md5(self.DATA).hexdigest())
+        # rejected and downloaded again from the start
+        self.assertEqual(self._read(), self.DATA)
+        self.assertEqual(
+            self.requests,
+            [
+                {"Accept-Encoding": "identity", "Range": "bytes=7-"},
+                {"Accept-Encoding": "identity"},
+            ],
+        )
+        self.assertFalse(os.path.exists(f"{self.path}.part"))
+
+    def test_locked_part_file(self):
+        with open(f"{self.path}.part", "wb") as f:
+            f.write(self.DATA[:1234])
+        with open(f"{self.path}.part", "ab") as f:
+            # another process is downloading the file
+            fcntl.flock(f, fcntl.LOCK_EX)
+            self._urlgrab([{}], resume=True, size=len(self.DATA))
+        self.assertEqual(self._read(), self.DATA)
+        self.assertEqual(self.requests, [{"Accept-Encoding": "identity"}])
+        # the partial file of the other process is untouched
+        self.assertEqual(self._read(f"{self.path}.part"), self.DATA[:1234])
+
+
+class TestMirrorStats(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp(prefix='osc_test')
+        self.path = os.path.join(self.tmpdir, "mirrorstats.json")
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_sort(self):
+        stats = osc_grabber.MirrorStats(self.path)
+        stats.add("http://slow/a.rpm", 1000, 10)
+        stats.add("http://fast/b.rpm", 1000, 1)
+        stats.add("http://broken/c.rpm", 0, 30, failed=True)
+        urls = ["http://broken/x.rpm", "http://slow/x.rpm", "http://new/x.rpm", "http://fast/x.rpm"]
+        self.assertEqual(stats.sort(urls), ["http://new/x.rpm", "http://fast/x.rpm", "http://slow/x.rpm", "http://broken/x.rpm"])
+
+    def test_sort_latency(self):
+        stats = osc_grabber.MirrorStats(self.path)
+        # the same throughput, but the first mirror takes long to respond
+        stats.add("http://distant/a.rpm", 1024 * 1024, 3, first_byte=2)
+        stats.add("http://near/a.rpm", 1024 * 1024, 1.1, first_byte=0.1)
+        self.assertEqual(stats.throughput("http://distant"), stats.throughput("http://near"))
+        self.assertEqual(stats.latency("http://distant"), 2)
+        urls = ["http://distant/x.rpm", "http://near/x.rpm"]
+        self.assertEqual(stats.sort(urls), ["http://near/x.rpm", "http://distant/x.rpm"])
+
+    def test_window(self):
+        stats = osc_grabber.MirrorStats(self.path)
+        stats.add("http://mirror/a.rpm", 0, 30, failed=True)
+        for i in range(stats.WINDOW):
+            stats.add("http://mirror/a.rpm", 1000, 1)
+        self.assertEqual(stats.throughput("http://mirror"), 1000)
+
+    def test_persistent(self):
+        stats = osc_grabber.MirrorStats(self.path)
+        stats.add("http://mirror/a.rpm", 1000, 2)
+        stats.save()
+        stats = osc_grabber.MirrorStats(self.path)
+        self.assertEqual(stats.throughput("http://mirror/b.rpm"), 500)
+
+    def test_skip_stalled_mirror(self):
+        def urlgrab(url, filename, text, resume=False, timeout=None, on_first_byte=None):
+            if url.startswith("http://stalled/"):
+                raise urllib3.exceptions.ReadTimeoutError(None, url, "Read timed out.")
+            on_first_byte()
+            with open(filename, "wb") as f:
+                f.write(b"data")
+
+        gr = osc_grabber.OscFileGrabber()
+        stats = osc_grabber.MirrorStats(self.path)
+        mg = osc_grabber.OscMirrorGroup(gr, ["http://stalled/x.rpm", "http://mirror/x.rpm"], stats=stats, timeout=1)
+        with patch.object(gr, "urlgrab", side_effect=urlgrab) as mock:
+            self.assertTrue(mg.urlgrab("x.rpm", os.path.join(self.tmpdir, "x.rpm")))
+            self.assertEqual(mock.call_args_list[0].kwargs["timeout"], 1)
+        self.assertEqual(stats.throughput("http://stalled"), 0)
+        self.assertIsNone(stats.latency("http://stalled"))
+        self.assertIsNotNone(stats.latency("http://mirror"))
+        self.assertEqual(stats.sort(mg._mirrors), ["http://mirror/x.rpm", "http://stalled/x.rpm"])
+
+
 if __name__ == "__main__":
     unittest.main()
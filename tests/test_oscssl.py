@@ -0,0 +1,134 @@
+import datetime
+import os
+import shutil
+import socket
+import ssl
+import tempfile
+import threading
+import unittest
+
+from cryptography import x509
+from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ec
+from cryptography.x509.oid import NameOID
+
+from osc import oscssl
+
+
+def create_cert(path):
+    key = ec.generate_private_key(ec.SECP256R1())
+    name = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, "localhost")])
+    now = datetime.datetime.now(datetime.timezone.utc)
+    cert = (
+        x509.CertificateBuilder()
+        .subject_name(name)
+        .issuer_name(name)
+        .public_key(key.public_key())
+        .serial_number(x509.random_serial_number())
+        .not_valid_before(now - datetime.timedelta(days=1))
+        .not_valid_after(now + datetime.timedelta(days=1))
+        .add_extension(x509.SubjectAlternativeName([x509.DNSName("localhost")]), critical=False)
+        .add_extension(x509.BasicConstraints(ca=True, path_length=None), critical=True)
+        .sign(key, hashes.SHA256())
+    )
+    cert_path = os.path.join(path, "cert.pem")
+    key_path = os.path.join(path, "key.pem")
+    with open(cert_path, "wb") as f:
+        f.write(cert.public_bytes(serialization.Encoding.PEM))
+    with open(key_path, "wb") as f:
+        f.write(key.private_bytes(serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption()))
+    return cert_path, key_path
+
+
+class TlsServer(threading.Thread):
+    """
+    Accept TLS connections, answer each with a single line and close them.
+    """
+
+    def __init__(self, cert_path, key_path):
+        super().__init__(daemon=True)
+        self.context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+        self.context.load_cert_chain(cert_path, key_path)
+        self.stopped = threading.Event()
+        self.sock = socket.socket()
+        self.sock.settimeout(0.1)
+        self.sock.bind(("127.0.0.1", 0))
+        self.sock.listen()
+        self.port = self.sock.getsockname()[1]
+
+    def run(self):
+        while not self.stopped.is_set():
+            try:
+                conn, _ = self.sock.accept()
+            except socket.timeout:
+                continue
+            conn.settimeout(10)
+            try:
+                with self.context.wrap_socket(conn, server_side=True) as tls_conn:
+                    tls_conn.recv(1024)
+                    tls_conn.sendall(b"ok\n")
+            except OSError:
+                pass
+
+    def stop(self):
+        self.stopped.set()
+        self.join()
+        self.sock.close()
+
+
+class TestSessionReuse(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp(prefix="osc_test_")
+        self.cert_path, key_path = create_cert(self.tmpdir)
+        self.server = TlsServer(self.cert_path, key_path)
+        self.server.start()
+
+    def tearDown(self):
+        self.server.stop()
+        shutil.rmtree(self.tmpdir)
+
+    def _connect(self, ssl_context):
+        sock = socket.create_connection(("127.0.0.1", self.server.port))
+        with ssl_context.wrap_socket(sock, server_hostname="localhost") as tls_sock:
+            tls_sock.sendall(b"hello\n")
+            self.assertEqual(tls_sock.recv(1024), b"ok\n")
+            return tls_sock.session_reused
+
+    def _create_ssl_context(self, session_reuse):
+        ssl_context = oscssl.create_ssl_context(session_reuse=session_reuse)
+        ssl_context.load_verify_locations(cafile=self.cert_path)
+        return ssl_context
+
+    def test_session_reuse(self):
+        ssl_context = self._create_ssl_context(session_reuse=True)
+        self.assertIsInstance(ssl_context, oscssl.SessionReuseSSLContext)
+        self.assertEqual(ssl_context.verify_mode, ssl.CERT_REQUIRED)
+        self.assertFalse(self._connect(ssl_context))
+        self.assertTrue(self._connect(ssl_context))
+        self.assertTrue(self._connect(ssl_context))
+
+    def test_same_settings(self):
+        ssl_context = oscssl.create_ssl_context(session_reuse=False)
+        session_reuse_ssl_context = oscssl.create_ssl_context(session_reuse=True)
+        self.assertIs(type(session_reuse_ssl_context), oscssl.SessionReuseSSLContext)
+        for name in ("protocol", "options", "verify_flags", "verify_mode", "check_hostname", "minimum_version", "maximum_version"):
+            self.assertEqual(getattr(session_reuse_ssl_context, name), getattr(ssl_context, name), name)
+        self.assertEqual(session_reuse_ssl_context.get_ciphers(), ssl_context.get_ciphers())
+
+    def test_no_session_reuse(self):
+        ssl_context = self._create_ssl_context(session_reuse=False)
+        self.assertNotIsInstance(ssl_context, oscssl.SessionReuseSSLContext)
+        self.assertFalse(self._connect(ssl_context))
+        self.assertFalse(self._connect(ssl_context))
+
+    def test_untrusted_server(self):
+        ssl_context = oscssl.create_ssl_context(session_reuse=True)
+        sock = socket.create_connection(("127.0.0.1", self.server.port))
+        with self.assertRaises(ssl.SSLError):
+            ssl_context.wrap_socket(sock, server_hostname="localhost")
+        sock.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
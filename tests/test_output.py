@@ -1,10 +1,16 @@
+import concurrent.futures
 import contextlib
 import io
+import sys
 import tempfile
+import threading
+import time
 import unittest
 
 import osc.conf
+import osc.output
 from osc.output import KeyValueTable
+from osc.output import ordered_map
 from osc.output import print_msg
 from osc.output import safe_write
 from osc.output import sanitize_text
@@ -264,5 +270,82 @@ class TestSafeWrite(unittest.TestCase):
             safe_write(f, b"bytes")
 
 
+
+class TestOrderedMap(unittest.TestCase):
+    @staticmethod
+    def _func(num):
+        # the later items finish first
+        time.sleep((5 - num) * 0.01)
+        print(f"stdout {num}")
+        print(f"stderr {num}", file=sys.stderr)
+        sys.stdout.buffer.write(f"bytes {num}\n".encode("utf-8"))
+        if num == 3:
+            raise ValueError(num)
+        return num * 10
+
+    def _run(self, items, jobs):
+        stdout = io.TextIOWrapper(io.BytesIO(), encoding="utf-8", write_through=True)
+        stderr = io.StringIO()
+        with contextlib.redirect_stdout(stdout), contextlib.redirect_stderr(stderr):
+            try:
+                result = ordered_map(self._func, items, jobs)
+            except ValueError as e:
+                result = e
+        return result, stdout.buffer.getvalue().decode("utf-8"), stderr.getvalue()
+
+    def test_order(self):
+        result, stdout, stderr = self._run([0, 1, 2, 4], jobs=4)
+        self.assertEqual(result, [0, 10, 20, 40])
+        self.assertEqual(stdout, "".join(f"stdout {i}\nbytes {i}\n" for i in (0, 1, 2, 4)))
+        self.assertEqual(stderr, "".join(f"stderr {i}\n" for i in (0, 1, 2, 4)))
+
+    def test_same_as_serial(self):
+        self.assertEqual(self._run([0, 1, 2, 4], jobs=4), self._run([0, 1, 2, 4], jobs=1))
+
+    def test_error(self):
+        result, stdout, stderr = self._run([0, 1, 2, 3, 4], jobs=2)
+        self.assertIsInstance(result, ValueError)
+        self.assertEqual(result.args, (3,))
+        lines = stdout.splitlines()
+        # the output of the failed item and of all items before it is printed in order
+        self.assertEqual(lines[:8], [f"{kind} {i}" for i in range(4) for kind in ("stdout", "bytes")])
+
+    def test_other_thread(self):
+        # output of a thread that doesn't run a task is neither captured nor lost
+        stdout = io.StringIO()
+        started = threading.Event()
+        printed = threading.Event()
+
+        def other():
+            started.wait()
+            print("other")
+            printed.set()
+
+        def func(num):
+            started.set()
+            printed.wait(1)
+            print(f"task {num}")
+
+        thread = threading.Thread(target=other)
+        thread.start()
+        with contextlib.redirect_stdout(stdout):
+            ordered_map(func, [0, 1], jobs=2)
+            thread.join()
+        self.assertEqual(stdout.getvalue(), "other\ntask 0\ntask 1\n")
+
+    def test_bind_task_output(self):
+        def func(num):
+            time.sleep((2 - num) * 0.01)
+            with concurrent.futures.ThreadPoolExecutor(max_workers=2) as executor:
+                inner = osc.output.bind_task_output(lambda i: print(f"task {num} file {i}"))
+                list(executor.map(inner, [0]))
+                executor.submit(inner, 1).result()
+
+        stdout = io.StringIO()
+        with contextlib.redirect_stdout(stdout):
+            ordered_map(func, [0, 1], jobs=2)
+        self.assertEqual(stdout.getvalue(), "task 0 file 0\ntask 0 file 1\ntask 1 file 0\ntask 1 file 1\n")
+
+
 if __name__ == "__main__":
     unittest.main()
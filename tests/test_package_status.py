@@ -1,5 +1,7 @@
 import os
+import pickle
 import unittest
+from unittest.mock import patch
 
 import osc.core
 import osc.oscerr
@@ -87,5 +89,43 @@ class TestPackageStatus(OscTestCase):
         self.assertEqual(exp_st, st)
 
 
+    @patch("osc.core.Package.STAT_CACHE_RACY_SECONDS", -3600)
+    def test_stat_cache(self):
+        """checksums of unchanged files are read from the stat cache"""
+        self._change_to_pkg('simple')
+        p = osc.core.Package('.')
+        exp_st = [('M', 'nochange'), (' ', 'test')]
+        self.assertEqual(p.get_status(False, 'A', '?', 'D', '!', 'R', 'S'), exp_st)
+        self.assertEqual(sorted(p.store.stat_cache), ['nochange', 'test'])
+
+        p = osc.core.Package('.')
+        with patch("osc.core.dgst", side_effect=AssertionError("file read")):
+            self.assertEqual(p.get_status(False, 'A', '?', 'D', '!', 'R', 'S'), exp_st)
+
+        with open('test', 'a') as f:
+            f.write('modified\n')
+        p = osc.core.Package('.')
+        with patch("osc.core.dgst", wraps=osc.core.dgst) as dgst:
+            self.assertEqual(p.get_status(False, 'A', '?', 'D', '!', 'R', 'S'), [('M', 'nochange'), ('M', 'test')])
+            self.assertEqual(dgst.call_count, 1)
+
+    def test_stat_cache_racy(self):
+        """checksums of files modified just now are not cached"""
+        self._change_to_pkg('simple')
+        with open('test', 'a') as f:
+            f.write('modified\n')
+        p = osc.core.Package('.')
+        self.assertIn(('M', 'test'), p.get_status())
+        self.assertNotIn('test', p.store.stat_cache)
+
+    def test_pickle(self):
+        """the package can be sent to a process pool"""
+        self._change_to_pkg('simple')
+        p = osc.core.Package('.')
+        p_copy = pickle.loads(pickle.dumps(p))
+        self.assertEqual(p_copy.filelist.get('foo').name, 'foo')
+        self.assertEqual(p_copy.get_status(), p.get_status())
+
+
 if __name__ == '__main__':
     unittest.main()
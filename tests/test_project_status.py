@@ -1,6 +1,9 @@
 import os
+import threading
 import unittest
+from unittest.mock import patch
 
+import osc.conf
 import osc.core
 import osc.oscerr
 
@@ -162,5 +165,41 @@ class TestProjectStatus(OscTestCase):
         self.assertTrue(isinstance(p, type(None)))
 
 
+    def test_set_state_concurrently(self):
+        """packages are added to _packages from multiple threads"""
+        self._change_to_pkg('.')
+        prj = osc.core.Project('.', getPackageList=False)
+        names = [f'new{i}' for i in range(50)]
+
+        def worker(name):
+            prj.set_state(name, ' ')
+            prj.write_packages()
+
+        threads = [threading.Thread(target=worker, args=(name,)) for name in names]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        prj = osc.core.Project('.', getPackageList=False)
+        for name in names:
+            self.assertEqual(prj.get_state(name), ' ')
+
+    def test_download_workers(self):
+        """concurrently updated packages share the connection pool"""
+        osc.conf.config["http_pool_size"] = 10
+        self.assertIsNone(osc.core.Project.get_download_workers(1))
+        self.assertEqual(osc.core.Project.get_download_workers(4), 2)
+        self.assertEqual(osc.core.Project.get_download_workers(20), 1)
+
+    def test_update_pacs_download_workers(self):
+        self._change_to_pkg('.')
+        osc.conf.config["http_pool_size"] = 10
+        prj = osc.core.Project('.', getPackageList=False)
+        with patch("osc.obs_scm.package.Package.update") as update:
+            prj.update(pacs=["simple", "added"], jobs=2)
+        self.assertEqual([i.kwargs["download_workers"] for i in update.call_args_list], [5, 5])
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -165,7 +165,7 @@ class TestRepairWC(OscTestCase):
         # additional cleanup check
         self.__assertNotRaises(osc.oscerr.WorkingCopyInconsistent, osc.core.Package, '.')
 
-    @GET('http://localhost/source/osctest/multiple/merge?rev=1', text='Is it\npossible to\nmerge this file?I hope so...\n')
+    @GET('http://localhost/source/osctest/multiple/merge?rev=1', text='Is it\npossible to\nmerge this file?\nI hope so...\n')
     @GET('http://localhost/source/osctest/multiple/nochange?rev=1', text='This file didn\'t change.\n')
     def test_multiple(self):
         """
@@ -5,7 +5,7 @@ import unittest
 import osc.core
 import osc.oscerr
 
-from .common import GET, OscTestCase
+from .common import GET, UNORDERED, OscTestCase
 
 
 FIXTURES_DIR = os.path.join(os.path.dirname(__file__), 'update_fixtures')
@@ -191,6 +191,7 @@ class TestUpdate(OscTestCase):
 
         self._check_digests('testUpdateLimitSizeAddDelete_files', 'bigfile', 'foo', 'merge', 'nochange')
 
+    @UNORDERED
     @GET('http://localhost/source/osctest/services?rev=latest', file='testUpdateServiceFilesAddDelete_filesremote')
     @GET('http://localhost/source/osctest/services/bigfile?rev=2', file='testUpdateServiceFilesAddDelete_bigfile')
     @GET('http://localhost/source/osctest/services/_service:bar?rev=2', file='testUpdateServiceFilesAddDelete__service:bar')
@@ -225,6 +226,41 @@ class TestUpdate(OscTestCase):
         self.assertTrue(os.path.exists('_service:exists'))
         self._check_digests('testUpdateServiceFilesAddDelete_files', '_service:foo', '_service:bar')
 
+    @GET('http://localhost/source/osctest/services?rev=latest', file='testUpdateServiceFilesAddDelete_filesremote')
+    @GET('http://localhost/source/osctest/services?rev=2&view=cpio', file='testUpdateCpioBulkDownload_archive')
+    @GET('http://localhost/source/osctest/services/_service:foo?rev=2', file='testUpdateServiceFilesAddDelete__service:foo')
+    @GET('http://localhost/source/osctest/services/_meta', file='meta.xml')
+    def testUpdateCpioBulkDownload(self):
+        """
+        update package with the files from a cpio archive
+        ('_service:foo' is broken in the archive and gets downloaded separately)
+        """
+        self._change_to_pkg('services')
+        osc.core.Package('.').update(service_files=True, cpio_bulk_download=True)
+        exp = 'A    bigfile\nD    _service:exists\nA    _service:bar\nA    _service:foo\nAt revision 2.\n'
+        self.assertEqual(sys.stdout.getvalue(), exp)
+        self.assertFileContentEqual('_service:bar', 'another service\n')
+        self.assertFileContentEqual('_service:foo', 'small\n')
+        self.assertEqual(os.path.getmtime('bigfile'), 1282320398)
+        self.assertEqual([i for i in os.listdir(os.path.join('.osc', 'sources')) if i.endswith('.osctmp')], [])
+        self._check_digests('testUpdateServiceFilesAddDelete_files', '_service:foo', '_service:bar')
+
+    @UNORDERED
+    @GET('http://localhost/source/osctest/services?rev=latest', file='testUpdateServiceFilesAddDelete_filesremote')
+    @GET('http://localhost/source/osctest/services?rev=2&view=cpio', text='<status code="400" />', code=400)
+    @GET('http://localhost/source/osctest/services/bigfile?rev=2', file='testUpdateServiceFilesAddDelete_bigfile')
+    @GET('http://localhost/source/osctest/services/_service:bar?rev=2', file='testUpdateServiceFilesAddDelete__service:bar')
+    @GET('http://localhost/source/osctest/services/_service:foo?rev=2', file='testUpdateServiceFilesAddDelete__service:foo')
+    @GET('http://localhost/source/osctest/services/_meta', file='meta.xml')
+    def testUpdateCpioBulkDownloadUnsupported(self):
+        """the server doesn't provide a cpio archive, all files are downloaded separately"""
+        self._change_to_pkg('services')
+        osc.core.Package('.').update(service_files=True, cpio_bulk_download=True)
+        exp = 'A    bigfile\nD    _service:exists\nA    _service:bar\nA    _service:foo\nAt revision 2.\n'
+        self.assertEqual(sys.stdout.getvalue(), exp)
+        self.assertFileContentEqual('_service:foo', 'small\n')
+        self._check_digests('testUpdateServiceFilesAddDelete_files', '_service:foo', '_service:bar')
+
     @GET('http://localhost/source/osctest/metamode?meta=1&rev=latest', file='testUpdateMetaMode_filesremote')
     @GET('http://localhost/source/osctest/metamode/_meta?meta=1&rev=1', file='testUpdateMetaMode__meta')
     def testUpdateMetaMode(self):
@@ -253,6 +289,7 @@ class TestUpdate(OscTestCase):
 
     # tests to recover from an aborted/broken update
 
+    @UNORDERED
     @GET('http://localhost/source/osctest/simple/foo?rev=2', file='testUpdateResume_foo')
     @GET('http://localhost/source/osctest/simple/merge?rev=2', file='testUpdateResume_merge')
     @GET('http://localhost/source/osctest/simple/_meta', file='meta.xml')
@@ -267,6 +304,26 @@ class TestUpdate(OscTestCase):
         self.assertFalse(os.path.exists(os.path.join('.osc', '_in_update')))
         self._check_digests('testUpdateResume_files')
 
+    @UNORDERED
+    @GET('http://localhost/source/osctest/simple/foo?rev=2', file='testUpdateResume_foo')
+    @GET('http://localhost/source/osctest/simple/merge?rev=2', file='testUpdateResume_merge')
+    @GET('http://localhost/source/osctest/simple/_meta', file='meta.xml')
+    @GET('http://localhost/source/osctest/simple?rev=2', file='testUpdateResume_files')
+    @GET('http://localhost/source/osctest/simple/_meta', file='meta.xml')
+    def testUpdateResumeMultipleFiles(self):
+        """
+        resume an aborted update of several files (the storefile of 'foo' was already
+        updated but the working copy file was not)
+        """
+        self._change_to_pkg('resume_multiple')
+        osc.core.Package('.').update(rev=2)
+        exp = 'resuming broken update...\nU    foo\nU    merge\nAt revision 2.\nAt revision 2.\n'
+        self.assertEqual(sys.stdout.getvalue(), exp)
+        self.assertFalse(os.path.exists(os.path.join('.osc', '_in_update')))
+        self.assertFilesEqual('foo', os.path.join(self._get_fixtures_dir(), 'testUpdateResume_foo'))
+        self._check_digests('testUpdateResume_files')
+
+    @UNORDERED
     @GET('http://localhost/source/osctest/simple/foo?rev=1', file='testUpdateResumeDeletedFile_foo')
     @GET('http://localhost/source/osctest/simple/merge?rev=1', file='testUpdateResumeDeletedFile_merge')
     @GET('http://localhost/source/osctest/simple/_meta', file='meta.xml')
@@ -1,3 +1,5 @@
+import hashlib
+import io
 import os
 import shutil
 import tempfile
@@ -5,6 +7,7 @@ import unittest
 
 from osc.util.cpio import CpioRead
 from osc.util.cpio import CpioError
+from osc.util.cpio import CpioStreamRead
 
 
 FIXTURES_DIR = os.path.join(os.path.dirname(__file__), "fixtures")
@@ -67,5 +70,63 @@ class TestCpio(unittest.TestCase):
             self.assertEqual(f.read(), "file-in-a-dir\n")
 
 
+class NonSeekableFile(io.RawIOBase):
+    """Return at most 7 bytes per read() to simulate a network stream"""
+
+    def __init__(self, data):
+        super().__init__()
+        self.data = data
+
+    def readable(self):
+        return True
+
+    def readinto(self, b):
+        size = min(len(b), len(self.data), 7)
+        b[:size] = self.data[:size]
+        self.data = self.data[size:]
+        return size
+
+
+class TestCpioStream(unittest.TestCase):
+    def setUp(self):
+        with open(os.path.join(FIXTURES_DIR, "archive.cpio"), "rb") as f:
+            self.data = f.read()
+
+    def test_file_list(self):
+        cpio = CpioStreamRead(NonSeekableFile(self.data))
+        actual = [i.filename for i in cpio]
+        archive = CpioRead(os.path.join(FIXTURES_DIR, "archive.cpio"))
+        archive.read()
+        expected = [i.filename for i in archive]
+        self.assertEqual(actual, expected)
+
+    def test_copyin_fileobj(self):
+        cpio = CpioStreamRead(NonSeekableFile(self.data))
+        result = {}
+        for hdr in cpio:
+            if hdr.filename not in (b"a\nb", b"dir/file"):
+                # skipping data of a member
+                continue
+            f = io.BytesIO()
+            md5 = hashlib.md5()
+            cpio.copyin_fileobj(f, md5)
+            result[hdr.filename] = f.getvalue()
+            self.assertEqual(md5.hexdigest(), hashlib.md5(f.getvalue()).hexdigest())
+
+        expected = {
+            b"a\nb": b"newline\n",
+            b"dir/file": b"file-in-a-dir\n",
+        }
+        self.assertEqual(result, expected)
+
+    def test_truncated(self):
+        cpio = CpioStreamRead(NonSeekableFile(self.data[:200]))
+        self.assertRaises(CpioError, list, cpio)
+
+    def test_invalid_format(self):
+        cpio = CpioStreamRead(io.BytesIO(b"0" * 512))
+        self.assertRaises(CpioError, list, cpio)
+
+
 if __name__ == "__main__":
     unittest.main()
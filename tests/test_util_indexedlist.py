@@ -0,0 +1,77 @@
+import copy
+import operator
+import pickle
+import unittest
+
+from osc.obs_scm.file import File
+from osc.util.indexedlist import IndexedList
+
+
+class TestIndexedList(unittest.TestCase):
+    def test_contains(self):
+        lst = IndexedList(["a", "b"])
+        self.assertIn("a", lst)
+        self.assertNotIn("c", lst)
+        self.assertNotIn([], lst)
+
+        lst.append("c")
+        lst.extend(["d", "e"])
+        lst += ["f"]
+        lst.insert(0, "g")
+        self.assertEqual(lst, ["g", "a", "b", "c", "d", "e", "f"])
+        for i in lst:
+            self.assertIn(i, lst)
+
+        lst.remove("a")
+        self.assertNotIn("a", lst)
+        self.assertEqual(lst.pop(), "f")
+        self.assertNotIn("f", lst)
+        del lst[0]
+        self.assertNotIn("g", lst)
+        lst[0] = "x"
+        self.assertNotIn("b", lst)
+        self.assertIn("x", lst)
+        lst.clear()
+        self.assertNotIn("x", lst)
+
+    def test_duplicates(self):
+        lst = IndexedList(["a", "a"])
+        lst.remove("a")
+        self.assertIn("a", lst)
+        lst.remove("a")
+        self.assertNotIn("a", lst)
+
+    def test_key(self):
+        a = File("a", "md5-a", 1, 1)
+        b = File("b", "md5-b", 1, 1)
+        lst = IndexedList([a], key=lambda f: f.name)
+        lst.append(b)
+        self.assertIs(lst.get("a"), a)
+        self.assertIs(lst.get("b"), b)
+        self.assertIsNone(lst.get("c"))
+        self.assertIn(a, lst)
+
+        lst.remove(a)
+        self.assertIsNone(lst.get("a"))
+
+    def test_copy(self):
+        lst = IndexedList(["a"])
+        lst_copy = copy.copy(lst)
+        lst_copy.append("b")
+        self.assertIsInstance(lst_copy, IndexedList)
+        self.assertNotIn("b", lst)
+        self.assertIn("b", lst_copy)
+        self.assertEqual(lst[:], ["a"])
+
+    def test_pickle(self):
+        a = File("a", "md5-a", 1, 1)
+        lst = IndexedList([a], key=operator.attrgetter("name"))
+        lst_copy = pickle.loads(pickle.dumps(lst))
+        self.assertIsInstance(lst_copy, IndexedList)
+        self.assertEqual(lst_copy, lst)
+        self.assertEqual(lst_copy.get("a"), a)
+        self.assertIsNot(lst_copy.get("a"), a)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,237 @@
+import hashlib
+import json
+import os
+import shutil
+import struct
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from osc.util.packagecache import Hdrmd5Index
+from osc.util.packagecache import PackageStore
+
+
+class TestHdrmd5Index(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp(prefix="osc_test_")
+        self.path = os.path.join(self.tmpdir, "prj", "repo", "x86_64", "foo.rpm")
+        os.makedirs(os.path.dirname(self.path))
+        self._write(b"data")
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def _write(self, data):
+        with open(self.path, "wb") as f:
+            f.write(data)
+
+    def test_whole_file(self):
+        index = Hdrmd5Index(self.tmpdir)
+        self.assertEqual(index.hdrmd5(self.path, whole_file=True), hashlib.md5(b"data").hexdigest())
+
+    @patch("osc.util.packagequery.PackageQuery.queryhdrmd5", return_value="hdrmd5")
+    def test_cached(self, queryhdrmd5):
+        index = Hdrmd5Index(self.tmpdir)
+        self.assertEqual(index.hdrmd5(self.path), "hdrmd5")
+        self.assertEqual(index.hdrmd5(self.path), "hdrmd5")
+        self.assertEqual(queryhdrmd5.call_count, 1)
+
+    @patch("osc.util.packagequery.PackageQuery.queryhdrmd5", return_value="hdrmd5")
+    def test_persistent(self, queryhdrmd5):
+        index = Hdrmd5Index(self.tmpdir)
+        index.set(self.path, canonname="foo-1-1.x86_64.rpm")
+        self.assertEqual(index.hdrmd5(self.path), "hdrmd5")
+        index.save()
+
+        index = Hdrmd5Index(self.tmpdir)
+        self.assertEqual(index.hdrmd5(self.path), "hdrmd5")
+        self.assertEqual(index.get(self.path)["canonname"], "foo-1-1.x86_64.rpm")
+        self.assertEqual(queryhdrmd5.call_count, 1)
+
+    @patch("osc.util.packagequery.PackageQuery.queryhdrmd5", return_value="hdrmd5")
+    def test_changed_file(self, queryhdrmd5):
+        index = Hdrmd5Index(self.tmpdir)
+        index.hdrmd5(self.path)
+        self._write(b"changed data")
+        self.assertIsNone(index.get(self.path))
+        index.hdrmd5(self.path)
+        self.assertEqual(queryhdrmd5.call_count, 2)
+
+    @patch("osc.util.packagequery.PackageQuery.queryhdrmd5", return_value="hdrmd5")
+    def test_verified(self, queryhdrmd5):
+        index = Hdrmd5Index(self.tmpdir)
+        self.assertFalse(index.is_verified(self.path, "keyring"))
+        index.set_verified(self.path, "keyring")
+        # computing hdrmd5 keeps the verification result
+        index.hdrmd5(self.path)
+        index.save()
+
+        index = Hdrmd5Index(self.tmpdir)
+        self.assertTrue(index.is_verified(self.path, "keyring"))
+        self.assertFalse(index.is_verified(self.path, "other-keyring"))
+
+        self._write(b"changed data")
+        self.assertFalse(index.is_verified(self.path, "keyring"))
+
+    def test_verified_missing_file(self):
+        index = Hdrmd5Index(self.tmpdir)
+        os.unlink(self.path)
+        index.set_verified(self.path, "keyring")
+        self.assertFalse(index.is_verified(self.path, "keyring"))
+
+    @patch("osc.util.packagecache.Hdrmd5Index.get", return_value=None)
+    def test_verified_changed_file(self, get):
+        index = Hdrmd5Index(self.tmpdir)
+        index.set_verified(self.path, "keyring")
+        self.assertEqual(get.call_count, 2)
+
+    def test_save_drops_missing_files(self):
+        index = Hdrmd5Index(self.tmpdir)
+        index.set(self.path, "hdrmd5")
+        os.unlink(self.path)
+        index.save()
+
+        index = Hdrmd5Index(self.tmpdir)
+        self.assertEqual(index._entries, {})
+
+
+def create_rpm(path, hdrmd5, signature, header=b"header"):
+    """
+    Write a file with the layout of a rpm: lead, signature header with hdrmd5 and a signature, header.
+    """
+    lead = struct.pack("!I", 0xEDABEEDB) + b"\0" * 74 + struct.pack("!h", 5) + b"\0" * 16
+    data = bytes.fromhex(hdrmd5) + signature
+    entries = struct.pack("!4i", 1004, 7, 0, 16) + struct.pack("!4i", 1002, 7, 16, len(signature))
+    sigheader = struct.pack("!I3i", 0x8EADE801, 0, 2, len(data)) + entries + data
+    sigheader += b"\0" * (-len(sigheader) % 8)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(lead + sigheader + header)
+    return path
+
+
+class TestPackageStore(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp(prefix="osc_test_")
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def _path(self, project, name):
+        return os.path.join(self.tmpdir, project, "repo", "x86_64", name)
+
+    def _write(self, project, name, data):
+        path = self._path(project, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb") as f:
+            f.write(data)
+        return path
+
+    def _add(self, store, path, hdrmd5, signer="key1"):
+        with open(path, "rb") as f:
+            md5 = hashlib.md5(f.read()).hexdigest()
+        return store.add(path, md5, hdrmd5, signer), md5
+
+    def test_add_link(self):
+        store = PackageStore(self.tmpdir)
+        path = self._write("prj1", "foo.rpm", b"foo")
+        added, md5 = self._add(store, path, "aaaa")
+        self.assertTrue(added)
+        self.assertIn(md5, store)
+        self.assertEqual(os.stat(path).st_ino, os.stat(store.path(md5)).st_ino)
+
+        path2 = self._path("prj2", "foo.rpm")
+        self.assertTrue(store.link(path2, "aaaa", "key1"))
+        self.assertEqual(os.stat(path2).st_ino, os.stat(path).st_ino)
+        self.assertFalse(store.link(path2, "bbbb", "key1"))
+        self.assertEqual(store.links, 2)
+        self.assertEqual(store.size, 3)
+
+    def test_link_other_signer(self):
+        store = PackageStore(self.tmpdir)
+        self._add(store, self._write("prj1", "foo.rpm", b"foo"), "aaaa", signer="key1")
+        path = self._path("prj2", "foo.rpm")
+        self.assertFalse(store.link(path, "aaaa", "key2"))
+        self.assertFalse(os.path.exists(path))
+
+    def test_deduplicate(self):
+        store = PackageStore(self.tmpdir)
+        path1 = self._write("prj1", "foo.rpm", b"foo")
+        path2 = self._write("prj2", "foo.rpm", b"foo")
+        self._add(store, path1, "aaaa")
+        self._add(store, path2, "aaaa")
+        self.assertEqual(os.stat(path1).st_ino, os.stat(path2).st_ino)
+        self.assertEqual(len(store), 1)
+
+    def test_different_signatures(self):
+        # the same build signed with the keys of different projects
+        hdrmd5 = hashlib.md5(b"header").hexdigest()
+        path1 = create_rpm(self._path("prj1", "foo.rpm"), hdrmd5, b"signature by prj1")
+        path2 = create_rpm(self._path("prj2", "foo.rpm"), hdrmd5, b"signature by prj2")
+        index = Hdrmd5Index(self.tmpdir)
+        self.assertEqual(index.hdrmd5(path1), hdrmd5)
+        self.assertEqual(index.hdrmd5(path2), hdrmd5)
+        self.assertNotEqual(index.md5(path1), index.md5(path2))
+
+        store = PackageStore(self.tmpdir)
+        self.assertTrue(store.add(path1, index.md5(path1), hdrmd5, "key1"))
+        self.assertTrue(store.add(path2, index.md5(path2), hdrmd5, "key2"))
+        # both copies are kept
+        self.assertEqual(len(store), 2)
+        self.assertNotEqual(os.stat(path1).st_ino, os.stat(path2).st_ino)
+        with open(path2, "rb") as f:
+            self.assertIn(b"signature by prj2", f.read())
+
+        # a project gets the copy signed with its keys
+        path3 = self._path("prj3", "foo.rpm")
+        self.assertTrue(store.link(path3, hdrmd5, "key2"))
+        self.assertEqual(os.stat(path3).st_ino, os.stat(path2).st_ino)
+
+    def test_persistent(self):
+        store = PackageStore(self.tmpdir)
+        _, md5 = self._add(store, self._write("prj1", "foo.rpm", b"foo"), "aaaa")
+        store.save()
+
+        store = PackageStore(self.tmpdir)
+        self.assertIn(md5, store)
+        self.assertEqual(store.links, 1)
+
+    def test_old_version(self):
+        store = PackageStore(self.tmpdir)
+        path = self._write("prj1", "foo.rpm", b"foo")
+        self._write(os.path.join(PackageStore.DIRNAME, "aa"), "aaaa", b"foo")
+        with open(store.index_path, "w") as f:
+            json.dump({"version": 1, "entries": {}}, f)
+
+        store = PackageStore(self.tmpdir)
+        self.assertEqual(len(store), 0)
+        self.assertEqual(os.listdir(store.topdir), [PackageStore.INDEX_FILENAME])
+        self.assertTrue(os.path.exists(path))
+
+    def test_prune(self):
+        store = PackageStore(self.tmpdir)
+        old = self._write("prj1", "old.rpm", b"old")
+        keep = self._write("prj1", "keep.rpm", b"keep")
+        new = self._write("prj1", "new.rpm", b"new")
+        _, old_md5 = self._add(store, old, "aaaa")
+        _, keep_md5 = self._add(store, keep, "bbbb")
+        _, new_md5 = self._add(store, new, "cccc")
+        store._entries[old_md5]["last_used"] = 1
+        store._entries[keep_md5]["last_used"] = 2
+        store._entries[new_md5]["last_used"] = 3
+
+        evicted, freed = store.prune(3, keep={"bbbb"}, dry_run=True)
+        self.assertEqual(evicted, [old_md5, new_md5])
+        self.assertEqual(len(store), 3)
+
+        evicted, freed = store.prune(7, keep={"bbbb"})
+        self.assertEqual(evicted, [old_md5])
+        self.assertEqual(freed, 3)
+        self.assertFalse(os.path.exists(old))
+        self.assertFalse(os.path.exists(store.path(old_md5)))
+        self.assertTrue(os.path.exists(keep))
+        self.assertTrue(os.path.exists(new))
+
+
+if __name__ == "__main__":
+    unittest.main()
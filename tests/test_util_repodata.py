@@ -0,0 +1,124 @@
+import gzip
+import os
+import shutil
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from osc.util import repodata
+
+
+REPOMD = """<?xml version="1.0" encoding="UTF-8"?>
+<repomd xmlns="http://linux.duke.edu/metadata/repo" xmlns:rpm="http://linux.duke.edu/metadata/rpm">
+  <data type="primary">
+    <location href="repodata/primary.xml.gz"/>
+  </data>
+</repomd>
+"""
+
+PRIMARY = """<?xml version="1.0" encoding="UTF-8"?>
+<metadata xmlns="http://linux.duke.edu/metadata/common" xmlns:rpm="http://linux.duke.edu/metadata/rpm" packages="2">
+  <package type="rpm">
+    <name>foo</name>
+    <arch>x86_64</arch>
+    <version epoch="0" ver="1.0" rel="2"/>
+    <description>Foo description</description>
+    <location href="x86_64/foo-1.0-2.x86_64.rpm"/>
+    <format>
+      <rpm:provides>
+        <rpm:entry name="foo" flags="EQ" epoch="0" ver="1.0" rel="2"/>
+        <rpm:entry name="libfoo.so.1()(64bit)"/>
+      </rpm:provides>
+      <rpm:requires>
+        <rpm:entry name="bar" flags="GE" epoch="0" ver="2"/>
+      </rpm:requires>
+    </format>
+  </package>
+  <package type="rpm">
+    <name>bar</name>
+    <arch>noarch</arch>
+    <version epoch="0" ver="2.0" rel="1"/>
+    <location href="noarch/bar-2.0-1.noarch.rpm"/>
+    <format>
+      <rpm:obsoletes>
+        <rpm:entry name="baz" flags="LT" epoch="0" ver="1"/>
+      </rpm:obsoletes>
+    </format>
+  </package>
+</metadata>
+"""
+
+
+class TestRepoData(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp(prefix="osc_test_")
+        self.repodir = os.path.join(self.tmpdir, "repo")
+        self.cachedir = os.path.join(self.tmpdir, "cache")
+        os.makedirs(os.path.join(self.repodir, "repodata"))
+        with open(os.path.join(self.repodir, "repodata", "repomd.xml"), "w", encoding="utf-8") as f:
+            f.write(REPOMD)
+        with gzip.open(os.path.join(self.repodir, "repodata", "primary.xml.gz"), "wt", encoding="utf-8") as f:
+            f.write(PRIMARY)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def _check(self, queries):
+        self.assertEqual([i.name() for i in queries], [b"foo", b"bar"])
+        foo, bar = queries
+
+        self.assertEqual(foo.arch(), b"x86_64")
+        self.assertEqual(foo.evr(), b"0:1.0-2")
+        self.assertEqual(foo.path(), os.path.join(self.repodir, "x86_64/foo-1.0-2.x86_64.rpm"))
+        self.assertEqual(foo.provides(), [b"foo = 1.0-2", b"libfoo.so.1()(64bit)"])
+        self.assertEqual(foo.requires(), [b"bar >= 2"])
+        self.assertEqual(foo.obsoletes(), [])
+        self.assertEqual(foo.canonname(), b"foo-1.0-2.x86_64.rpm")
+
+        self.assertEqual(bar.obsoletes(), [b"baz < 1"])
+        self.assertEqual(bar.provides(), [])
+
+        self.assertEqual(foo.description(), b"Foo description")
+        self.assertIsNone(bar.description())
+
+    def test_queries(self):
+        self._check(repodata.queries(self.repodir, use_cache=False))
+        self.assertFalse(os.path.exists(self.cachedir))
+
+    def test_cache(self):
+        self._check(repodata.queries(self.repodir, cachedir=self.cachedir))
+        self.assertEqual(len(os.listdir(self.cachedir)), 1)
+
+        with patch("osc.util.repodata.iterPrimary") as iterPrimary:
+            self._check(repodata.queries(self.repodir, cachedir=self.cachedir))
+            iterPrimary.assert_not_called()
+
+    def test_cache_invalidated(self):
+        repodata.queries(self.repodir, cachedir=self.cachedir)
+        with open(os.path.join(self.repodir, "repodata", "repomd.xml"), "a", encoding="utf-8") as f:
+            f.write("\n")
+        with patch("osc.util.repodata.iterPrimary", wraps=repodata.iterPrimary) as iterPrimary:
+            self._check(repodata.queries(self.repodir, cachedir=self.cachedir))
+            iterPrimary.assert_called_once()
+        # the cache of the previous repomd.xml was removed
+        self.assertEqual(len(os.listdir(self.cachedir)), 1)
+
+    def test_cache_other_repository(self):
+        repodata.queries(self.repodir, cachedir=self.cachedir)
+        otherdir = os.path.join(self.tmpdir, "other")
+        shutil.copytree(self.repodir, otherdir)
+        repodata.queries(otherdir, cachedir=self.cachedir)
+        # the caches of different repositories are kept
+        self.assertEqual(len(os.listdir(self.cachedir)), 2)
+
+    def test_element(self):
+        root = repodata.ET.fromstring(PRIMARY)
+        foo = repodata.RepoDataQueryResult(self.repodir, root.find(repodata.namespace("common") + "package"))
+        with patch("osc.util.repodata._readDescription") as readDescription:
+            self.assertEqual(foo.description(), b"Foo description")
+            readDescription.assert_not_called()
+        self.assertEqual(foo.provides(), [b"foo = 1.0-2", b"libfoo.so.1()(64bit)"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,93 @@
+import base64
+import os
+import shutil
+import subprocess
+import tempfile
+import time
+import unittest
+
+from osc.util import sshsig
+
+
+SSH_KEYGEN = shutil.which("ssh-keygen")
+SSH_AGENT = shutil.which("ssh-agent")
+SSH_ADD = shutil.which("ssh-add")
+
+
+@unittest.skipUnless(SSH_KEYGEN, "ssh-keygen is not available")
+class TestSshSig(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp(prefix="osc_test_")
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def _keygen(self, key_type, *args):
+        path = os.path.join(self.tmpdir, f"id_{key_type}")
+        subprocess.run([SSH_KEYGEN, "-q", "-t", key_type, "-N", "", "-C", "test", "-f", path, *args], check=True)
+        return path
+
+    def _verify(self, keyfile, signature, data, namespace):
+        armored = "-----BEGIN SSH SIGNATURE-----\n" + base64.encodebytes(signature).decode("ascii") + "-----END SSH SIGNATURE-----\n"
+        sig_path = os.path.join(self.tmpdir, "data.sig")
+        with open(sig_path, "w", encoding="utf-8") as f:
+            f.write(armored)
+        cmd = [SSH_KEYGEN, "-Y", "check-novalidate", "-n", namespace, "-s", sig_path]
+        proc = subprocess.run(cmd, input=data.encode("utf-8"), stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        self.assertEqual(proc.returncode, 0, proc.stderr)
+
+    def _test_keyfile(self, key_type, *args):
+        keyfile = self._keygen(key_type, *args)
+        agent = sshsig.SshAgentClient(socket_path=os.path.join(self.tmpdir, "no-agent"))
+        signature = sshsig.sign("(created): 1234", "realm", keyfile, agent=agent)
+        self.assertIsNotNone(signature)
+        self._verify(keyfile, signature, "(created): 1234", "realm")
+
+    def test_ed25519(self):
+        self._test_keyfile("ed25519")
+
+    def test_rsa(self):
+        self._test_keyfile("rsa", "-b", "2048")
+
+    def test_ecdsa(self):
+        self._test_keyfile("ecdsa", "-b", "384")
+
+    def test_encrypted_key(self):
+        keyfile = os.path.join(self.tmpdir, "id_ed25519")
+        subprocess.run([SSH_KEYGEN, "-q", "-t", "ed25519", "-N", "secret", "-f", keyfile], check=True)
+        os.unlink(f"{keyfile}.pub")
+        self.assertIsNone(sshsig.sign("data", "realm", keyfile, agent=sshsig.SshAgentClient(socket_path="")))
+
+    def test_fingerprint(self):
+        keyfile = self._keygen("ed25519")
+        proc = subprocess.run([SSH_KEYGEN, "-l", "-f", f"{keyfile}.pub"], stdout=subprocess.PIPE, check=True, encoding="utf-8")
+        self.assertEqual(sshsig.fingerprint(sshsig.read_public_key(f"{keyfile}.pub")), proc.stdout.split()[1])
+
+    @unittest.skipUnless(SSH_AGENT and SSH_ADD, "ssh-agent is not available")
+    def test_agent(self):
+        keyfile = self._keygen("rsa", "-b", "2048")
+        socket_path = os.path.join(self.tmpdir, "agent.sock")
+        agent_proc = subprocess.Popen([SSH_AGENT, "-D", "-a", socket_path], stdout=subprocess.DEVNULL)
+        try:
+            for _ in range(100):
+                if os.path.exists(socket_path):
+                    break
+                time.sleep(0.05)
+            env = dict(os.environ, SSH_AUTH_SOCK=socket_path)
+            subprocess.run([SSH_ADD, "-q", keyfile], env=env, check=True, stderr=subprocess.DEVNULL)
+            # the private key is not readable, the agent must sign the data
+            os.unlink(keyfile)
+
+            agent = sshsig.SshAgentClient(socket_path=socket_path)
+            keys = agent.list_keys()
+            self.assertEqual([i[1] for i in keys], ["test"])
+            signature = sshsig.sign("(created): 1234", "realm", f"{keyfile}.pub", agent=agent)
+            self.assertIsNotNone(signature)
+            self._verify(keyfile, signature, "(created): 1234", "realm")
+        finally:
+            agent_proc.terminate()
+            agent_proc.wait()
+
+
+if __name__ == "__main__":
+    unittest.main()